@@ -1,15 +1,51 @@
+import hashlib
+from functools import lru_cache
 from importlib import resources
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from mutahunter.core.parsers import filename_to_lang
-from tree_sitter_languages import get_language, get_parser
+from tree_sitter_languages import get_parser
 
+from mutahunter.core.block_index import BlockIndex, BlockRecord
 from mutahunter.core.logger import logger
+from mutahunter.core.parsers import (
+    filename_to_lang,
+    get_cached_parser,
+    get_cached_query,
+)
+
+# Query tags of the blocks kept in the block index.
+INDEXED_TAGS = {
+    "definition.function",
+    "definition.method",
+    "if_statement",
+    "loop",
+    "return",
+    "import",
+    "test.method",
+}
+
+
+@lru_cache(maxsize=None)
+def _read_query_scm(lang: str) -> str:
+    try:
+        scm_fname = resources.files(__package__).joinpath(
+            "queries", f"tree-sitter-{lang}-tags.scm"
+        )
+    except KeyError:
+        return ""
+    if not scm_fname.exists():
+        return ""
+    return scm_fname.read_text()
 
 
 class Analyzer:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, index: Optional[BlockIndex] = None) -> None:
+        """
+        Args:
+            index (Optional[BlockIndex]): Where the blocks of each file are kept
+                between queries. Defaults to an index in memory.
+        """
+        self.index = index if index is not None else BlockIndex(path=None)
 
     def get_language_by_filename(self, filename: str) -> str:
         """
@@ -96,10 +132,11 @@ class Analyzer:
             source_file_path (str): The name of the file being analyzed.
 
         Returns:
-            List[Any]: A list of method block nodes.
+            List[BlockRecord]: A list of method blocks.
         """
-        source_code = self._read_source_file(source_file_path)
-        return self.find_method_blocks_nodes(source_file_path, source_code)
+        return self._get_indexed_blocks(
+            source_file_path, ["if_statement", "loop", "return"]
+        )
 
     def get_function_blocks(self, source_file_path: str) -> List[Any]:
         """
@@ -109,10 +146,97 @@ class Analyzer:
             source_file_path (str): The name of the file being analyzed.
 
         Returns:
-            List[Any]: A list of function block nodes.
+            List[BlockRecord]: A list of function blocks.
         """
+        return self._get_indexed_blocks(
+            source_file_path, ["definition.function", "definition.method"]
+        )
+
+    def _get_indexed_blocks(
+        self, source_file_path: str, tags: List[str]
+    ) -> List[BlockRecord]:
         source_code = self._read_source_file(source_file_path)
-        return self.find_function_blocks_nodes(source_file_path, source_code)
+        return [
+            record
+            for record in self.get_block_records(source_file_path, source_code)
+            if record.kind in tags
+        ]
+
+    def get_block_records(
+        self, source_file_path: str, source_code: bytes
+    ) -> List[BlockRecord]:
+        """
+        Retrieves the blocks of a file from the block index, parsing the file only
+        if its content, or the query of its language, changed since it was indexed.
+
+        Args:
+            source_file_path (str): The path to the source file.
+            source_code (bytes): The source code of the file.
+
+        Returns:
+            List[BlockRecord]: The blocks of every tag in INDEXED_TAGS, in the order
+            the query captured them.
+        """
+        lang = filename_to_lang(source_file_path)
+        if lang is None:
+            raise ValueError(f"Language not supported for file: {source_file_path}")
+        query_scm = self._load_query_scm(lang)
+        key = hashlib.sha256(
+            b"\0".join(
+                [
+                    b"mutahunter-blocks-v1",
+                    lang.encode(),
+                    query_scm.encode(),
+                    source_code,
+                ]
+            )
+        ).hexdigest()
+        records = self.index.get(source_file_path, key)
+        if records is None:
+            records = self._parse_block_records(lang, query_scm, source_code)
+            self.index.put(source_file_path, key, records)
+        return records
+
+    def _parse_block_records(
+        self, lang: str, query_scm: str, source_code: bytes
+    ) -> List[BlockRecord]:
+        if not query_scm:
+            return []
+        tree = get_cached_parser(lang).parse(source_code)
+        captures = get_cached_query(lang, query_scm).captures(tree.root_node)
+        records = []
+        for node, tag in captures:
+            if tag not in INDEXED_TAGS:
+                continue
+            name = node.child_by_field_name("name")
+            scope_rows = []
+            top_level_row = node.start_point[0]
+            parent = node.parent
+            while parent is not None and parent.parent is not None:
+                top_level_row = parent.start_point[0]
+                if any(
+                    parent.child_by_field_name(field) is not None
+                    for field in ("name", "body", "definition")
+                ):
+                    scope_rows.append(top_level_row)
+                parent = parent.parent
+            records.append(
+                BlockRecord(
+                    kind=tag,
+                    name=(
+                        name.text.decode("utf8", "replace")
+                        if name is not None
+                        else None
+                    ),
+                    start_point=tuple(node.start_point),
+                    end_point=tuple(node.end_point),
+                    start_byte=node.start_byte,
+                    end_byte=node.end_byte,
+                    scope_rows=tuple(scope_rows),
+                    top_level_row=top_level_row,
+                )
+            )
+        return records
 
     def _read_source_file(self, file_path: str) -> bytes:
         """
@@ -190,8 +314,7 @@ class Analyzer:
         lang = filename_to_lang(source_file_path)
         if lang is None:
             raise ValueError(f"Language not supported for file: {source_file_path}")
-        parser = get_parser(lang)
-        language = get_language(lang)
+        parser = get_cached_parser(lang)
 
         tree = parser.parse(source_code)
 
@@ -206,7 +329,7 @@ class Analyzer:
         if not query_scm:
             return []
 
-        query = language.query(query_scm)
+        query = get_cached_query(lang, query_scm)
         captures = query.captures(tree.root_node)
         # for node, tag in captures:
         #     print(node, tag)
@@ -228,19 +351,11 @@ class Analyzer:
         Returns:
             str: The content of the query SCM file.
         """
-        try:
-            scm_fname = resources.files(__package__).joinpath(
-                "queries", f"tree-sitter-{lang}-tags.scm"
-            )
-        except KeyError:
-            return ""
-        if not scm_fname.exists():
-            return ""
-        return scm_fname.read_text()
+        return _read_query_scm(lang)
 
     def find_function_block_by_name(
         self, source_file_path: str, method_name: str
-    ) -> List[Any]:
+    ) -> BlockRecord:
         """
         Finds a function block by its name and returns the start and end lines of the function.
 
@@ -249,32 +364,25 @@ class Analyzer:
             method_name (str): The name of the method to find.
 
         Returns:
-            Dict[str, int]: A dictionary with 'start_line' and 'end_line' as keys and their corresponding line numbers as values.
+            BlockRecord: The first function block whose code contains the name.
         """
         source_code = self._read_source_file(source_file_path)
         lang = filename_to_lang(source_file_path)
         if lang is None:
             raise ValueError(f"Language not supported for file: {source_file_path}")
 
-        parser = get_parser(lang)
-        language = get_language(lang)
-        tree = parser.parse(source_code)
-
-        query_scm = self._load_query_scm(lang)
-        if not query_scm:
+        if not self._load_query_scm(lang):
             raise ValueError(
                 "Failed to load query SCM file for the specified language."
             )
 
-        query = language.query(query_scm)
-        captures = query.captures(tree.root_node)
-
-        result = []
-
-        for node, tag in captures:
-            if tag == "definition.function" or tag == "definition.method":
-                if self._is_function_name(node, method_name, source_code):
-                    return node
+        for record in self.get_block_records(source_file_path, source_code):
+            if (
+                record.kind == "definition.function"
+                or record.kind == "definition.method"
+            ):
+                if self._is_function_name(record, method_name, source_code):
+                    return record
         raise ValueError(f"Function {method_name} not found in file {source_file_path}")
 
     def _is_function_name(self, node, method_name: str, source_code: bytes) -> bool:
@@ -282,7 +390,7 @@ class Analyzer:
         Checks if the given node corresponds to the method_name.
 
         Args:
-            node (Node): The AST node to check.
+            node (Union[Node, BlockRecord]): The AST node or block to check.
             method_name (str): The method name to find.
             source_code (bytes): The source code.
 
@@ -300,10 +408,9 @@ class Analyzer:
             source_file_path (str): The name of the file being analyzed.
 
         Returns:
-            List[Any]: A list of import nodes.
+            List[BlockRecord]: A list of import blocks.
         """
-        source_code = self._read_source_file(source_file_path)
-        return self._find_blocks_nodes(source_file_path, source_code, ["import"])
+        return self._get_indexed_blocks(source_file_path, ["import"])
 
     def get_test_nodes(self, source_file_path: str) -> List[Any]:
         """
@@ -313,7 +420,6 @@ class Analyzer:
             source_file_path (str): The name of the file being analyzed.
 
         Returns:
-            List[Any]: A list of test nodes.
+            List[BlockRecord]: A list of test blocks.
         """
-        source_code = self._read_source_file(source_file_path)
-        return self._find_blocks_nodes(source_file_path, source_code, ["test.method"])
+        return self._get_indexed_blocks(source_file_path, ["test.method"])
@@ -0,0 +1,158 @@
+"""
+Module for the on-disk index of the code blocks the Analyzer finds in source files.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import astuple, dataclass
+from typing import List, Optional, Tuple
+
+from mutahunter.core.logger import logger
+
+BLOCK_INDEX_PATH = os.path.join("logs", "cache", "blocks.sqlite")
+
+
+@dataclass(frozen=True)
+class BlockRecord:
+    """
+    A block captured by a tree-sitter tags query, without the tree it came from.
+
+    Points are 0-based ``(row, column)`` pairs like those of a tree-sitter node.
+    """
+
+    kind: str  # The query tag, e.g. "definition.function" or "loop".
+    name: Optional[str]
+    start_point: Tuple[int, int]
+    end_point: Tuple[int, int]
+    start_byte: int
+    end_byte: int
+    # First rows of the enclosing classes, impls, namespaces, ..., innermost first.
+    scope_rows: Tuple[int, ...] = ()
+    # First row of the top-level statement the block is part of.
+    top_level_row: int = 0
+
+
+def _dump_records(records: List[BlockRecord]) -> str:
+    return json.dumps([astuple(record) for record in records])
+
+
+def _load_records(data: str) -> List[BlockRecord]:
+    return [
+        BlockRecord(
+            kind,
+            name,
+            tuple(start_point),
+            tuple(end_point),
+            start_byte,
+            end_byte,
+            tuple(scope_rows),
+            top_level_row,
+        )
+        for (
+            kind,
+            name,
+            start_point,
+            end_point,
+            start_byte,
+            end_byte,
+            scope_rows,
+            top_level_row,
+        ) in json.loads(data)
+    ]
+
+
+class BlockIndex:
+    """
+    Stores the blocks of each source file under a hash of its content.
+
+    The index is a SQLite database with one row per file; a file whose hash
+    changed is parsed again and its row replaced. The blocks of the most recently
+    used ``memory_entries`` files are also kept in memory. Without a ``path`` the
+    index only lives in memory.
+    """
+
+    def __init__(
+        self, path: Optional[str] = BLOCK_INDEX_PATH, memory_entries: int = 256
+    ) -> None:
+        self.path = os.path.abspath(path) if path else None
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[str, List[BlockRecord]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        if self.path is not None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    blocks TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """)
+            self._connection.commit()
+
+    def get(self, source_file_path: str, key: str) -> Optional[List[BlockRecord]]:
+        """Returns the blocks of a file if they were indexed under the same key."""
+        path = os.path.abspath(source_file_path)
+        with self._lock:
+            cached = self._memory.get(path)
+            if cached is not None and cached[0] == key:
+                self._memory.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+            row = None
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT blocks FROM files WHERE path = ? AND key = ?", (path, key)
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            records = _load_records(row[0])
+            self._remember(path, key, records)
+        return records
+
+    def put(self, source_file_path: str, key: str, records: List[BlockRecord]) -> None:
+        """Indexes the blocks of a file, replacing what was indexed for it before."""
+        path = os.path.abspath(source_file_path)
+        with self._lock:
+            self._remember(path, key, records)
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO files (path, key, blocks, updated) "
+                    "VALUES (?, ?, ?, ?)",
+                    (path, key, _dump_records(records), time.time()),
+                )
+                self._connection.commit()
+
+    def _remember(self, path: str, key: str, records: List[BlockRecord]) -> None:
+        self._memory[path] = (key, records)
+        self._memory.move_to_end(path)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> int:
+        """Deletes all entries and returns how many files were indexed."""
+        with self._lock:
+            self._memory.clear()
+            if self._connection is None:
+                return 0
+            count = self._connection.execute("DELETE FROM files").rowcount
+            self._connection.commit()
+            self._connection.execute("VACUUM")
+        logger.info(f"Removed {count} indexed files from {self.path}")
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,86 @@
+"""
+Module for limiting what the LLM calls of a run may spend.
+"""
+
+import threading
+from typing import Optional, Tuple
+
+
+class GenerationBudget:
+    """
+    Caps the cost and the number of tokens of a run's LLM calls.
+
+    A call reserves its estimated cost and tokens before it is made and is refused
+    if the reservation does not fit next to what was spent and what calls in
+    flight reserved. Once the call returns, the reservation is replaced by what
+    it actually used.
+    """
+
+    def __init__(
+        self, max_cost: Optional[float] = None, max_tokens: Optional[int] = None
+    ) -> None:
+        self.max_cost = max_cost
+        self.max_tokens = max_tokens
+        self.spent_cost = 0.0
+        self.spent_tokens = 0
+        # Calls refused for lack of budget.
+        self.refused = 0
+        self._reserved_cost = 0.0
+        self._reserved_tokens = 0
+        self._lock = threading.Lock()
+
+    def fits(self, tokens: int, cost: float) -> bool:
+        """Checks whether calls of this many tokens and this cost fit in what is left."""
+        with self._lock:
+            return self._fits(tokens, cost)
+
+    def _fits(self, tokens: int, cost: float) -> bool:
+        if self.max_cost is not None and (
+            self.spent_cost + self._reserved_cost + cost > self.max_cost
+        ):
+            return False
+        if self.max_tokens is not None and (
+            self.spent_tokens + self._reserved_tokens + tokens > self.max_tokens
+        ):
+            return False
+        return True
+
+    def reserve(self, tokens: int, cost: float) -> Optional[Tuple[int, float]]:
+        """
+        Reserves the estimated tokens and cost of a call.
+
+        Returns:
+            Optional[Tuple[int, float]]: The reservation to pass to `settle`, or
+            None if the call does not fit.
+        """
+        with self._lock:
+            if not self._fits(tokens, cost):
+                self.refused += 1
+                return None
+            self._reserved_tokens += tokens
+            self._reserved_cost += cost
+        return tokens, cost
+
+    def settle(
+        self, reservation: Tuple[int, float], used_tokens: int, used_cost: float
+    ) -> None:
+        """Replaces a reservation by what the call used."""
+        with self._lock:
+            self._reserved_tokens -= reservation[0]
+            self._reserved_cost -= reservation[1]
+            self.spent_tokens += used_tokens
+            self.spent_cost += used_cost
+
+    def spend(self, used_tokens: int, used_cost: float) -> None:
+        """Counts tokens and cost used outside of the budget, e.g. before a resume."""
+        with self._lock:
+            self.spent_tokens += used_tokens
+            self.spent_cost += used_cost
+
+    def describe(self) -> str:
+        limits = []
+        if self.max_cost is not None:
+            limits.append(f"${self.spent_cost:.5f} of ${self.max_cost:.5f}")
+        if self.max_tokens is not None:
+            limits.append(f"{self.spent_tokens} of {self.max_tokens} tokens")
+        return ", ".join(limits)
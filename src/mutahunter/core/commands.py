@@ -0,0 +1,230 @@
+"""
+Module for inspecting and rewriting test commands.
+"""
+
+import os
+import re
+import shlex
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+# Commands using any of these need a real shell and cannot be rewritten safely.
+SHELL_CHARACTERS = set(";&|<>$`")
+
+PYTEST_PLUGIN_PATH = os.path.join(os.path.dirname(__file__), "pytest_plugin.py")
+PYTEST_PLUGIN_NAME = "mutahunter_pytest_plugin"
+PYTEST_PLUGIN_DIR = os.path.join("logs", "_latest", "pytest_plugin")
+
+IMPORT_HOOK_PATH = os.path.join(os.path.dirname(__file__), "import_hook.py")
+IMPORT_HOOK_DIR = os.path.join("logs", "_latest", "import_hook")
+
+FAILED_TEST_PATTERNS = [
+    # pytest short test summary, e.g. "FAILED tests/test_app.py::test_add - assert ..."
+    re.compile(r"^(?:FAILED|ERROR) (\S+?)(?: - .*)?$", re.MULTILINE),
+    # go test, e.g. "--- FAIL: TestAdd (0.00s)"
+    re.compile(r"^\s*--- FAIL: (\S+)", re.MULTILINE),
+]
+
+# pytest options whose value is passed as a separate argument. Options whose value
+# is optional, like --cov, only carry one in the --option=value form.
+PYTEST_VALUE_OPTIONS = {
+    "-c",
+    "-k",
+    "-m",
+    "-n",
+    "-o",
+    "-p",
+    "-r",
+    "-W",
+    "--basetemp",
+    "--capture",
+    "--color",
+    "--confcutdir",
+    "--cov-config",
+    "--cov-report",
+    "--deselect",
+    "--dist",
+    "--durations",
+    "--ignore",
+    "--ignore-glob",
+    "--import-mode",
+    "--junit-xml",
+    "--junitxml",
+    "--log-file",
+    "--log-level",
+    "--maxfail",
+    "--override-ini",
+    "--rootdir",
+    "--tb",
+    "--timeout",
+}
+
+
+def split_pytest_command(test_command: str) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Splits a pytest command into the tokens that start pytest and its arguments.
+
+    Args:
+        test_command (str): The test command, e.g. 'python -m pytest tests/ -q'.
+
+    Returns:
+        Optional[Tuple[List[str], List[str]]]: The launcher tokens and the pytest
+        arguments, or None if the command is not a plain pytest invocation.
+    """
+    if SHELL_CHARACTERS & set(test_command):
+        return None
+    tokens = shlex.split(test_command)
+    if not tokens:
+        return None
+    executable = os.path.basename(tokens[0])
+    if executable in ("pytest", "py.test"):
+        return tokens[:1], tokens[1:]
+    runs_module = tokens[1:3] == ["-m", "pytest"]
+    if re.fullmatch(r"python[\d.]*", executable) and runs_module:
+        return tokens[:3], tokens[3:]
+    return None
+
+
+def select_pytest_tests(test_command: str, test_ids: List[str]) -> Optional[str]:
+    """
+    Rewrites a pytest command so it runs only the given test IDs.
+
+    Test paths in the original command are replaced by the test IDs; all other
+    options are kept.
+
+    Returns:
+        Optional[str]: The rewritten command, or None if it cannot be rewritten.
+    """
+    split = split_pytest_command(test_command)
+    if split is None:
+        return None
+    launcher, args = split
+    options, _ = split_pytest_args(args)
+    return shlex.join(launcher + options + list(test_ids))
+
+
+def split_pytest_args(args: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Splits pytest arguments into the options, with their values, and the test paths.
+
+    Returns:
+        Tuple[List[str], List[str]]: The options and the test paths, in order.
+    """
+    options: List[str] = []
+    paths: List[str] = []
+    expects_value = False
+    for arg in args:
+        if expects_value:
+            options.append(arg)
+            expects_value = False
+        elif arg.startswith("-"):
+            options.append(arg)
+            expects_value = arg in PYTEST_VALUE_OPTIONS
+        else:
+            paths.append(arg)
+    return options, paths
+
+
+def with_pytest_plugin(
+    test_command: str, env: Optional[Dict[str, str]] = None
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Loads mutahunter's pytest plugin into a pytest command.
+
+    The plugin is copied to ``logs/_latest/pytest_plugin`` and that directory is
+    put on ``PYTHONPATH``, so the project's own modules are never shadowed.
+
+    Args:
+        test_command (str): The pytest command.
+        env (Optional[Dict[str, str]]): Extra environment variables for the run.
+
+    Returns:
+        Tuple[str, Dict[str, str]]: The command and the extra environment variables.
+    """
+    plugin_dir = os.path.abspath(PYTEST_PLUGIN_DIR)
+    plugin_path = os.path.join(plugin_dir, f"{PYTEST_PLUGIN_NAME}.py")
+    if not os.path.exists(plugin_path):
+        os.makedirs(plugin_dir, exist_ok=True)
+        shutil.copy(PYTEST_PLUGIN_PATH, plugin_path)
+    env = dict(env or {})
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [plugin_dir, os.environ.get("PYTHONPATH")])
+    )
+    return f"{test_command} -p {PYTEST_PLUGIN_NAME}", env
+
+
+def with_import_hook(
+    module_path: str,
+    mutant_path: str,
+    env: Optional[Dict[str, str]] = None,
+    status_path: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Returns the environment that makes Python processes import a mutant in place
+    of a module.
+
+    The import hook is copied to ``logs/_latest/import_hook`` as
+    ``sitecustomize.py`` and that directory is put in front of ``PYTHONPATH``.
+
+    Args:
+        module_path (str): The path of the module to replace.
+        mutant_path (str): The path of the mutant's source.
+        env (Optional[Dict[str, str]]): Extra environment variables for the run.
+        status_path (Optional[str]): A file the hook reports its progress to.
+
+    Returns:
+        Dict[str, str]: The extra environment variables.
+    """
+    hook_dir = os.path.abspath(IMPORT_HOOK_DIR)
+    hook_path = os.path.join(hook_dir, "sitecustomize.py")
+    if not os.path.exists(hook_path):
+        os.makedirs(hook_dir, exist_ok=True)
+        shutil.copy(IMPORT_HOOK_PATH, hook_path)
+    env = dict(env or {})
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [hook_dir, env.get("PYTHONPATH") or os.environ.get("PYTHONPATH")])
+    )
+    env["MUTAHUNTER_MUTANT_TARGET"] = os.path.abspath(module_path)
+    env["MUTAHUNTER_MUTANT_SOURCE"] = os.path.abspath(mutant_path)
+    if status_path:
+        env["MUTAHUNTER_IMPORT_HOOK_STATUS"] = status_path
+    return env
+
+
+def add_fail_fast_flag(test_command: str) -> str:
+    """
+    Makes the test command stop at the first failing test.
+
+    Supports pytest (``-x``), jest (``--bail``) and go test (``-failfast``).
+    Other commands are returned unchanged.
+    """
+    if SHELL_CHARACTERS & set(test_command):
+        return test_command
+    split = split_pytest_command(test_command)
+    if split is not None:
+        _, args = split
+        if any(
+            arg in ("-x", "--exitfirst") or arg.startswith("--maxfail") for arg in args
+        ):
+            return test_command
+        return f"{test_command} -x"
+    tokens = shlex.split(test_command)
+    if any(os.path.basename(token) == "jest" for token in tokens):
+        if "--bail" in tokens or any(token.startswith("--bail=") for token in tokens):
+            return test_command
+        return f"{test_command} --bail"
+    if tokens[:2] == ["go", "test"]:
+        if "-failfast" in tokens:
+            return test_command
+        return shlex.join(tokens[:2] + ["-failfast"] + tokens[2:])
+    return test_command
+
+
+def parse_failed_tests(output: str) -> List[str]:
+    """
+    Extracts the IDs of failed tests from pytest or go test output.
+    """
+    failed = []
+    for pattern in FAILED_TEST_PATTERNS:
+        failed.extend(pattern.findall(output))
+    return list(dict.fromkeys(failed))
@@ -1,39 +1,78 @@
 import json
+import os
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 from subprocess import CompletedProcess
-from typing import Any, Dict, List
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
 
 from tqdm import tqdm
 
 from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.commands import (
+    add_fail_fast_flag,
+    parse_failed_tests,
+    split_pytest_command,
+    with_pytest_plugin,
+)
+from mutahunter.core.coverage_map import PerTestCoverageMap
+from mutahunter.core.coverage_processor import CoverageProcessor
 from mutahunter.core.entities.config import MutationTestControllerConfig
 from mutahunter.core.exceptions import (
+    MutantDuplicateError,
+    MutantEquivalentError,
     MutantKilledError,
     MutantSurvivedError,
+    MutantTimeoutError,
     MutationTestingError,
     ReportGenerationError,
     UnexpectedTestResultError,
 )
-from mutahunter.core.io import FileOperationHandler
-from mutahunter.core.llm_mutation_engine import LLMMutationEngine
+from mutahunter.core.git_diff import (
+    changed_lines,
+    intersect_line_ranges,
+    merge_line_ranges,
+)
+from mutahunter.core.io import FileOperationHandler, Workspace, WorkspaceProvisioner
+from mutahunter.core.journal import RunJournal, file_hash
+from mutahunter.core.kill_stats import KillStats
+from mutahunter.core.llm_mutation_engine import LLMMutationEngine, MutationRequest
 from mutahunter.core.logger import logger
+from mutahunter.core.mutant_archive import MutantArchive
+from mutahunter.core.mutant_filter import MutantFilter
+from mutahunter.core.outcome_cache import OutcomeCache, fingerprint_inputs, outcome_key
 from mutahunter.core.prompt_factory import MutationTestingPrompt
 from mutahunter.core.report import MutantReport
 from mutahunter.core.router import LLMRouter
+from mutahunter.core.rule_mutation_engine import RuleMutationEngine
 from mutahunter.core.runner import MutantTestRunner
+from mutahunter.core.scheduler import RequestScheduler
+from mutahunter.core.schemata import SCHEMATA_ENV_VAR
 
 
 class MutationTestController:
+    # Batches of prepared mutants waiting for the test stage.
+    MAX_PENDING_BATCHES = 2
+    # Requests planned and ranked together when a generation budget is set.
+    SCHEDULE_WINDOW = 64
+
     def __init__(
         self,
         config: MutationTestControllerConfig,
         analyzer: Analyzer,
         test_runner: MutantTestRunner,
         router: LLMRouter,
-        engine: LLMMutationEngine,
+        engine: Union[LLMMutationEngine, RuleMutationEngine],
         mutant_report: MutantReport,
         file_handler: FileOperationHandler,
         prompt: MutationTestingPrompt,
+        workspace_provisioner: Optional[WorkspaceProvisioner] = None,
+        journal: Optional[RunJournal] = None,
+        outcome_cache: Optional[OutcomeCache] = None,
+        mutant_archive: Optional[MutantArchive] = None,
     ) -> None:
         self.config = config
         self.analyzer = analyzer
@@ -43,32 +82,98 @@ class MutationTestController:
         self.mutant_report = mutant_report
         self.file_handler = file_handler
         self.prompt = prompt
+        self.workspace_provisioner = workspace_provisioner or WorkspaceProvisioner(
+            project_root=os.getcwd(), size=config.workers
+        )
+        self.journal = journal or RunJournal()
+        self.outcome_cache = outcome_cache
+        self.mutant_archive = mutant_archive or MutantArchive()
+        self.mutant_filter = MutantFilter(file_handler, self.mutant_archive)
+        self.test_fingerprint: Optional[str] = None
+        self.coverage_processor: Optional[CoverageProcessor] = None
 
         # mutant details
         self.survived_mutants = 0
         self.killed_mutants = 0
         self.compile_error_mutants = 0
         self.timeout_mutants = 0
+        self.unexpected_test_error_mutants = 0
+        self.duplicate_mutants = 0
+        self.equivalent_mutants = 0
+        self.coverage_map: Optional[PerTestCoverageMap] = None
+        self.kill_stats = KillStats()
+        self.schemata_durations: Dict[str, float] = {}
+        self.resumed_cost = 0.0
+        self.num_mutants = 0
+        self._results_lock = threading.Lock()
+        self.mutant_test_command = config.test_command
+        if config.fail_fast:
+            self.mutant_test_command = add_fail_fast_flag(config.test_command)
+            if split_pytest_command(config.test_command) is None:
+                logger.info(
+                    "Tests are ordered by the mutants they killed for pytest only. "
+                    f"'{config.test_command}' runs its tests in its own order."
+                )
 
     def run(self) -> None:
         start = time.time()
+        resumed = self._load_resumed_run() if self.config.resume else None
+        self.journal.open(resume=resumed is not None)
+        self.mutant_archive.open(resume=resumed is not None)
+        if resumed is None:
+            run = {"source_path": self.config.source_path}
+            if os.path.isfile(self.config.source_path):
+                run["source_hash"] = file_hash(self.config.source_path)
+            self.journal.record("run", test_command=self.config.test_command, **run)
         try:
             self.test_runner.dry_run()
-            self.run_mutation_testing()
+            if self.config.select_tests:
+                self.coverage_map = PerTestCoverageMap.collect(self.config.test_command)
+            self.run_mutation_testing(resumed)
         except MutationTestingError as e:
             logger.error(f"Mutation testing failed: {str(e)}")
+        finally:
+            self.test_runner.close()
+            self.workspace_provisioner.close()
+            self.journal.close()
+            self.mutant_archive.close()
+            if self.outcome_cache is not None:
+                self.outcome_cache.close()
+            if self.router.cache is not None:
+                self.router.cache.close()
+            self.analyzer.index.close()
+        budget = self.router.budget
+        if budget is not None and budget.refused:
+            logger.warning(
+                f"Generation budget exhausted ({budget.describe()} spent): "
+                f"{budget.refused} requests were not sent. The report only covers "
+                "the mutants generated before."
+            )
+        if self.router.failed_requests:
+            logger.warning(
+                f"{self.router.failed_requests} LLM calls failed after "
+                f"{self.router.retry_policy.retries} retries in total. "
+                "Run again with --resume to generate the missing mutants."
+            )
         try:
-            # implement mutation coverage. killed / total mutants
-            mutation_coverage = self.killed_mutants / (
-                self.survived_mutants + self.killed_mutants
+            # mutation coverage: detected (killed or timed out) / total mutants
+            detected_mutants = self.killed_mutants + self.timeout_mutants
+            total_mutants = detected_mutants + self.survived_mutants
+            mutation_coverage = (
+                detected_mutants / total_mutants if total_mutants else 0.0
             )
             self.mutant_report.generate_report(
-                total_cost=self.router.total_cost,
+                total_cost=self.router.total_cost + self.resumed_cost,
                 mutation_coverage=mutation_coverage,
                 killed_mutants=self.killed_mutants,
                 survived_mutants=self.survived_mutants,
                 compile_error_mutants=self.compile_error_mutants,
                 timeout_mutants=self.timeout_mutants,
+                llm_cache_hits=self.router.cache_hits,
+                saved_cost=self.router.saved_cost,
+                duplicate_mutants=self.duplicate_mutants,
+                equivalent_mutants=self.equivalent_mutants,
+                unsent_requests=budget.refused if budget is not None else 0,
             )
         except ReportGenerationError as e:
             logger.error(f"Report generation failed: {str(e)}")
@@ -76,66 +181,681 @@ class MutationTestController:
 
 
 
-    def run_mutation_testing(self) -> None:
-        mutations = self.engine.generate(
-            source_file_path=self.config.source_path,
-        )["mutants"]
-        mutants = self.process_mutations(mutations)
-        return mutants
+    def get_changed_function_ranges(
+        self, source_path: str
+    ) -> Optional[List[Tuple[int, int]]]:
+        """
+        Finds the function blocks of a source file that changed since the diff base.
+
+        Returns:
+            Optional[List[Tuple[int, int]]]: Inclusive line ranges of the changed
+            functions, or None if the whole file is new.
+        """
+        lines = changed_lines(source_path, self.config.diff_base)
+        if lines is None:
+            logger.info(f"{source_path} is new since {self.config.diff_base}.")
+            return None
+        blocks, _ = self.analyzer.get_covered_function_blocks(
+            executed_lines=lines, source_file_path=source_path
+        )
+        line_ranges = merge_line_ranges(
+            [(block.start_point[0] + 1, block.end_point[0] + 1) for block in blocks]
+        )
+        logger.info(
+            f"{len(lines)} lines changed since {self.config.diff_base}, "
+            f"in {len(blocks)} functions: {line_ranges}"
+        )
+        return line_ranges
+
+    def _load_resumed_run(self) -> Optional[Dict[str, Any]]:
+        """
+        Restores the source files left mutated by an interrupted run and loads the
+        run's journal.
+        """
+        for source_path in self.journal.source_paths():
+            backup_path = f"{source_path}.bak"
+            if os.path.exists(backup_path):
+                logger.warning(f"Restoring {source_path} from {backup_path}.")
+                self.test_runner.revert_file(source_path, backup_path)
+        resumed = self.journal.load_run(
+            self.config.source_path, self.config.test_command
+        )
+        if resumed is None:
+            logger.info("Nothing to resume. Starting a new run.")
+        return resumed
+
+    def _fingerprint_test_inputs(self) -> str:
+        return fingerprint_inputs(self.config.cache_inputs or [self.config.test_path])
+
+    def run_mutation_testing(self, resumed: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Generates and tests the mutants of every source file.
+
+        Three stages run at the same time, connected by bounded queues: the engine
+        generates mutants of the next requests, a thread writes and syntax checks
+        the mutants of each generated batch, and this thread runs the tests.
+        Unless the mutants are tested through a mutant schemata, which needs all
+        mutants of a batch, the LLM responses are streamed and every mutant is
+        tested as soon as it has been parsed.
+        """
+        generated: List[Any] = []
+        if self.outcome_cache is not None and self.test_fingerprint is None:
+            # Before any mutant is tested, while the project is unmodified.
+            self.test_fingerprint = self._fingerprint_test_inputs()
+        if resumed is not None:
+            mutations = resumed["mutants"]
+            generated = resumed["requests"]
+            self.resumed_cost = resumed["cost"]
+            if self.router.budget is not None:
+                self.router.budget.spend(0, self.resumed_cost)
+            self.num_mutants = resumed.get("last_mutant_id", len(mutations))
+            finished = [m for m in mutations if "status" in m]
+            for mutant_data in finished:
+                self._count(mutant_data["status"])
+                # Later mutants are compared to the ones tested before the crash.
+                self.mutant_filter.check(mutant_data)
+            logger.info(
+                f"Resuming run: {len(finished)} of {len(mutations)} mutants already tested."
+            )
+            unfinished = [m for m in mutations if "status" not in m]
+            for source_path in dict.fromkeys(m["source_path"] for m in unfinished):
+                self.process_mutations(
+                    [m for m in unfinished if m["source_path"] == source_path],
+                    source_path,
+                )
+        requests = (
+            request
+            for request in self.iter_mutation_requests()
+            if [request.source_file_path, self._journaled_ranges(request.line_ranges)]
+            not in generated
+        )
+        if self.router.budget is not None:
+            requests = self._schedule(requests)
+        batches: queue.Queue = queue.Queue(
+            maxsize=self.MAX_PENDING_BATCHES + self.config.workers
+        )
+        stop = threading.Event()
+        preparer = threading.Thread(
+            target=self._prepare_batches, args=(requests, batches, stop), daemon=True
+        )
+        preparer.start()
+        ready: Deque[Any] = deque()
+        try:
+            while True:
+                batch = ready.popleft() if ready else batches.get()
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                self._test_mutations(*self._merge_ready_batches(batch, batches, ready))
+        finally:
+            stop.set()
+        preparer.join()
+
+    def _merge_ready_batches(
+        self, batch: Tuple[Any, ...], batches: queue.Queue, ready: Deque[Any]
+    ) -> Tuple[Any, ...]:
+        """
+        Adds the mutants of the same source file that are already waiting in the
+        queue to a batch, so that parallel workers have more than one streamed
+        mutant to test. The first item that does not fit is kept in `ready`.
+        """
+        mutations, source_path, schemata_path = batch
+        while self.config.workers > len(mutations) and schemata_path is None:
+            try:
+                item = batches.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(item, tuple) or item[1:] != (source_path, None):
+                ready.append(item)
+                break
+            mutations = mutations + item[0]
+        return mutations, source_path, schemata_path
+
+    def _prepare_batches(
+        self,
+        requests: Iterator[MutationRequest],
+        batches: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        """
+        Writes and syntax checks the mutants of each generated batch and hands them
+        to the test stage. Runs in its own thread.
+        """
+        try:
+            for request, result in self.engine.generate_many(
+                requests,
+                concurrency=self.config.llm_concurrency,
+                max_pending=self.MAX_PENDING_BATCHES + self.config.workers,
+                stream=not self.config.schemata,
+            ):
+                source_path = request.source_file_path
+                batch = result.get("mutants") or []
+                if self.coverage_processor is not None:
+                    batch = self._drop_uncovered_mutants(batch, source_path)
+                for mutant_data in batch:
+                    self.num_mutants += 1
+                    mutant_data["mutant_id"] = str(self.num_mutants)
+                    mutant_data["source_path"] = source_path
+                complete = result.get("complete", True)
+                if batch or complete:
+                    self.journal.record(
+                        "mutants",
+                        source_path=source_path,
+                        source_hash=self.mutant_archive.source_hash(source_path),
+                        line_ranges=request.line_ranges,
+                        mutants=batch,
+                        complete=complete,
+                        cost=self.router.total_cost,
+                    )
+                if not batch:
+                    continue
+                prepared = self._prepare_mutations(batch, source_path)
+                while not stop.is_set():
+                    try:
+                        batches.put(prepared, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+        except Exception as e:
+            batches.put(e)
+            return
+        batches.put(None)
+
+    def iter_mutation_requests(self) -> Iterator[MutationRequest]:
+        """
+        Lazily finds the source files and splits each into the requests sent to the
+        LLM.
+
+        Yields:
+            MutationRequest: The requests, file by file.
+        """
+        for source_path in self.file_handler.iter_source_files(
+            self.config.source_path, self.config.exclude_files
+        ):
+            logger.info(f"Mutating {source_path}")
+            line_ranges = None
+            if self.config.diff_base:
+                line_ranges = self.get_changed_function_ranges(source_path)
+                if line_ranges == []:
+                    logger.info(f"No function changed since {self.config.diff_base}.")
+                    continue
+            if self.config.coverage_report:
+                covered_ranges = self.get_covered_function_ranges(source_path)
+                line_ranges = (
+                    covered_ranges
+                    if line_ranges is None
+                    else intersect_line_ranges(line_ranges, covered_ranges)
+                )
+                if line_ranges == []:
+                    logger.info("No function to mutate is covered by the tests.")
+                    continue
+            yield from self.engine.plan_requests(source_path, line_ranges)
+
+    def _schedule(
+        self, requests: Iterator[MutationRequest]
+    ) -> Iterator[MutationRequest]:
+        """
+        Orders the requests so that a tight budget goes to the most valuable code.
+
+        Requests are ranked in windows of `SCHEDULE_WINDOW` against what is left
+        of the budget, so that directory runs do not plan every file before the
+        first mutant is generated. The most valuable code of a later window can
+        therefore lose to an earlier window that already used up the budget.
+        """
+        requests = iter(requests)
+        scheduler = None
+        while True:
+            window = list(islice(requests, self.SCHEDULE_WINDOW))
+            if not window:
+                return
+            if scheduler is None:
+                # Planning the first window also parses the coverage report, if any.
+                scheduler = RequestScheduler(
+                    self.engine,
+                    self.analyzer,
+                    self.router.budget,
+                    self.coverage_processor,
+                )
+            yield from scheduler.schedule(window)
+
+    @staticmethod
+    def _journaled_ranges(line_ranges: Optional[List[Tuple[int, int]]]) -> Any:
+        # Line ranges as they read back from the journal's JSON.
+        return None if line_ranges is None else [list(r) for r in line_ranges]
+
+    def get_covered_function_ranges(self, source_path: str) -> List[Tuple[int, int]]:
+        """
+        Finds the function blocks of a source file that the coverage report shows
+        as executed.
+
+        Returns:
+            List[Tuple[int, int]]: Inclusive line ranges of the covered functions.
+        """
+        if self.coverage_processor is None:
+            self.coverage_processor = CoverageProcessor(
+                self.config.coverage_report, self.config.coverage_type
+            )
+            self.coverage_processor.parse_coverage_report()
+        executed_lines = self.coverage_processor.executed_lines(source_path)
+        if executed_lines is None:
+            logger.warning(
+                f"{source_path} is not in the coverage report. "
+                "Treating it as not covered."
+            )
+            return []
+        # Definition lines run when a module loads (e.g. Python's `def`), so only
+        # lines in the body of a function show that a test called it.
+        definition_lines = {
+            block.start_point[0] + 1
+            for block in self.analyzer.get_function_blocks(source_path)
+            if block.end_point[0] > block.start_point[0]
+        }
+        blocks, _ = self.analyzer.get_covered_function_blocks(
+            executed_lines=set(executed_lines) - definition_lines,
+            source_file_path=source_path,
+        )
+        line_ranges = merge_line_ranges(
+            [(block.start_point[0] + 1, block.end_point[0] + 1) for block in blocks]
+        )
+        logger.info(
+            f"{len(executed_lines)} lines covered, in {len(blocks)} functions: {line_ranges}"
+        )
+        return line_ranges
+
+    def _drop_uncovered_mutants(
+        self, mutations: List[Dict[str, Any]], source_path: str
+    ) -> List[Dict[str, Any]]:
+        """Drops mutants of lines the coverage report shows as never executed."""
+        hits = self.coverage_processor.line_hits(source_path) or {}
+        covered = [m for m in mutations if hits.get(m.get("line_number"), 1) > 0]
+        if len(covered) < len(mutations):
+            logger.info(
+                f"Dropped {len(mutations) - len(covered)} mutants of uncovered lines."
+            )
+        return covered
 
     def process_mutations(
+        self, mutations: List[Dict[str, Any]], source_path: str
+    ) -> List[Dict[str, Any]]:
+        """Prepares and tests mutants of a source file."""
+        self._test_mutations(*self._prepare_mutations(mutations, source_path))
+        return mutations
+
+    def _prepare_mutations(
+        self, mutations: List[Dict[str, Any]], source_path: str
+    ) -> Tuple[List[Dict[str, Any]], str, Optional[str]]:
+        """
+        Records skipped mutants and cached outcomes, writes the mutant files and
+        builds the mutant schemata. Mutants with a syntax error are recorded here.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], str, Optional[str]]: The mutants left to
+            test, the source path and the schemata path, if any.
+        """
+        pending = self._skip_redundant_mutants(mutations)
+        if self.outcome_cache is not None:
+            pending = self._reuse_cached_outcomes(pending, source_path)
+        prepared = []
+        for mutant_data in pending:
+            mutant_data["source_path"] = source_path
+            try:
+                mutant_data["mutant_path"] = self.file_handler.prepare_mutant_file(
+                    mutant_data, source_path, self.mutant_archive
+                )
+                logger.debug(f"Mutant file prepared: {mutant_data['mutant_path']}")
+                prepared.append(mutant_data)
+            except Exception as e:
+                self._record_result(mutant_data, e)
+        schemata_path = None
+        if self.config.schemata and prepared:
+            schemata_path = self.file_handler.prepare_schemata_file(
+                prepared, source_path, self.mutant_archive
+            )
+        return prepared, source_path, schemata_path
+
+    def _skip_redundant_mutants(
         self, mutations: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
+        """
+        Records duplicate mutants and mutants that only change comments or
+        whitespace as skipped.
+
+        Returns:
+            List[Dict[str, Any]]: The mutants left to test.
+        """
+        pending = []
         for mutant_data in mutations:
-            mutant_data["source_path"] = self.config.source_path
-            try:
+            skipped = self.mutant_filter.check(mutant_data)
+            if skipped is None:
+                pending.append(mutant_data)
+            else:
+                self._record_result(mutant_data, skipped)
+        return pending
+
+    def _test_mutations(
+        self,
+        mutations: List[Dict[str, Any]],
+        source_path: str,
+        schemata_path: Optional[str] = None,
+    ) -> None:
+        if schemata_path is not None:
+            self._check_schemata(mutations, source_path, schemata_path)
+        elif self.config.schemata and mutations:
+            logger.info("No mutant fits into a mutant schemata.")
+        if self.config.workers > 1 and len(mutations) > 1:
+            self._process_mutations_in_workspaces(mutations, source_path)
+        else:
+            for mutant_data in mutations:
+                self._record_result(mutant_data, self._process_mutant(mutant_data))
+
+    def _reuse_cached_outcomes(
+        self, mutations: List[Dict[str, Any]], source_path: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Records the cached outcome of every mutant that was tested before with the
+        same mutated file, test inputs and test command.
+
+        Returns:
+            List[Dict[str, Any]]: The mutants that still have to be tested.
+        """
+        if self.test_fingerprint is None:
+            self.test_fingerprint = self._fingerprint_test_inputs()
+        source_code = self.mutant_archive.source(source_path).source_code
+        pending = []
+        for mutant_data in mutations:
+            mutated_code = self.file_handler.apply_mutation(source_code, mutant_data)
+            mutant_data["outcome_key"] = outcome_key(
+                source_path,
+                mutated_code,
+                self.test_fingerprint,
+                self.config.test_command,
+            )
+            cached = self.outcome_cache.get(mutant_data["outcome_key"])
+            if cached is None:
+                pending.append(mutant_data)
+                continue
+            mutant_data["source_path"] = source_path
+            mutant_data["cached"] = True
+            error_class = {
+                "KILLED": MutantKilledError,
+                "SURVIVED": MutantSurvivedError,
+                "TIMEOUT": MutantTimeoutError,
+            }[cached["status"]]
+            self._record_result(mutant_data, error_class(cached["error_msg"]))
+        if len(pending) < len(mutations):
+            logger.info(
+                f"♻️ Reused {len(mutations) - len(pending)} cached outcomes, "
+                f"{len(pending)} mutants left to test ♻️"
+            )
+        return pending
+
+    def _check_schemata(
+        self, mutations: List[Dict[str, Any]], source_path: str, schemata_path: str
+    ) -> None:
+        """
+        Checks that the mutant schemata of a source file passes the tests with no
+        mutant switched on.
+
+        Mutants that are part of a working schemata get a ``schemata_path``; the
+        others are tested with their own mutant file.
+        """
+        included = [m for m in mutations if "schemata_id" in m]
+        logger.info(
+            f"Mutant schemata with {len(included)} of {len(mutations)} mutants: {schemata_path}"
+        )
+        workspace = None
+        if self.config.workers > 1:
+            workspace = self.workspace_provisioner.acquire()
+        start = time.monotonic()
+        try:
+            # The first run builds the schemata, so it gets no timeout like the dry run.
+            result = self._run_tests(
+                source_file_path=source_path,
+                replacement_path=schemata_path,
+                test_command=self.config.test_command,
+                timeout=None,
+                env={},
+                workspace=workspace,
+            )
+        finally:
+            if workspace:
+                self.workspace_provisioner.release(workspace)
+        if result.returncode != 0:
+            logger.warning(
+                "Mutant schemata failed to build or pass the tests "
+                f"(return code: {result.returncode}). Testing mutants one file at a time.\n"
+                f"{result.stderr + result.stdout}"
+            )
+            for mutant_data in included:
+                mutant_data.pop("schemata_id")
+            return
+        self.schemata_durations[schemata_path] = time.monotonic() - start
+        for mutant_data in included:
+            mutant_data["schemata_path"] = schemata_path
+
+    def _process_mutations_in_workspaces(
+        self, mutations: List[Dict[str, Any]], source_path: str
+    ) -> None:
+        """
+        Tests mutants concurrently, each worker in its own copy of the project.
+
+        Workers only test mutants; their results are merged into the controller's
+        counters from this thread as they complete. Workspaces are reused across
+        source files and removed when the run ends.
+        """
+        if os.path.relpath(os.path.abspath(source_path)).startswith(os.pardir):
+            raise MutationTestingError(
+                f"Source file {source_path} is outside the project root {os.getcwd()}."
+            )
+        num_workers = min(self.config.workers, len(mutations))
+        logger.info(f"Testing mutants with {num_workers} parallel workers.")
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._process_mutant_in_workspace,
+                    mutant_data,
+                    self.workspace_provisioner,
+                ): mutant_data
+                for mutant_data in mutations
+            }
+            for future in as_completed(futures):
+                self._record_result(futures[future], future.result())
+
+    def _process_mutant_in_workspace(
+        self, mutant_data: Dict[str, Any], provisioner: WorkspaceProvisioner
+    ) -> Exception:
+        workspace = provisioner.acquire()
+        try:
+            return self._process_mutant(mutant_data, workspace=workspace)
+        finally:
+            provisioner.release(workspace)
+
+    def _process_mutant(
+        self, mutant_data: Dict[str, Any], workspace: Optional[Workspace] = None
+    ) -> Exception:
+        """
+        Tests a single mutant, preparing its mutant file first if needed.
+
+        Returns:
+            Exception: The exception describing the mutant's outcome.
+        """
+        source_path = mutant_data["source_path"]
+        materialized = None
+        try:
+            mutant_path = mutant_data.get("mutant_path")
+            if mutant_path is None:
                 mutant_path = self.file_handler.prepare_mutant_file(
-                    mutant_data, self.config.source_path
+                    mutant_data, source_path, self.mutant_archive
                 )
-                logger.debug(f"Mutant file prepared: {mutant_path}")
                 mutant_data["mutant_path"] = mutant_path
-                self.test_mutant(
-                    source_file_path=self.config.source_path, mutant_path=mutant_path
-                )
-            except MutantSurvivedError as e:
-                mutant_data["status"] = "SURVIVED"
-                mutant_data["error_msg"] = str(e)
-                self.survived_mutants += 1
-            except MutantKilledError as e:
-                mutant_data["status"] = "KILLED"
-                mutant_data["error_msg"] = str(e)
-                self.killed_mutants += 1
-            except SyntaxError as e:
-                logger.error(str(e))
-                mutant_data["status"] = "SYNTAX_ERROR"
-                mutant_data["error_msg"] = str(e)
-                self.compile_error_mutants += 1
-            except UnexpectedTestResultError as e:
-                logger.error(str(e))
-                mutant_data["status"] = "UNEXPECTED_TEST_ERROR"
-                mutant_data["error_msg"] = str(e)
-                self.unexpected_test_error_mutants += 1
-            except Exception as e:
-                logger.error(f"Unexpected error processing mutant: {str(e)}")
-                mutant_data["status"] = "ERROR"
-                mutant_data["error_msg"] = str(e)
+            if "schemata_path" not in mutant_data:
+                # The mutant file only exists while its tests run.
+                if self.mutant_archive.materialize(mutant_path):
+                    materialized = mutant_path
+            self.test_mutant(
+                source_file_path=source_path,
+                mutant_path=mutant_data.get("schemata_path", mutant_path),
+                workspace=workspace,
+                line_number=mutant_data["line_number"],
+                schemata_id=mutant_data.get("schemata_id"),
+            )
+        except Exception as e:
+            return e
+        finally:
+            if materialized is not None:
+                self.mutant_archive.discard(materialized)
+        return MutationTestingError("Mutant test finished without a result")
+
+    def _record_result(self, mutant_data: Dict[str, Any], error: Exception) -> None:
+        # Called from both the preparation and the test stage.
+        with self._results_lock:
+            self._record_result_locked(mutant_data, error)
+
+    def _record_result_locked(
+        self, mutant_data: Dict[str, Any], error: Exception
+    ) -> None:
+        mutant_data["error_msg"] = str(error)
+        if isinstance(error, MutantSurvivedError):
+            mutant_data["status"] = "SURVIVED"
+        elif isinstance(error, MutantKilledError):
+            mutant_data["status"] = "KILLED"
+        elif isinstance(error, MutantTimeoutError):
+            logger.info(f"🕒 Mutant timed out 🕒\n")
+            mutant_data["status"] = "TIMEOUT"
+        elif isinstance(error, SyntaxError):
+            logger.error(str(error))
+            mutant_data["status"] = "SYNTAX_ERROR"
+        elif isinstance(error, UnexpectedTestResultError):
+            logger.error(str(error))
+            mutant_data["status"] = "UNEXPECTED_TEST_ERROR"
+        elif isinstance(error, MutantDuplicateError):
+            logger.info(str(error))
+            mutant_data["status"] = "SKIPPED_DUPLICATE"
+        elif isinstance(error, MutantEquivalentError):
+            logger.info(str(error))
+            mutant_data["status"] = "SKIPPED_EQUIVALENT"
+        else:
+            logger.error(f"Unexpected error processing mutant: {str(error)}")
+            mutant_data["status"] = "ERROR"
+        self._count(mutant_data["status"])
+        if (
+            self.outcome_cache is not None
+            and "outcome_key" in mutant_data
+            and not mutant_data.get("cached")
+        ):
+            self.outcome_cache.put(
+                mutant_data["outcome_key"],
+                source_path=mutant_data["source_path"],
+                line_number=mutant_data.get("line_number"),
+                status=mutant_data["status"],
+                error_msg=mutant_data["error_msg"],
+            )
+        self.journal.record(
+            "result",
+            mutant_id=mutant_data.get("mutant_id"),
+            status=mutant_data["status"],
+            error_msg=mutant_data["error_msg"],
+            mutant_path=mutant_data.get("mutant_path"),
+        )
+
+    def _count(self, status: str) -> None:
+        if status == "SURVIVED":
+            self.survived_mutants += 1
+        elif status == "KILLED":
+            self.killed_mutants += 1
+        elif status == "TIMEOUT":
+            self.timeout_mutants += 1
+        elif status == "SYNTAX_ERROR":
+            self.compile_error_mutants += 1
+        elif status == "UNEXPECTED_TEST_ERROR":
+            self.unexpected_test_error_mutants += 1
+        elif status == "SKIPPED_DUPLICATE":
+            self.duplicate_mutants += 1
+        elif status == "SKIPPED_EQUIVALENT":
+            self.equivalent_mutants += 1
 
     def test_mutant(
         self,
         source_file_path: str,
         mutant_path: str,
+        workspace: Optional[Workspace] = None,
+        line_number: Optional[int] = None,
+        schemata_id: Optional[str] = None,
     ) -> None:
+        test_command = self.mutant_test_command
+        env = {}
+        timeout = self.test_runner.get_timeout()
+        if self.coverage_map is not None and line_number is not None:
+            test_ids = self.coverage_map.select_tests(source_file_path, line_number)
+            if test_ids == []:
+                logger.info(
+                    f"🛡️ Mutant survived: no test executes line {line_number} 🛡️\n"
+                )
+                raise MutantSurvivedError(f"No test executes line {line_number}")
+            if test_ids and self.config.fail_fast:
+                test_ids = self.kill_stats.order(test_ids, self.coverage_map.durations)
+            test_command = self.coverage_map.test_command_for(test_command, test_ids)
+            timeout = self.test_runner.get_timeout(
+                self.coverage_map.estimate_duration(
+                    test_ids, self.test_runner.baseline_duration
+                )
+            )
+        if (
+            self.config.fail_fast
+            and self.kill_stats.kills
+            and split_pytest_command(test_command) is not None
+        ):
+            # Run the tests that killed the most mutants first.
+            test_command, env = with_pytest_plugin(
+                test_command, {"MUTAHUNTER_TEST_ORDER": self.kill_stats.path}
+            )
+        if schemata_id is not None:
+            env = {**env, SCHEMATA_ENV_VAR: schemata_id}
+            logger.debug(f"Switching on mutant {schemata_id} of {mutant_path}")
+            # A workspace builds the schemata on its first mutant.
+            timeout = max(
+                timeout,
+                self.test_runner.get_timeout(self.schemata_durations.get(mutant_path)),
+            )
+        result = self._run_tests(
+            source_file_path, mutant_path, test_command, timeout, env, workspace
+        )
+        self.process_test_result(result)
 
+    def _run_tests(
+        self,
+        source_file_path: str,
+        replacement_path: str,
+        test_command: str,
+        timeout: Optional[float],
+        env: Dict[str, str],
+        workspace: Optional[Workspace] = None,
+    ) -> CompletedProcess:
+        """
+        Runs the tests with the source file replaced, in place or in a workspace.
+        """
+        module_path = source_file_path
+        cwd = os.getcwd()
+        if workspace:
+            module_path = self.workspace_provisioner.make_private(
+                workspace, os.path.relpath(source_file_path)
+            )
+            cwd = workspace.root
         params = {
-            "module_path": source_file_path,
-            "replacement_module_path": mutant_path,
-            "test_command": self.config.test_command,
+            "module_path": module_path,
+            "replacement_module_path": replacement_path,
+            "test_command": test_command,
+            "cwd": cwd,
+            "timeout": timeout,
+            "env": env,
         }
         logger.info(
             f"'{params['test_command']}' - '{params['replacement_module_path']}'"
         )
-        result = self.test_runner.run_test(params)
-        self.process_test_result(result)
+        return self.test_runner.run_test(params)
 
     def process_test_result(self, result: CompletedProcess) -> None:
         if result.returncode == 0:
@@ -145,6 +865,7 @@ class MutationTestController:
         elif result.returncode == 1:
             logger.info(f"🗡️ Mutant killed 🗡️\n")
             logger.info(result.stdout)
+            self.kill_stats.record(parse_failed_tests(result.stdout + result.stderr))
             raise MutantKilledError("Mutant killed by the tests")
         else:
             error_output = result.stderr + result.stdout
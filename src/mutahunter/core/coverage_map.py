@@ -0,0 +1,139 @@
+"""
+Module for per-test line coverage used to select the tests that reach a mutant.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from mutahunter.core.commands import (
+    select_pytest_tests,
+    split_pytest_command,
+    with_pytest_plugin,
+)
+from mutahunter.core.logger import logger
+
+COVERAGE_MAP_PATH = os.path.join("logs", "_latest", "coverage_map.json")
+
+# Selecting more tests than this is not worth a long command line.
+MAX_SELECTED_TESTS = 500
+
+
+class PerTestCoverageMap:
+    """Index from source lines to the tests that execute them."""
+
+    def __init__(
+        self, files: Dict[str, Dict[str, Any]], durations: Dict[str, float]
+    ) -> None:
+        self.lines = {
+            path: {int(line): ids for line, ids in data["lines"].items()}
+            for path, data in files.items()
+        }
+        self.statements = {
+            path: set(data["statements"]) for path, data in files.items()
+        }
+        self.durations = durations
+
+    @classmethod
+    def collect(
+        cls, test_command: str, cwd: Optional[str] = None
+    ) -> Optional["PerTestCoverageMap"]:
+        """
+        Runs the test suite once with per-test coverage enabled.
+
+        Only pytest commands are supported, and coverage.py must be installed in
+        the environment the tests run in.
+
+        Returns:
+            Optional[PerTestCoverageMap]: The coverage map, or None if it could not be built.
+        """
+        if split_pytest_command(test_command) is None:
+            logger.warning(
+                f"Per-test coverage is only supported for pytest commands, not '{test_command}'."
+            )
+            return None
+        cwd = cwd or os.getcwd()
+        output_dir = tempfile.mkdtemp(prefix="mutahunter-coverage-")
+        output_path = os.path.join(output_dir, "coverage.json")
+        command, env = with_pytest_plugin(
+            test_command, {"MUTAHUNTER_COVERAGE_OUTPUT": output_path}
+        )
+        try:
+            result = subprocess.run(
+                command,
+                cwd=cwd,
+                env={**os.environ, **env},
+                shell=True,
+                text=True,
+                capture_output=True,
+            )
+            if result.returncode != 0 or not os.path.exists(output_path):
+                logger.warning(
+                    f"Could not collect per-test coverage (return code: {result.returncode}). "
+                    f"Running the full test command for every mutant.\n{result.stderr}"
+                )
+                return None
+            with open(output_path, "r") as f:
+                data = json.load(f)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(os.path.dirname(COVERAGE_MAP_PATH), exist_ok=True)
+        with open(COVERAGE_MAP_PATH, "w") as f:
+            json.dump(data, f)
+        coverage_map = cls(data["files"], data["durations"])
+        logger.info(
+            f"Per-test coverage collected for {len(data['durations'])} tests "
+            f"and {len(data['files'])} files."
+        )
+        return coverage_map
+
+    def select_tests(self, source_path: str, line_number: int) -> Optional[List[str]]:
+        """
+        Returns the IDs of the tests that execute a line.
+
+        Returns:
+            Optional[List[str]]: The test IDs, an empty list if the line is an
+            executable statement that no test runs, or None if the whole suite
+            has to run (the file or line is unknown, or the line runs on import).
+        """
+        path = os.path.abspath(source_path)
+        if path not in self.lines:
+            return None
+        test_ids = self.lines[path].get(line_number)
+        if test_ids is None:
+            if line_number in self.statements[path]:
+                return []
+            return None
+        if "" in test_ids:
+            return None
+        return sorted(test_ids)
+
+    def test_command_for(self, test_command: str, test_ids: Optional[List[str]]) -> str:
+        """
+        Rewrites the test command to run only the given tests.
+
+        Returns:
+            str: The rewritten command, or the original command if every test has
+            to run.
+        """
+        if not test_ids or len(test_ids) > MAX_SELECTED_TESTS:
+            return test_command
+        return select_pytest_tests(test_command, test_ids) or test_command
+
+    def estimate_duration(
+        self, test_ids: Optional[List[str]], full_duration: Optional[float]
+    ) -> Optional[float]:
+        """
+        Estimates how long a run of the given tests takes from the recorded
+        per-test durations and the wall time of a full run.
+
+        The part of the full run not spent in tests (interpreter start, imports,
+        collection) is added to the selected tests' durations.
+        """
+        if full_duration is None or not test_ids or len(test_ids) > MAX_SELECTED_TESTS:
+            return full_duration
+        startup = max(0.0, full_duration - sum(self.durations.values()))
+        return startup + sum(self.durations.get(test_id, 0.0) for test_id in test_ids)
@@ -0,0 +1,146 @@
+"""
+Module for reading line coverage from Cobertura, JaCoCo and LCOV reports.
+"""
+
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+from mutahunter.core.exceptions import MutationTestingError
+from mutahunter.core.logger import logger
+
+COVERAGE_TYPES = ["auto", "cobertura", "jacoco", "lcov"]
+
+
+class CoverageProcessor:
+    """Line hit counts per file, read from a coverage report."""
+
+    def __init__(self, coverage_report_path: str, coverage_type: str = "auto") -> None:
+        self.coverage_report_path = coverage_report_path
+        self.coverage_type = coverage_type
+        self.files: Dict[str, Dict[int, int]] = {}
+
+    def parse_coverage_report(self) -> Dict[str, Dict[int, int]]:
+        """
+        Parses the coverage report.
+
+        Returns:
+            Dict[str, Dict[int, int]]: For each file named in the report, the hit
+            count of each line the report lists.
+
+        Raises:
+            MutationTestingError: If the report cannot be read or parsed.
+        """
+        coverage_type = self.coverage_type
+        if coverage_type == "auto":
+            coverage_type = self._detect_coverage_type()
+        try:
+            if coverage_type == "cobertura":
+                self.files = self.parse_coverage_report_cobertura()
+            elif coverage_type == "jacoco":
+                self.files = self.parse_coverage_report_jacoco()
+            elif coverage_type == "lcov":
+                self.files = self.parse_coverage_report_lcov()
+            else:
+                raise MutationTestingError(
+                    f"Unsupported coverage type '{coverage_type}'."
+                )
+        except (OSError, ET.ParseError, ValueError) as e:
+            raise MutationTestingError(
+                f"Failed to parse coverage report {self.coverage_report_path}: {e}"
+            )
+        logger.info(
+            f"Read {coverage_type} coverage of {len(self.files)} files from "
+            f"{self.coverage_report_path}."
+        )
+        return self.files
+
+    def _detect_coverage_type(self) -> str:
+        try:
+            with open(self.coverage_report_path, "r", encoding="utf-8") as f:
+                head = f.read(4096)
+        except OSError as e:
+            raise MutationTestingError(
+                f"Failed to read coverage report {self.coverage_report_path}: {e}"
+            )
+        if not head.lstrip().startswith("<"):
+            return "lcov"
+        if "<report" in head or "JACOCO" in head:
+            return "jacoco"
+        return "cobertura"
+
+    def parse_coverage_report_cobertura(self) -> Dict[str, Dict[int, int]]:
+        files: Dict[str, Dict[int, int]] = {}
+        root = ET.parse(self.coverage_report_path).getroot()
+        for cls in root.iter("class"):
+            lines = files.setdefault(cls.get("filename"), {})
+            for line in cls.iter("line"):
+                number = int(line.get("number"))
+                lines[number] = max(lines.get(number, 0), int(line.get("hits", 0)))
+        return files
+
+    def parse_coverage_report_jacoco(self) -> Dict[str, Dict[int, int]]:
+        files: Dict[str, Dict[int, int]] = {}
+        root = ET.parse(self.coverage_report_path).getroot()
+        for package in root.iter("package"):
+            for sourcefile in package.iter("sourcefile"):
+                filename = f"{package.get('name')}/{sourcefile.get('name')}"
+                lines = files.setdefault(filename, {})
+                for line in sourcefile.iter("line"):
+                    # Covered instructions; a line with none was not executed.
+                    lines[int(line.get("nr"))] = int(line.get("ci", 0))
+        return files
+
+    def parse_coverage_report_lcov(self) -> Dict[str, Dict[int, int]]:
+        files: Dict[str, Dict[int, int]] = {}
+        lines: Dict[int, int] = {}
+        with open(self.coverage_report_path, "r", encoding="utf-8") as f:
+            for raw_line in f:
+                raw_line = raw_line.strip()
+                if raw_line.startswith("SF:"):
+                    lines = files.setdefault(raw_line[3:], {})
+                elif raw_line.startswith("DA:"):
+                    number, hits = raw_line[3:].split(",")[:2]
+                    lines[int(number)] = max(lines.get(int(number), 0), int(hits))
+        return files
+
+    def line_hits(self, source_file_path: str) -> Optional[Dict[int, int]]:
+        """
+        Returns the line hit counts of a source file.
+
+        Report paths are often relative to a source root or package, so the file
+        whose path shares the longest trailing sequence of path components with
+        the source file is used.
+
+        Returns:
+            Optional[Dict[int, int]]: The hit count of each line, or None if the
+            report does not name the file.
+        """
+        source_parts = _path_parts(source_file_path)
+        best = None
+        best_length = 0
+        for filename, lines in self.files.items():
+            length = _common_suffix_length(source_parts, _path_parts(filename))
+            if length > best_length:
+                best, best_length = lines, length
+        return best
+
+    def executed_lines(self, source_file_path: str) -> Optional[List[int]]:
+        """Returns the lines of a source file that ran at least once."""
+        hits = self.line_hits(source_file_path)
+        if hits is None:
+            return None
+        return sorted(line for line, count in hits.items() if count > 0)
+
+
+def _path_parts(path: str) -> List[str]:
+    return [
+        part for part in os.path.normpath(path).replace("\\", "/").split("/") if part
+    ]
+
+
+def _common_suffix_length(a: List[str], b: List[str]) -> int:
+    length = 0
+    while length < min(len(a), len(b)) and a[-1 - length] == b[-1 - length]:
+        length += 1
+    return length
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 
 @dataclass
@@ -10,3 +10,34 @@ class MutationTestControllerConfig:
     api_base: str
     test_command: str
     exclude_files: List[str]
+    workers: int = 1
+    workspace_mode: str = "auto"
+    workspace_dir: Optional[str] = None
+    warm_test_worker: bool = False
+    select_tests: bool = False
+    timeout_multiplier: float = 2.0
+    timeout_floor: float = 5.0
+    fail_fast: bool = False
+    schemata: bool = False
+    import_hook: bool = False
+    resume: bool = False
+    diff_base: Optional[str] = None
+    outcome_cache: bool = True
+    cache_inputs: Optional[List[str]] = None
+    cache_max_entries: int = 100_000
+    llm_cache: bool = True
+    llm_cache_ttl: float = 7 * 24 * 3600
+    llm_cache_max_entries: int = 10_000
+    llm_concurrency: int = 4
+    max_prompt_lines: int = 300
+    output_format: str = "yaml"
+    engine: str = "llm"
+    coverage_report: Optional[str] = None
+    coverage_type: str = "auto"
+    block_index: bool = True
+    max_cost: Optional[float] = None
+    max_tokens: Optional[int] = None
+    llm_requests_per_minute: Optional[float] = None
+    llm_tokens_per_minute: Optional[int] = None
+    llm_max_retries: int = 5
+    llm_retry_budget: int = 50
@@ -6,6 +6,10 @@ class MutantKilledError(Exception):
     pass
 
 
+class MutantTimeoutError(Exception):
+    pass
+
+
 
 class MutationTestingError(Exception):
     pass
@@ -17,3 +21,23 @@ class ReportGenerationError(Exception):
 
 class UnexpectedTestResultError(Exception):
     pass
+
+
+class WarmWorkerError(Exception):
+    pass
+
+
+class MutantDuplicateError(Exception):
+    pass
+
+
+class MutantEquivalentError(Exception):
+    pass
+
+
+class BudgetExceededError(Exception):
+    pass
+
+
+class LLMRequestError(Exception):
+    pass
@@ -0,0 +1,115 @@
+"""
+Module for finding the lines of a source file that changed since a git revision.
+"""
+
+import os
+import re
+import subprocess
+import time
+from typing import List, Optional, Set, Tuple
+
+from mutahunter.core.exceptions import MutationTestingError
+
+# "@@ -12,3 +14,5 @@": the new side of a hunk starts at 14 and spans 5 lines.
+HUNK_HEADER_PATTERN = re.compile(
+    r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@", re.MULTILINE
+)
+
+
+def _git(args: List[str], cwd: str) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, text=True, capture_output=True)
+
+
+def changed_lines(source_file_path: str, base: str) -> Optional[Set[int]]:
+    """
+    Returns the lines of a file in the working tree that differ from a revision.
+
+    The file is compared to the merge base of the revision and ``HEAD``, like a
+    pull request, so changes that landed on the base branch in the meantime are
+    not counted. A line where lines were only deleted counts as changed together
+    with the line after it.
+
+    Args:
+        source_file_path (str): The path of the file.
+        base (str): The git revision to compare to, e.g. ``origin/main``.
+
+    Returns:
+        Optional[Set[int]]: The changed line numbers, or None if the file is new
+        and every line counts as changed.
+
+    Raises:
+        MutationTestingError: If git fails, e.g. the revision does not exist.
+    """
+    cwd = os.path.dirname(os.path.abspath(source_file_path))
+    name = os.path.basename(source_file_path)
+    merge_base = _git(["merge-base", base, "HEAD"], cwd)
+    revision = merge_base.stdout.strip() if merge_base.returncode == 0 else base
+    if _git(["cat-file", "-e", f"{revision}:./{name}"], cwd).returncode != 0:
+        if _git(["rev-parse", "--verify", "--quiet", revision], cwd).returncode != 0:
+            raise MutationTestingError(f"Unknown git revision '{base}'.")
+        return None
+    diff = _git(
+        ["diff", "-U0", "--no-color", "--no-ext-diff", revision, "--", name], cwd
+    )
+    if diff.returncode != 0:
+        raise MutationTestingError(f"git diff failed: {diff.stderr.strip()}")
+    return parse_changed_lines(diff.stdout)
+
+
+def parse_changed_lines(diff: str) -> Set[int]:
+    """Returns the new-side line numbers touched by the hunks of a ``-U0`` diff."""
+    lines = set()
+    for match in HUNK_HEADER_PATTERN.finditer(diff):
+        start = int(match.group(1))
+        count = int(match.group(2)) if match.group(2) is not None else 1
+        if count == 0:
+            # Pure deletion after line `start`.
+            lines.update(line for line in (start, start + 1) if line > 0)
+        else:
+            lines.update(range(start, start + count))
+    return lines
+
+
+def last_change_time(source_file_path: str) -> Optional[float]:
+    """
+    Returns when a file last changed: now if it has uncommitted changes or was
+    never committed, otherwise the time of the last commit that touched it.
+
+    Returns:
+        Optional[float]: A Unix timestamp, or None if the file is not in a git
+        repository.
+    """
+    cwd = os.path.dirname(os.path.abspath(source_file_path))
+    name = os.path.basename(source_file_path)
+    log = _git(["log", "-1", "--format=%ct", "--", name], cwd)
+    if log.returncode != 0:
+        return None
+    status = _git(["status", "--porcelain", "--", name], cwd)
+    if status.stdout.strip() or not log.stdout.strip():
+        return time.time()
+    return float(log.stdout.strip())
+
+
+def merge_line_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merges overlapping or adjacent inclusive line ranges."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def intersect_line_ranges(
+    a: List[Tuple[int, int]], b: List[Tuple[int, int]]
+) -> List[Tuple[int, int]]:
+    """Returns the lines in both sets of inclusive line ranges, as merged ranges."""
+    return merge_line_ranges(
+        [
+            (max(start_a, start_b), min(end_a, end_b))
+            for start_a, end_a in a
+            for start_b, end_b in b
+            if max(start_a, start_b) <= min(end_a, end_b)
+        ]
+    )
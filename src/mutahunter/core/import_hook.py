@@ -0,0 +1,118 @@
+"""
+Import hook that serves a mutant's source to the test process in place of the
+original module, so the source file on disk is never modified.
+
+The file is copied next to the logs as ``sitecustomize.py`` and that directory
+is put on ``PYTHONPATH``, so every Python process the test command starts
+installs the hook at startup. It may only depend on the standard library. The
+hook is configured by environment variables:
+
+``MUTAHUNTER_MUTANT_TARGET``
+    Absolute path of the module to replace.
+
+``MUTAHUNTER_MUTANT_SOURCE``
+    Path of the mutant's source.
+
+``MUTAHUNTER_IMPORT_HOOK_STATUS``
+    Optional path the hook appends ``installed`` to when it is set up and
+    ``served`` to when it loads the mutant, so the caller can tell whether the
+    hook was active.
+
+A ``sitecustomize`` module that the hook shadows is still run afterwards.
+"""
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+TARGET_ENV_VAR = "MUTAHUNTER_MUTANT_TARGET"
+SOURCE_ENV_VAR = "MUTAHUNTER_MUTANT_SOURCE"
+STATUS_ENV_VAR = "MUTAHUNTER_IMPORT_HOOK_STATUS"
+
+
+def _report(status: str) -> None:
+    path = os.environ.get(STATUS_ENV_VAR)
+    if not path:
+        return
+    try:
+        with open(path, "a") as f:
+            f.write(status + "\n")
+    except OSError:
+        pass
+
+
+class MutantLoader(importlib.machinery.SourceFileLoader):
+    """Loads the mutant's source under the original module's path."""
+
+    def __init__(self, fullname: str, path: str, mutant_path: str) -> None:
+        super().__init__(fullname, path)
+        self.mutant_path = mutant_path
+
+    def get_data(self, path):
+        if os.path.abspath(path) == os.path.abspath(self.path):
+            with open(self.mutant_path, "rb") as f:
+                return f.read()
+        return super().get_data(path)
+
+    def get_code(self, fullname):
+        # Compile from source every time: the bytecode cache belongs to the original.
+        _report("served")
+        source = self.get_data(self.path)
+        return compile(source, self.path, "exec", dont_inherit=True)
+
+    def set_data(self, path, data, *, _mode=0o666):
+        pass
+
+
+class MutantFinder:
+    """Finds modules like the default path finder, but loads the target from the mutant."""
+
+    def __init__(self, target: str, mutant_path: str) -> None:
+        self.target = os.path.normcase(os.path.abspath(target))
+        self.mutant_path = mutant_path
+
+    def find_spec(self, fullname, path=None, target=None):
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is None or not spec.origin:
+            return None
+        if os.path.normcase(os.path.abspath(spec.origin)) != self.target:
+            return None
+        spec.loader = MutantLoader(fullname, spec.origin, self.mutant_path)
+        return spec
+
+    def invalidate_caches(self):
+        pass
+
+
+def install() -> None:
+    """Installs the hook if the environment names a target and a mutant."""
+    target = os.environ.get(TARGET_ENV_VAR)
+    mutant_path = os.environ.get(SOURCE_ENV_VAR)
+    if not target or not mutant_path:
+        return
+    for finder in sys.meta_path:
+        if isinstance(finder, MutantFinder):
+            sys.meta_path.remove(finder)
+            break
+    sys.meta_path.insert(0, MutantFinder(target, mutant_path))
+    _report("installed")
+
+
+def _run_shadowed_sitecustomize() -> None:
+    here = os.path.normcase(os.path.dirname(os.path.abspath(__file__)))
+    search_path = [
+        path
+        for path in sys.path
+        if os.path.normcase(os.path.abspath(path or os.curdir)) != here
+    ]
+    spec = importlib.machinery.PathFinder.find_spec("sitecustomize", search_path)
+    if spec is None or spec.loader is None:
+        return
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+
+if __name__ == "sitecustomize":
+    install()
+    _run_shadowed_sitecustomize()
@@ -1,9 +1,21 @@
+import fnmatch
+import glob
+import hashlib
 import os
-from typing import Any, Dict, List, Optional
-from uuid import uuid4
+import queue
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
-from mutahunter.core.parsers import filename_to_lang
-from tree_sitter_languages import   get_parser
+from mutahunter.core.logger import logger
+from mutahunter.core.mutant_archive import MutantArchive, SourceLines, source_lines
+from mutahunter.core.parsers import filename_to_lang, get_cached_parser
+from mutahunter.core.schemata import SchemataBuilder
+from mutahunter.core.syntax_checker import syntax_checker
 
 TEST_FILE_PATTERNS = [
     "test_",
@@ -16,6 +28,18 @@ TEST_FILE_PATTERNS = [
     "test/",
 ]
 
+# Directories never searched for source files.
+SKIPPED_SOURCE_DIRECTORIES = {
+    "logs",
+    "node_modules",
+    "__pycache__",
+    "venv",
+    "build",
+    "dist",
+    "target",
+    "vendor",
+}
+
 
 class FileOperationHandler:
     @staticmethod
@@ -35,28 +59,178 @@ class FileOperationHandler:
 
     @staticmethod
     def prepare_mutant_file(
-        mutant_data: Dict[str, Any], source_file_path: str
+        mutant_data: Dict[str, Any],
+        source_file_path: str,
+        archive: Optional[MutantArchive] = None,
     ) -> Optional[str]:
-        mutant_id = str(uuid4())[:8]
+        """
+        Syntax checks a mutant and stores it under its mutant path.
+
+        With an archive, only the mutated line is stored, as a patch against the
+        archive's copy of the source file, and the mutant file is written by
+        `MutantArchive.materialize` when a test run needs it.
+
+        Returns:
+            Optional[str]: The mutant path.
+        """
+        if archive is None:
+            source = source_lines(FileOperationHandler.read_file(source_file_path))
+        else:
+            source = archive.source(source_file_path)
+        line_number = mutant_data["line_number"]
+        mutated_line = FileOperationHandler.mutated_line(source, mutant_data)
+        # Name the mutant after its content so reruns produce the same files.
+        mutant_id = hashlib.sha256(
+            f"{source.digest}:{line_number}:{mutated_line}".encode("utf8")
+        ).hexdigest()[:8]
         mutant_path = FileOperationHandler.get_mutant_path(source_file_path, mutant_id)
-        source_code = FileOperationHandler.read_file(source_file_path)
-        applied_mutant = FileOperationHandler.apply_mutation(source_code, mutant_data)
-        if not FileOperationHandler.check_syntax(source_file_path, applied_mutant):
+        applied_mutant = source.replace(line_number, mutated_line)
+        # Only the mutated line is re-parsed; the original's tree is kept per thread.
+        checker = syntax_checker(source_file_path, source.source_code)
+        if not checker.check(applied_mutant, line_number):
             raise SyntaxError("Mutant syntax is incorrect.")
-        FileOperationHandler.write_file(mutant_path, applied_mutant)
+        if archive is None:
+            FileOperationHandler.write_file(mutant_path, applied_mutant)
+        else:
+            archive.add(mutant_path, source, line_number, mutated_line)
         return mutant_path
 
+    @staticmethod
+    def prepare_schemata_file(
+        mutants: List[Dict[str, Any]],
+        source_file_path: str,
+        archive: Optional[MutantArchive] = None,
+    ) -> Optional[str]:
+        """
+        Writes one variant of the source file that contains all mutants that can be
+        switched on at runtime.
+
+        Each included mutant gets a ``schemata_id``; the others are left to be
+        tested one file at a time. The source is read from the archive's copy if
+        there is one.
+
+        Returns:
+            Optional[str]: The path of the schemata file, or None if no mutant fits.
+        """
+        if not SchemataBuilder.supports(source_file_path):
+            return None
+        if archive is None:
+            source_code = FileOperationHandler.read_file(source_file_path)
+        else:
+            source_code = archive.source(source_file_path).source_code
+        schemata, included = SchemataBuilder(source_file_path).build(
+            source_code, mutants
+        )
+        if schemata is None:
+            return None
+        # Named after its content, so schematas of files with the same name do
+        # not overwrite each other.
+        schemata_id = hashlib.sha256(schemata.encode("utf8")).hexdigest()[:8]
+        schemata_path = FileOperationHandler.get_mutant_path(
+            source_file_path, f"schemata-{schemata_id}"
+        )
+        FileOperationHandler.write_file(schemata_path, schemata)
+        return schemata_path
+
     @staticmethod
     def should_skip_file(
-        filename: str, exclude_files: List[str], only_mutate_file_paths: List[str]
+        filename: str,
+        exclude_files: List[str],
+        only_mutate_file_paths: Optional[List[str]] = None,
     ) -> bool:
+        """
+        Checks whether a file found while searching for source files is skipped.
+
+        Args:
+            filename (str): The path of the file.
+            exclude_files (List[str]): Paths or glob patterns of excluded files.
+            only_mutate_file_paths (Optional[List[str]]): If given, every other file
+                is skipped.
+
+        Returns:
+            bool: True for excluded files and test files.
+        """
         if only_mutate_file_paths:
             for file_path in only_mutate_file_paths:
                 if not os.path.exists(file_path):
                     raise FileNotFoundError(f"File {file_path} does not exist.")
-            return all(file_path != filename for file_path in only_mutate_file_paths)
-        if filename in exclude_files:
-            return True
+            return all(
+                os.path.normpath(file_path) != os.path.normpath(filename)
+                for file_path in only_mutate_file_paths
+            )
+        path = os.path.normpath(filename)
+        for pattern in exclude_files or []:
+            if path == os.path.normpath(pattern) or fnmatch.fnmatch(path, pattern):
+                return True
+        return FileOperationHandler.is_test_file(path)
+
+    @staticmethod
+    def is_test_file(filename: str) -> bool:
+        """
+        Checks the file name and directories of a file against TEST_FILE_PATTERNS.
+        """
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        directories = os.path.normpath(os.path.dirname(filename)).split(os.sep)
+        for pattern in TEST_FILE_PATTERNS:
+            if pattern.endswith("/"):
+                if pattern[:-1] in directories:
+                    return True
+            elif pattern.startswith("test"):
+                if stem.startswith(pattern):
+                    return True
+            elif stem.endswith(pattern):
+                return True
+        return False
+
+    @staticmethod
+    def iter_source_files(
+        source_path: str, exclude_files: Optional[List[str]] = None
+    ) -> Iterator[str]:
+        """
+        Lazily finds the source files to mutate.
+
+        Args:
+            source_path (str): A file, a directory (searched recursively) or a glob
+                pattern. A file named directly is never skipped.
+            exclude_files (Optional[List[str]]): Paths or glob patterns of files to
+                skip.
+
+        Yields:
+            str: Paths of source files in a supported language, in sorted order
+            within each directory. Test files are skipped.
+        """
+        if os.path.isfile(source_path):
+            yield source_path
+            return
+        matches = (
+            [source_path]
+            if os.path.isdir(source_path)
+            else glob.iglob(source_path, recursive=True)
+        )
+        for match in matches:
+            if os.path.isdir(match):
+                for directory, dirnames, filenames in os.walk(match):
+                    dirnames[:] = sorted(
+                        d
+                        for d in dirnames
+                        if d not in SKIPPED_SOURCE_DIRECTORIES and not d.startswith(".")
+                    )
+                    for name in sorted(filenames):
+                        path = os.path.normpath(os.path.join(directory, name))
+                        if FileOperationHandler._is_source_file(path, exclude_files):
+                            yield path
+            elif FileOperationHandler._is_source_file(match, exclude_files):
+                yield match
+
+    @staticmethod
+    def _is_source_file(path: str, exclude_files: Optional[List[str]]) -> bool:
+        return (
+            os.path.isfile(path)
+            and os.path.getsize(path) > 0
+            and filename_to_lang(path) is not None
+            and not path.endswith(".bak")
+            and not FileOperationHandler.should_skip_file(path, exclude_files or [])
+        )
 
     @staticmethod
     def check_syntax(source_file_path: str, source_code: str) -> bool:
@@ -69,20 +243,302 @@ class FileOperationHandler:
         Returns:
             bool: True if the syntax is correct, False otherwise.
         """
-        lang = filename_to_lang(source_file_path)
-        parser = get_parser(lang)
+        parser = get_cached_parser(filename_to_lang(source_file_path))
         tree = parser.parse(bytes(source_code, "utf8"))
         return not tree.root_node.has_error
 
+    @staticmethod
+    def code_tokens(source_file_path: str, code: str) -> Tuple[str, ...]:
+        """
+        Splits code into tokens with the same parser as `check_syntax`, leaving out
+        comments and whitespace.
+
+        Args:
+            source_file_path (str): The file the code belongs to, for its language.
+            code (str): The code, e.g. a single line.
+
+        Returns:
+            Tuple[str, ...]: The text of each token. Text inside a node that is not
+            part of a child node, such as the contents of some string literals, is
+            kept as it is.
+        """
+        source = bytes(code, "utf8")
+        tree = get_cached_parser(filename_to_lang(source_file_path)).parse(source)
+        tokens: List[str] = []
+
+        def add_text(start: int, end: int) -> None:
+            text = source[start:end]
+            if text.strip():
+                tokens.append(text.decode("utf8", "replace"))
+
+        def visit(node) -> None:
+            if "comment" in node.type:
+                return
+            if not node.children:
+                add_text(node.start_byte, node.end_byte)
+                return
+            position = node.start_byte
+            for child in node.children:
+                add_text(position, child.start_byte)
+                visit(child)
+                position = max(position, child.end_byte)
+            add_text(position, node.end_byte)
+
+        visit(tree.root_node)
+        return tuple(tokens)
+
+    @staticmethod
+    def mutated_line(source: SourceLines, mutant_data: Dict[str, Any]) -> str:
+        """Returns the line a mutant replaces its line with, indented like it."""
+        original_line = source.line(mutant_data["line_number"])
+        indentation = len(original_line) - len(original_line.lstrip())
+        return " " * indentation + mutant_data["mutated_code"].strip() + "\n"
+
     @staticmethod
     def apply_mutation(source_code: str, mutant_data: Dict[str, Any]) -> str:
-        src_code_lines = source_code.splitlines(keepends=True)
-        mutated_line = mutant_data["mutated_code"].strip()
-        line_number = mutant_data["line_number"]
+        # The split of the source is shared by all mutants of the file.
+        source = source_lines(source_code)
+        return source.replace(
+            mutant_data["line_number"],
+            FileOperationHandler.mutated_line(source, mutant_data),
+        )
+
+
+# ioctl request number for FICLONE on Linux (btrfs, xfs, ...).
+FICLONE = 0x40049409
+
+LINK_MODES = ["auto", "reflink", "hardlink", "copy"]
+
+# Installed dependencies, symlinked into workspaces as a whole instead of
+# being linked or copied file by file.
+DEPENDENCY_DIRECTORIES = {"node_modules", "venv", ".venv", "vendor"}
+
+
+class Workspace:
+    """A worker copy of the project tree."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.private_paths: Set[str] = set()
 
-        indentation = len(src_code_lines[line_number - 1]) - len(
-            src_code_lines[line_number - 1].lstrip()
+    def path(self, relative_path: str) -> str:
+        return os.path.join(self.root, relative_path)
+
+
+class WorkspaceProvisioner:
+    """
+    Builds and pools worker copies of a project tree.
+
+    Files are reflinked into each workspace where the file system supports it,
+    so that building one costs about as much as creating the directory entries.
+    Without reflinks, read-only files are hardlinked and the rest are copied.
+    Dependency directories (``node_modules``, virtualenvs, ``vendor``) are
+    symlinked as a whole unless the ``copy`` mode is asked for. Workspaces are
+    reset and reused between mutants instead of being rebuilt.
+
+    The ``hardlink`` mode, which hardlinks writable files as well, is only used
+    when asked for: hardlinked files share their content with the project, so
+    a test command that rewrites a file in place (a cache, coverage data, a
+    fixture) changes the project and every other workspace. Only files that
+    are about to be mutated are turned into real copies.
+    """
+
+    def __init__(
+        self,
+        project_root: str,
+        size: int = 1,
+        link_mode: str = "auto",
+        base_dir: Optional[str] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> None:
+        if link_mode not in LINK_MODES:
+            raise ValueError(
+                f"Unknown link mode '{link_mode}'. Expected one of {LINK_MODES}."
+            )
+        self.project_root = os.path.abspath(project_root)
+        self.size = size
+        self.link_mode = link_mode
+        self.base_dir = base_dir or tempfile.gettempdir()
+        self.exclude = exclude if exclude is not None else ["logs"]
+        self._ready: queue.Queue = queue.Queue()
+        self._workspaces: List[Workspace] = []
+        self._lock = threading.Lock()
+        # Hardlinks are never picked automatically; see the class docstring.
+        self._modes = ["reflink", "copy"]
+        if link_mode != "auto":
+            self._modes = [link_mode]
+
+    def __enter__(self) -> "WorkspaceProvisioner":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def acquire(self) -> Workspace:
+        """
+        Returns a ready workspace, building a new one while the pool is not full.
+        """
+        try:
+            return self._ready.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            build = len(self._workspaces) < self.size
+            if build:
+                workspace = Workspace(
+                    tempfile.mkdtemp(prefix="mutahunter-ws-", dir=self.base_dir)
+                )
+                self._workspaces.append(workspace)
+        if build:
+            self._build(workspace)
+            return workspace
+        return self._ready.get()
+
+    def release(self, workspace: Workspace) -> None:
+        """
+        Resets a workspace to the project state and returns it to the pool.
+        """
+        self.reset(workspace)
+        self._ready.put(workspace)
+
+    def reset(self, workspace: Workspace) -> None:
+        for relative_path in workspace.private_paths:
+            path = workspace.path(relative_path)
+            backup_path = f"{path}.bak"
+            if os.path.exists(backup_path):
+                os.remove(backup_path)
+            original = os.path.join(self.project_root, relative_path)
+            if not self._same_content(original, path):
+                shutil.copy2(original, path)
+
+    def make_private(self, workspace: Workspace, relative_path: str) -> str:
+        """
+        Replaces a linked file in the workspace with a real copy so it can be
+        modified without touching the project.
+
+        Returns:
+            str: The path of the file inside the workspace.
+        """
+        path = workspace.path(relative_path)
+        if relative_path not in workspace.private_paths:
+            if os.path.lexists(path):
+                os.remove(path)
+            shutil.copy2(os.path.join(self.project_root, relative_path), path)
+            workspace.private_paths.add(relative_path)
+        return path
+
+    def close(self) -> None:
+        for workspace in self._workspaces:
+            shutil.rmtree(workspace.root, ignore_errors=True)
+        self._workspaces = []
+        self._ready = queue.Queue()
+
+    def _build(self, workspace: Workspace) -> None:
+        start = time.time()
+        linked = copied = 0
+        share_dependencies = self.link_mode != "copy"
+        base_dir = os.path.abspath(self.base_dir)
+        for directory, dirnames, filenames in os.walk(self.project_root):
+            relative_dir = os.path.relpath(directory, self.project_root)
+            if relative_dir == os.curdir:
+                relative_dir = ""
+                dirnames[:] = [name for name in dirnames if name not in self.exclude]
+            for name in list(dirnames):
+                source = os.path.join(directory, name)
+                target = workspace.path(os.path.join(relative_dir, name))
+                if os.path.islink(source):
+                    os.symlink(os.readlink(source), target)
+                    dirnames.remove(name)
+                elif os.path.abspath(source) == base_dir:
+                    dirnames.remove(name)
+                elif share_dependencies and self._is_dependency_directory(source):
+                    os.symlink(os.path.abspath(source), target)
+                    dirnames.remove(name)
+                else:
+                    os.mkdir(target)
+            for name in filenames:
+                source = os.path.join(directory, name)
+                target = workspace.path(os.path.join(relative_dir, name))
+                if os.path.islink(source):
+                    os.symlink(os.readlink(source), target)
+                elif self._link(source, target):
+                    linked += 1
+                else:
+                    copied += 1
+        logger.debug(
+            f"Workspace {workspace.root} built in {time.time() - start:.2f}s "
+            f"({linked} files linked, {copied} copied)."
         )
-        src_code_lines[line_number - 1] = " " * indentation + mutated_line + "\n"
 
-        return "".join(src_code_lines)
+    def _link(self, source: str, target: str) -> bool:
+        """
+        Links a file into a workspace with the first mode that works.
+
+        Returns:
+            bool: True if the file shares storage with the project, False if it was copied.
+        """
+        with self._lock:
+            modes = list(self._modes)
+        if (
+            self.link_mode == "auto"
+            and modes[0] != "reflink"
+            and self._is_read_only(source)
+        ):
+            # Nothing writes to a read-only file in place, so sharing it is safe.
+            try:
+                os.link(source, target)
+                return True
+            except OSError:
+                pass
+        for mode in modes:
+            try:
+                if mode == "reflink":
+                    self._reflink(source, target)
+                elif mode == "hardlink":
+                    os.link(source, target)
+                else:
+                    shutil.copy2(source, target)
+                return mode != "copy"
+            except OSError:
+                if os.path.lexists(target):
+                    os.remove(target)
+                if mode == modes[-1]:
+                    raise
+                # Link modes fail for the whole file system, not just one file.
+                with self._lock:
+                    if mode in self._modes:
+                        self._modes.remove(mode)
+        raise OSError(f"Could not provision {source} into {target}.")
+
+    @staticmethod
+    def _reflink(source: str, target: str) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("Reflinks are only supported on Linux.")
+        import fcntl
+
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, target)
+
+    @staticmethod
+    def _is_dependency_directory(path: str) -> bool:
+        return os.path.basename(path) in DEPENDENCY_DIRECTORIES or os.path.isfile(
+            os.path.join(path, "pyvenv.cfg")
+        )
+
+    @staticmethod
+    def _is_read_only(path: str) -> bool:
+        return not os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+    @staticmethod
+    def _same_content(original: str, copy: str) -> bool:
+        if not os.path.exists(copy):
+            return False
+        if os.path.getsize(original) != os.path.getsize(copy):
+            return False
+        # Sizes and mtimes can match after an edit, so compare the bytes. Only
+        # the few files a mutant touched are compared.
+        with open(original, "rb") as f:
+            original_content = f.read()
+        with open(copy, "rb") as f:
+            return f.read() == original_content
@@ -0,0 +1,171 @@
+"""
+Module for the append-only journal that makes runs resumable.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from mutahunter.core.logger import logger
+
+JOURNAL_PATH = os.path.join("logs", "_latest", "journal.jsonl")
+
+
+class RunJournal:
+    """
+    Records a run as it happens, one JSON event per line.
+
+    Every event is flushed and synced to disk before the run moves on, so after
+    a crash the journal holds every mutant that was generated and every result
+    that was reported. A line torn by the crash is ignored when the journal is
+    read back.
+
+    Events:
+        ``run``: the source file, its content hash and the test command.
+        ``mutants``: the generated mutants and the cost of generating them.
+        ``result``: the status of one mutant, by ``mutant_id``.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH) -> None:
+        self.path = os.path.abspath(path)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self, resume: bool = False) -> None:
+        """Opens the journal, appending to it on resume and starting over otherwise."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+            if torn:
+                # Keep the next event off the line a crash left unfinished.
+                self._file.write("\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(self, event: str, **data: Any) -> None:
+        """Appends an event and syncs it to disk."""
+        if self._file is None:
+            return
+        line = json.dumps({"event": event, "time": time.time(), **data}, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def read(self) -> List[Dict[str, Any]]:
+        """Returns the events recorded so far."""
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Ignoring incomplete journal line {number}.")
+        return events
+
+    def load_run(self, source_path: str, test_command: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the state of the journaled run of a source file.
+
+        Mutants are journaled in batches, one per generation request or, when the
+        response is streamed, one per mutant followed by a ``complete`` batch. The
+        mutants of a request that did not complete and batches of a source file
+        that changed since are left out, so they are generated again.
+
+        Args:
+            source_path (str): The source path of the run: a file, directory or
+                glob pattern.
+            test_command (str): The test command of the run.
+
+        Returns:
+            Optional[Dict[str, Any]]: ``mutants`` (with the status of finished ones
+            restored), the ``requests`` that were generated as ``[source_path,
+            line_ranges]`` pairs, ``cost`` and the ``last_mutant_id`` handed out,
+            or None if there is nothing to resume.
+        """
+        events = self.read()
+        runs = [event for event in events if event["event"] == "run"]
+        if not runs:
+            return None
+        run = runs[-1]
+        if run["source_path"] != source_path or run["test_command"] != test_command:
+            logger.warning(
+                "The journal belongs to a run of a different source file or test command."
+            )
+            return None
+        if "source_hash" in run and run["source_hash"] != file_hash(source_path):
+            logger.warning(f"{source_path} changed since the journaled run.")
+            return None
+        mutants = None
+        requests = []
+        cost = 0.0
+        last_mutant_id = 0
+        results = {}
+        hashes: Dict[str, Optional[str]] = {}
+        streamed: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            if event["event"] == "mutants":
+                batch_path = event["source_path"]
+                if batch_path not in hashes:
+                    hashes[batch_path] = (
+                        file_hash(batch_path) if os.path.isfile(batch_path) else None
+                    )
+                cost = event.get("cost", 0.0)
+                for mutant_data in event["mutants"]:
+                    mutant_data.setdefault("source_path", batch_path)
+                    last_mutant_id = max(last_mutant_id, int(mutant_data["mutant_id"]))
+                if event.get("source_hash", hashes[batch_path]) != hashes[batch_path]:
+                    logger.warning(f"{batch_path} changed since the journaled run.")
+                    continue
+                request = [batch_path, event.get("line_ranges")]
+                batch = streamed.setdefault(json.dumps(request), [])
+                batch.extend(event["mutants"])
+                if not event.get("complete", True):
+                    continue
+                del streamed[json.dumps(request)]
+                mutants = (mutants or []) + batch
+                requests.append(request)
+            elif event["event"] == "result":
+                results[event["mutant_id"]] = event
+        if mutants is None:
+            return None
+        for mutant_data in mutants:
+            result = results.get(mutant_data["mutant_id"])
+            if result is not None:
+                mutant_data["status"] = result["status"]
+                mutant_data["error_msg"] = result.get("error_msg", "")
+                mutant_data["mutant_path"] = result.get("mutant_path")
+        return {
+            "mutants": mutants,
+            "requests": requests,
+            "cost": cost,
+            "last_mutant_id": last_mutant_id,
+        }
+
+    def source_paths(self) -> List[str]:
+        """Returns the source files that have journaled mutants."""
+        return list(
+            dict.fromkeys(
+                event["source_path"]
+                for event in self.read()
+                if event["event"] == "mutants"
+            )
+        )
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
@@ -0,0 +1,161 @@
+"""
+Module for reading compact JSON mutants out of an LLM response, tolerating
+whatever the model wraps them in or leaves unfinished.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from mutahunter.core.logger import logger
+
+# The JSON schema of a response in the compact output format.
+COMPACT_MUTANTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "mutants": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "line": {"type": "integer"},
+                    "replacement": {"type": "string"},
+                    "operator": {"type": "string"},
+                },
+                "required": ["line", "replacement", "operator"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["mutants"],
+    "additionalProperties": False,
+}
+
+
+def compact_to_mutant(record: Any) -> Optional[Dict[str, Any]]:
+    """
+    Converts a compact record into the mutant the rest of the run works with, or
+    returns None if it is not one. The keys of the YAML format are accepted too.
+    """
+    if not isinstance(record, dict):
+        return None
+    line = record.get("line", record.get("line_number"))
+    replacement = record.get("replacement", record.get("mutated_code"))
+    if isinstance(line, str) and line.strip().isdigit():
+        line = int(line)
+    if isinstance(line, bool) or not isinstance(line, int):
+        return None
+    if not isinstance(replacement, str) or not replacement.strip():
+        return None
+    mutant = {"line_number": line, "mutated_code": replacement}
+    operator = record.get("operator", record.get("type"))
+    if operator:
+        mutant["type"] = str(operator)
+    return mutant
+
+
+class CompactMutantParser:
+    """
+    Incrementally parses the mutants of a response in the compact output format.
+
+    Text is fed in as it arrives. Every JSON object directly inside an array is a
+    mutant, so ``{"mutants": [...]}``, a bare list and a list wrapped in code
+    fences or prose are all read the same way. An object is returned as soon as
+    its closing brace arrives. Objects that are not valid JSON are read as YAML
+    flow mappings, which forgives trailing commas and unquoted keys; objects that
+    still cannot be read, including one cut off at the end of the response, are
+    counted in ``errors`` and skipped. No second LLM call is needed to repair a
+    response.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.errors = 0
+        # Open brackets and braces, innermost last.
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._item: Optional[List[str]] = None
+        # Open brackets and braces outside of the mutant being read.
+        self._item_depth = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Adds text to the response.
+
+        Returns:
+            List[Dict[str, Any]]: The mutants completed by the text.
+        """
+        self.text += text
+        mutants: List[Dict[str, Any]] = []
+        start = 0
+        for i, char in enumerate(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = bool(self._stack)
+            elif char in "[{":
+                if char == "{" and self._stack[-1:] == ["["] and self._item is None:
+                    self._item = []
+                    self._item_depth = len(self._stack)
+                    start = i
+                self._stack.append(char)
+            elif char in "]}" and self._stack:
+                self._stack.pop()
+                if self._item is not None and len(self._stack) == self._item_depth:
+                    self._item.append(text[start : i + 1])
+                    self._finish_item("".join(self._item), mutants)
+                    self._item = None
+        if self._item is not None:
+            self._item.append(text[start:])
+        return mutants
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Ends the response.
+
+        Returns:
+            List[Dict[str, Any]]: The mutants left in the rest of the response,
+            which is always empty as mutants are returned once complete.
+        """
+        if self._item is not None:
+            logger.debug("Skipping a mutant cut off at the end of the response.")
+            self.errors += 1
+            self._item = None
+        return []
+
+    def _finish_item(self, item: str, mutants: List[Dict[str, Any]]) -> None:
+        try:
+            data = json.loads(item)
+        except ValueError:
+            try:
+                data = yaml.safe_load(item)
+            except yaml.YAMLError as e:
+                logger.debug(f"Could not parse compact mutant: {e}")
+                data = None
+        mutant = compact_to_mutant(data)
+        if mutant is None:
+            self.errors += 1
+        else:
+            mutants.append(mutant)
+
+
+def parse_compact_mutants(response: str) -> Dict[str, Any]:
+    """
+    Parses a whole response in the compact output format.
+
+    Returns:
+        Dict[str, Any]: The mutants, in the same shape as a YAML response.
+    """
+    parser = CompactMutantParser()
+    mutants = parser.feed(response) + parser.close()
+    if parser.errors:
+        logger.warning(f"Skipped {parser.errors} unreadable mutants in the response.")
+    return {"mutants": mutants}
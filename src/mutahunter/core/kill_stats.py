@@ -0,0 +1,65 @@
+"""
+Module for tracking which tests kill mutants, across runs.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from mutahunter.core.logger import logger
+
+KILL_STATS_PATH = os.path.join("logs", "cache", "kill_stats.json")
+
+
+class KillStats:
+    """
+    Counts how many mutants each test killed, persisted across runs.
+
+    Tests that killed the most mutants are the most likely to kill the next one,
+    so running them first shortens the time to the first failure.
+    """
+
+    def __init__(self, path: str = KILL_STATS_PATH) -> None:
+        self.path = os.path.abspath(path)
+        self.kills: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.kills = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable kill stats {self.path}: {e}")
+
+    def record(self, test_ids: List[str]) -> None:
+        """Counts a kill for each of the tests and saves the stats."""
+        if not test_ids:
+            return
+        with self._lock:
+            for test_id in test_ids:
+                self.kills[test_id] = self.kills.get(test_id, 0) + 1
+            self._save()
+
+    def order(
+        self, test_ids: List[str], durations: Optional[Dict[str, float]] = None
+    ) -> List[str]:
+        """
+        Orders tests by kill count, then by duration so cheap tests go first.
+        """
+        durations = durations or {}
+        return sorted(
+            test_ids,
+            key=lambda test_id: (
+                -self.kills.get(test_id, 0),
+                durations.get(test_id, 0.0),
+                test_id,
+            ),
+        )
+
+    def _save(self) -> None:
+        # Test runs read the stats while we write them, so replace the file atomically.
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.kills, f)
+        os.replace(temp_path, self.path)
@@ -1,13 +1,36 @@
+import asyncio
 import os
-from typing import Any, Dict, List, Optional
+import queue
+import threading
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 import yaml
 from mutahunter.core.parsers import filename_to_lang
 from jinja2 import Template
 
+from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.exceptions import BudgetExceededError, LLMRequestError
+from mutahunter.core.git_diff import merge_line_ranges
+from mutahunter.core.json_stream import (
+    COMPACT_MUTANTS_SCHEMA,
+    CompactMutantParser,
+    parse_compact_mutants,
+)
 from mutahunter.core.logger import logger
 from mutahunter.core.prompt_factory import MutationTestingPrompt
 from mutahunter.core.router import LLMRouter
+from mutahunter.core.yaml_stream import MutantStreamParser
 
 SYSTEM_YAML_FIX = """
 Based on the error message, the YAML content provided is not in the correct format. Please ensure the YAML content is in the correct format and try again.
@@ -29,37 +52,209 @@ Output must be wrapped in triple backticks and in YAML format:
 """
 
 
+@dataclass
+class MutationRequest:
+    """A source file, or some line ranges of it, to generate mutants for."""
+
+    source_file_path: str
+    line_ranges: Optional[List[Tuple[int, int]]] = None
+    # Lines shown for context only, e.g. imports and enclosing class headers.
+    context_ranges: Optional[List[Tuple[int, int]]] = None
+
+
 class LLMMutationEngine:
     MAX_RETRIES = 2
+    # Leading lines of the file (imports, globals) shown with every chunk.
+    MAX_HEADER_LINES = 30
 
     def __init__(
         self,
         model: str,
         router: LLMRouter,
         prompt: MutationTestingPrompt,
+        analyzer: Optional[Analyzer] = None,
+        max_prompt_lines: int = 300,
+        output_format: str = "yaml",
+        semantic_only: bool = False,
     ) -> None:
         self.model = model
         self.router = router
         self.prompt = prompt
+        self.analyzer = analyzer
+        self.max_prompt_lines = max_prompt_lines
+        self.output_format = output_format
+        # Leave the operator mutants to the rule engine of a hybrid.
+        self.semantic_only = semantic_only
         self.num = 0
+        self._response_format: Optional[Dict[str, Any]] = None
+        if output_format == "json":
+            self._response_format = router.structured_output(
+                "mutants", COMPACT_MUTANTS_SCHEMA
+            )
 
     def get_source_code(self, source_file_path: str) -> str:
         with open(source_file_path, "r") as f:
             return f.read()
 
-    def add_line_numbers(self, src_code: str) -> str:
+    def add_line_numbers(
+        self, src_code: str, line_ranges: Optional[List[Tuple[int, int]]] = None
+    ) -> str:
+        """
+        Numbers the lines of the source code.
+
+        Args:
+            src_code (str): The source code.
+            line_ranges (Optional[List[Tuple[int, int]]]): Inclusive, sorted line
+                ranges to keep. Lines outside them are left out and each gap is
+                marked with "...". Defaults to all lines.
+        """
         lines = src_code.split("\n")
-        numbered_lines = [f"{i+1}: {line}" for i, line in enumerate(lines)]
+        if line_ranges is None:
+            line_ranges = [(1, len(lines))]
+        numbered_lines = []
+        for start, end in line_ranges:
+            if start > 1 and (not numbered_lines or numbered_lines[-1] != "..."):
+                numbered_lines.append("...")
+            for i in range(start - 1, min(end, len(lines))):
+                numbered_lines.append(f"{i+1}: {lines[i]}")
+            if end < len(lines):
+                numbered_lines.append("...")
         return "\n".join(numbered_lines)
 
+    def plan_requests(
+        self,
+        source_file_path: str,
+        line_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> List[MutationRequest]:
+        """
+        Splits a source file into requests of at most `max_prompt_lines` lines.
+
+        A file that fits is sent in one request. Otherwise its outermost function
+        blocks are grouped in order into requests, each with a compact context of
+        the file's leading lines and the first line of each enclosing class. A
+        single function longer than the limit gets a request of its own. Line
+        numbers always refer to the whole file.
+
+        Args:
+            source_file_path (str): The path of the source file.
+            line_ranges (Optional[List[Tuple[int, int]]]): Inclusive, sorted line
+                ranges of the functions to mutate. Defaults to the whole file.
+
+        Returns:
+            List[MutationRequest]: The requests.
+        """
+        src_lines = self.get_source_code(source_file_path).split("\n")
+        num_lines = len(src_lines)
+        selected_lines = (
+            num_lines
+            if line_ranges is None
+            else sum(end - start + 1 for start, end in line_ranges)
+        )
+        if (
+            self.analyzer is None
+            or self.max_prompt_lines <= 0
+            or selected_lines <= self.max_prompt_lines
+        ):
+            return [MutationRequest(source_file_path, line_ranges)]
+
+        blocks = []
+        for block in self.analyzer.get_function_blocks(source_file_path):
+            start, end = block.start_point[0] + 1, block.end_point[0] + 1
+            # First lines of enclosing classes, impls, namespaces and decorators.
+            ancestors = [row + 1 for row in block.scope_rows]
+            blocks.append((start, end, ancestors, block.top_level_row + 1))
+        blocks.sort(key=lambda block: (block[0], -block[1]))
+        outermost = []
+        for block in blocks:
+            if not outermost or block[0] > outermost[-1][1]:
+                outermost.append(block)
+        if line_ranges is None:
+            chunk_ranges = [(start, end) for start, end, _, _ in outermost]
+        else:
+            chunk_ranges = list(line_ranges)
+        if not chunk_ranges:
+            return [MutationRequest(source_file_path, line_ranges)]
+
+        # The header ends before the first top-level definition.
+        header_end = min(
+            min(top_level for _, _, _, top_level in outermost) - 1,
+            self.MAX_HEADER_LINES,
+        )
+        while header_end > 0 and not src_lines[header_end - 1].strip():
+            header_end -= 1
+        requests = []
+        for group in self._group_ranges(chunk_ranges):
+            context = [(1, header_end)] if header_end > 0 else []
+            for start, end, ancestors, _ in outermost:
+                if any(first <= start and end <= last for first, last in group):
+                    context.extend((line, line) for line in ancestors)
+            context = [
+                (line, line)
+                for start, end in merge_line_ranges(context)
+                for line in range(start, end + 1)
+                if not any(first <= line <= last for first, last in group)
+            ]
+            requests.append(
+                MutationRequest(
+                    source_file_path,
+                    group,
+                    context_ranges=merge_line_ranges(context) or None,
+                )
+            )
+        logger.info(
+            f"Split {source_file_path} ({selected_lines} lines to mutate) into "
+            f"{len(requests)} requests."
+        )
+        return requests
+
+    def _group_ranges(
+        self, line_ranges: List[Tuple[int, int]]
+    ) -> List[List[Tuple[int, int]]]:
+        """Groups consecutive line ranges into groups of at most `max_prompt_lines`."""
+        groups: List[List[Tuple[int, int]]] = []
+        group_lines = 0
+        for start, end in line_ranges:
+            lines = end - start + 1
+            if not groups or group_lines + lines > self.max_prompt_lines:
+                groups.append([])
+                group_lines = 0
+            groups[-1].append((start, end))
+            group_lines += lines
+        return groups
+
     def generate_mutant(
         self,
         source_file_path: str,
+        line_ranges: Optional[List[Tuple[int, int]]] = None,
+        context_ranges: Optional[List[Tuple[int, int]]] = None,
     ) -> str:
+        prompt = self._mutation_prompt(source_file_path, line_ranges, context_ranges)
+        model_response, _, _ = self.router.generate_response(
+            prompt=prompt, streaming=True, response_format=self._response_format
+        )
+        return model_response
+
+    def estimate(self, request: MutationRequest) -> Tuple[int, float]:
+        """Estimates the tokens and cost of generating mutants for a request."""
+        return self.router.estimate(
+            self._mutation_prompt(
+                request.source_file_path, request.line_ranges, request.context_ranges
+            )
+        )
+
+    def _mutation_prompt(
+        self,
+        source_file_path: str,
+        line_ranges: Optional[List[Tuple[int, int]]] = None,
+        context_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> Dict[str, str]:
         language = filename_to_lang(source_file_path)
         src_code = self.get_source_code(source_file_path)
 
-        numbered_src_code = self.add_line_numbers(src_code)
+        numbered_src_code = self.add_line_numbers(src_code, line_ranges)
+        numbered_context = (
+            self.add_line_numbers(src_code, context_ranges) if context_ranges else ""
+        )
 
         system_template = self.prompt.mutator_system_prompt.render(
             {
@@ -70,32 +265,307 @@ class LLMMutationEngine:
             {
                 "language": language,
                 "numbered_src_code": numbered_src_code,
+                "numbered_context": numbered_context,
                 "maximum_num_of_mutants_per_function_block": 2,
+                "excerpt": line_ranges is not None,
+                "compact": self.output_format == "json",
+                "semantic_only": self.semantic_only,
             }
         )
-        prompt = {"system": system_template, "user": user_template}
-        model_response, _, _ = self.router.generate_response(
-            prompt=prompt, streaming=True
-        )
-        return model_response
+        return {"system": system_template, "user": user_template}
 
-    def generate(self, source_file_path: str) -> Dict[str, Any]:
-        response = self.generate_mutant(source_file_path)
+    def generate(
+        self,
+        source_file_path: str,
+        line_ranges: Optional[List[Tuple[int, int]]] = None,
+        context_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generates mutants for a source file.
+
+        Args:
+            source_file_path (str): The path of the source file.
+            line_ranges (Optional[List[Tuple[int, int]]]): Inclusive, sorted line
+                ranges to mutate. Only these lines are sent to the LLM and mutants
+                outside them are dropped. Defaults to the whole file.
+            context_ranges (Optional[List[Tuple[int, int]]]): Inclusive, sorted
+                line ranges sent to the LLM for context only.
+        """
+        response = self.generate_mutant(source_file_path, line_ranges, context_ranges)
         extracted_response = self.extract_response(response)
+        return self._finish_generation(extracted_response, line_ranges)
+
+    async def agenerate(
+        self,
+        source_file_path: str,
+        line_ranges: Optional[List[Tuple[int, int]]] = None,
+        context_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Asynchronously generates mutants for a source file. Same as `generate`, but
+        the LLM response is not streamed.
+        """
+        prompt = self._mutation_prompt(source_file_path, line_ranges, context_ranges)
+        response, _, _ = await self.router.agenerate_response(
+            prompt=prompt, response_format=self._response_format
+        )
+        extracted_response = await self.aextract_response(response)
+        return self._finish_generation(extracted_response, line_ranges)
+
+    async def astream(self, request: MutationRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Asynchronously generates mutants for a request, yielding each mutant as
+        soon as the streamed LLM response holds all of it.
+
+        Once the response is complete it is parsed as a whole, like in `agenerate`,
+        and any mutant the incremental parser missed is yielded last. The LLM is
+        only asked to fix the YAML of a response no mutant could be read from.
+
+        Yields:
+            Dict[str, Any]: The mutants inside the request's line ranges.
+        """
+        prompt = self._mutation_prompt(
+            request.source_file_path, request.line_ranges, request.context_ranges
+        )
+        parser = (
+            CompactMutantParser()
+            if self.output_format == "json"
+            else MutantStreamParser()
+        )
+        mutants: List[Dict[str, Any]] = []
+        async for text in self.router.astream_response(
+            prompt=prompt, response_format=self._response_format
+        ):
+            for mutant in parser.feed(text):
+                if self._in_line_ranges(mutant, request.line_ranges):
+                    mutants.append(mutant)
+                    # The caller owns the yielded mutant and adds to it.
+                    yield dict(mutant)
+        for mutant in parser.close():
+            if self._in_line_ranges(mutant, request.line_ranges):
+                mutants.append(mutant)
+                yield dict(mutant)
+        extracted_response = await self.aextract_response(parser.text, fix=not mutants)
+        if not isinstance(extracted_response, dict):
+            extracted_response = {"mutants": []}
+        for mutant in extracted_response.get("mutants") or []:
+            if (
+                isinstance(mutant, dict)
+                and mutant not in mutants
+                and self._in_line_ranges(mutant, request.line_ranges)
+            ):
+                mutants.append(mutant)
+                yield dict(mutant)
+        extracted_response["mutants"] = mutants
+        self._save_yaml(extracted_response)
+
+    def generate_many(
+        self,
+        requests: Iterable[MutationRequest],
+        concurrency: int = 4,
+        max_pending: Optional[int] = None,
+        stream: bool = False,
+    ) -> Iterator[Tuple[MutationRequest, Dict[str, Any]]]:
+        """
+        Generates mutants for many requests at the same time.
+
+        The LLM calls run on an event loop in a background thread, at most
+        `concurrency` at a time, and each result is yielded as soon as it is
+        complete, so the caller can test mutants while the remaining requests are
+        still being generated. Requests are only taken from `requests` when a call
+        can start, and generation pauses while `max_pending` results wait for the
+        caller, so memory does not grow with the number of requests.
+
+        Args:
+            requests (Iterable[MutationRequest]): The files or line ranges to
+                mutate. May be a lazy iterator.
+            concurrency (int): Maximum number of concurrent LLM calls.
+            max_pending (Optional[int]): Maximum number of results waiting for the
+                caller. Defaults to `concurrency`.
+            stream (bool): Stream the LLM responses and yield each mutant in a
+                result of its own as soon as it is parsed, followed by an empty
+                result that completes the request.
+
+        Yields:
+            Tuple[MutationRequest, Dict[str, Any]]: A request and its mutants, in the
+            order they complete. ``complete`` is False for the streamed results
+            that do not finish a request.
+
+        Raises:
+            Exception: Whatever iterating over `requests` raised.
+        """
+        concurrency = max(1, concurrency)
+        results: queue.Queue = queue.Queue(maxsize=max_pending or concurrency)
+        iterator = iter(requests)
+        stop = threading.Event()
+        done = object()
+
+        def put(item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        async def generate_all() -> None:
+            lock = asyncio.Lock()
+
+            async def worker() -> None:
+                while not stop.is_set():
+                    async with lock:
+                        request = await asyncio.to_thread(next, iterator, None)
+                    if request is None:
+                        return
+                    result = {"mutants": [], "complete": True}
+                    try:
+                        if stream:
+                            async for mutant in self.astream(request):
+                                partial = {"mutants": [mutant], "complete": False}
+                                if not await asyncio.to_thread(put, (request, partial)):
+                                    return
+                        else:
+                            result = await self.agenerate(
+                                request.source_file_path,
+                                request.line_ranges,
+                                request.context_ranges,
+                            )
+                            result["complete"] = True
+                    except BudgetExceededError as e:
+                        # Left out of the results, so a resumed run generates it.
+                        logger.warning(
+                            f"Skipping a request for {request.source_file_path}: {e}"
+                        )
+                        continue
+                    except LLMRequestError as e:
+                        logger.error(
+                            f"Giving up on a request for {request.source_file_path}: "
+                            f"{e} It is generated again by a resumed run."
+                        )
+                        continue
+                    except Exception as e:
+                        logger.error(
+                            f"Error generating mutants for {request.source_file_path}: {e}"
+                        )
+                    if not await asyncio.to_thread(put, (request, result)):
+                        return
+
+            outcome: Any = done
+            try:
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+            except Exception as e:
+                outcome = e
+            await asyncio.to_thread(put, outcome)
+
+        thread = threading.Thread(
+            target=asyncio.run, args=(generate_all(),), daemon=True
+        )
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+        thread.join()
+
+    def _finish_generation(
+        self,
+        extracted_response: Dict[str, Any],
+        line_ranges: Optional[List[Tuple[int, int]]],
+    ) -> Dict[str, Any]:
+        if not isinstance(extracted_response, dict):
+            extracted_response = {"mutants": []}
+        if line_ranges is not None:
+            extracted_response["mutants"] = [
+                mutant
+                for mutant in extracted_response.get("mutants") or []
+                if self._in_line_ranges(mutant, line_ranges)
+            ]
         self._save_yaml(extracted_response)
         return extracted_response
 
+    @staticmethod
+    def _in_line_ranges(
+        mutant: Dict[str, Any], line_ranges: Optional[List[Tuple[int, int]]]
+    ) -> bool:
+        if line_ranges is None:
+            return True
+        line_number = mutant.get("line_number", 0)
+        return any(start <= line_number <= end for start, end in line_ranges)
+
     def extract_response(self, response: str) -> Dict[str, Any]:
+        steps = self._parse_response(response)
+        try:
+            fix = next(steps)
+            while True:
+                try:
+                    fixed_response = self.fix_format(*fix)
+                except (BudgetExceededError, LLMRequestError) as fix_error:
+                    fix = steps.throw(fix_error)
+                else:
+                    fix = steps.send(fixed_response)
+        except StopIteration as parsed:
+            return parsed.value
+
+    async def aextract_response(
+        self, response: str, fix: bool = True
+    ) -> Dict[str, Any]:
+        steps = self._parse_response(response, fix)
+        try:
+            fix = next(steps)
+            while True:
+                try:
+                    fixed_response, _, _ = await self.router.agenerate_response(
+                        prompt=self._fix_format_prompt(*fix)
+                    )
+                except (BudgetExceededError, LLMRequestError) as fix_error:
+                    fix = steps.throw(fix_error)
+                else:
+                    fix = steps.send(fixed_response)
+        except StopIteration as parsed:
+            return parsed.value
+
+    def _parse_response(
+        self, response: str, fix: bool = True
+    ) -> Generator[Tuple[Exception, str], str, Dict[str, Any]]:
+        """
+        Parses a response for `extract_response` and `aextract_response`, which
+        make the LLM calls that fix its YAML. Without `fix`, a response that is
+        not valid YAML has no mutants.
+
+        Yields:
+            Tuple[Exception, str]: The error and content of a response to fix. The
+            fixed response is sent back, or the error of the fix thrown in.
+
+        Returns:
+            Dict[str, Any]: The parsed response.
+        """
+        if self.output_format == "json":
+            # Read locally, whatever state the response is in.
+            return parse_compact_mutants(response)
         for attempt in range(self.MAX_RETRIES):
             try:
                 cleaned_response = self._clean_response(response)
                 data = yaml.safe_load(cleaned_response)
                 return data
             except Exception as e:
+                if not fix:
+                    logger.debug(f"Not fixing the YAML content: {e}")
+                    break
                 logger.error(f"Error extracting YAML content: {e}")
                 if attempt < self.MAX_RETRIES - 1:
                     logger.info(f"Retrying to extract YAML with retry {attempt + 1}...")
-                    response = self.fix_format(e, response)
+                    try:
+                        response = yield e, response
+                    except (BudgetExceededError, LLMRequestError) as fix_error:
+                        logger.warning(f"Not fixing the YAML content: {fix_error}")
+                        break
                 else:
                     logger.error(
                         f"Error extracting YAML content after {self.MAX_RETRIES} attempts: {e}"
@@ -103,16 +573,19 @@ class LLMMutationEngine:
         return {"mutants": []}
 
     def fix_format(self, error: Exception, content: str) -> str:
-        system_template = Template(SYSTEM_YAML_FIX).render()
-        user_template = Template(USER_YAML_FIX).render(
-            yaml_content=content, error=error
-        )
-        prompt = {"system": system_template, "user": user_template}
+        prompt = self._fix_format_prompt(error, content)
         model_response, _, _ = self.router.generate_response(
             prompt=prompt, streaming=True
         )
         return model_response
 
+    def _fix_format_prompt(self, error: Exception, content: str) -> Dict[str, str]:
+        system_template = Template(SYSTEM_YAML_FIX).render()
+        user_template = Template(USER_YAML_FIX).render(
+            yaml_content=content, error=error
+        )
+        return {"system": system_template, "user": user_template}
+
 
     def _clean_response(self, response: str) -> str:
         return response.strip().removeprefix("```yaml").rstrip("`")
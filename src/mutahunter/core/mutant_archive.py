@@ -0,0 +1,228 @@
+"""
+Module for storing the mutants of a run as line patches against their source files.
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from mutahunter.core.logger import logger
+
+MUTANT_ARCHIVE_PATH = os.path.join("logs", "_latest", "mutants.sqlite")
+
+
+class SourceLines:
+    """
+    A source file split into lines once, so that each of its mutants only costs
+    as much as the line it replaces.
+
+    Lines are split like ``str.splitlines(keepends=True)``.
+    """
+
+    def __init__(self, source_code: str) -> None:
+        self.source_code = source_code
+        self.digest = hashlib.sha256(source_code.encode("utf8")).hexdigest()
+        # Offset of the start of each line and of the end of the file.
+        self.starts = [0]
+        for line in source_code.splitlines(keepends=True):
+            self.starts.append(self.starts[-1] + len(line))
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def line(self, line_number: int) -> str:
+        """Returns a line, 1-based, with its line break."""
+        if not 0 < line_number <= len(self):
+            raise IndexError(f"Line {line_number} is not in the source file.")
+        return self.source_code[self.starts[line_number - 1] : self.starts[line_number]]
+
+    def replace(self, line_number: int, line: str) -> str:
+        """Returns the source code with one line, 1-based, replaced."""
+        if not 0 < line_number <= len(self):
+            raise IndexError(f"Line {line_number} is not in the source file.")
+        return (
+            self.source_code[: self.starts[line_number - 1]]
+            + line
+            + self.source_code[self.starts[line_number] :]
+        )
+
+
+_local = threading.local()
+
+
+def source_lines(source_code: str) -> SourceLines:
+    """
+    Returns the calling thread's split of a source file, splitting it only when
+    the content differs from the last call.
+    """
+    lines = getattr(_local, "source_lines", None)
+    if lines is None or lines.source_code != source_code:
+        lines = _local.source_lines = SourceLines(source_code)
+    return lines
+
+
+class MutantArchive:
+    """
+    Stores the mutants of a run in one compressed SQLite archive.
+
+    The first time a source file is mutated, a copy of it is stored under the hash
+    of its content; every mutant is then stored as its line number and replacement
+    line. Full mutant files are only built by `materialize`, when a test run needs
+    them. The copy also shields the mutants from the source file being replaced
+    in place while tests run.
+    """
+
+    def __init__(
+        self, path: Optional[str] = MUTANT_ARCHIVE_PATH, memory_sources: int = 8
+    ) -> None:
+        self.path = os.path.abspath(path) if path else None
+        self.memory_sources = memory_sources
+        # Hashes of the copy of each source file and of the file it was read from.
+        self._snapshots: Dict[str, Tuple[str, str]] = {}
+        self._sources: "OrderedDict[str, SourceLines]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def open(self, resume: bool = False) -> None:
+        """Opens the archive, keeping its mutants on resume and starting over otherwise."""
+        if self.path is None:
+            self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if not resume and os.path.exists(self.path):
+                os.remove(self.path)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                hash TEXT PRIMARY KEY,
+                content BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS mutants (
+                path TEXT PRIMARY KEY,
+                source_hash TEXT NOT NULL,
+                line_number INTEGER NOT NULL,
+                line BLOB NOT NULL
+            );
+            """)
+        self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def source(self, source_file_path: str) -> SourceLines:
+        """
+        Returns the lines of a source file as they were the first time it was read
+        in this run.
+        """
+        path = os.path.abspath(source_file_path)
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+            if snapshot is not None:
+                return self._load_source(snapshot[0])
+            with open(path, "rb") as f:
+                data = f.read()
+            # Decoded like `FileOperationHandler.read_file`.
+            lines = SourceLines(io.TextIOWrapper(io.BytesIO(data)).read())
+            self._snapshots[path] = (lines.digest, hashlib.sha256(data).hexdigest())
+            self._remember(lines)
+            self._connect().execute(
+                "INSERT OR IGNORE INTO sources (hash, content) VALUES (?, ?)",
+                (lines.digest, zlib.compress(lines.source_code.encode("utf8"))),
+            )
+            self._connection.commit()
+        return lines
+
+    def source_hash(self, source_file_path: str) -> str:
+        """Returns the `file_hash` of a source file when `source` first read it."""
+        self.source(source_file_path)
+        return self._snapshots[os.path.abspath(source_file_path)][1]
+
+    def add(
+        self, mutant_path: str, source: SourceLines, line_number: int, line: str
+    ) -> None:
+        """Stores a mutant of a source returned by `source` as its replaced line."""
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO mutants (path, source_hash, line_number, line) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    os.path.abspath(mutant_path),
+                    source.digest,
+                    line_number,
+                    zlib.compress(line.encode("utf8")),
+                ),
+            )
+            self._connection.commit()
+
+    def build(self, mutant_path: str) -> Optional[str]:
+        """Returns the full mutated file, or None if the mutant is not archived."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT source_hash, line_number, line FROM mutants WHERE path = ?",
+                    (os.path.abspath(mutant_path),),
+                )
+                .fetchone()
+            )
+            if row is None:
+                return None
+            source_hash, line_number, line = row
+            source = self._load_source(source_hash)
+        return source.replace(line_number, zlib.decompress(line).decode("utf8"))
+
+    def materialize(self, mutant_path: str) -> bool:
+        """
+        Writes the full mutated file to its mutant path.
+
+        Returns:
+            bool: False if the mutant is not archived.
+        """
+        mutated_code = self.build(mutant_path)
+        if mutated_code is None:
+            return False
+        os.makedirs(os.path.dirname(mutant_path), exist_ok=True)
+        with open(mutant_path, "w") as f:
+            f.write(mutated_code)
+        return True
+
+    @staticmethod
+    def discard(mutant_path: str) -> None:
+        """Removes a mutant file written by `materialize`."""
+        try:
+            os.remove(mutant_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f"Could not remove mutant file {mutant_path}: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.open(resume=True)
+        return self._connection
+
+    def _load_source(self, digest: str) -> SourceLines:
+        lines = self._sources.get(digest)
+        if lines is None:
+            (content,) = (
+                self._connect()
+                .execute("SELECT content FROM sources WHERE hash = ?", (digest,))
+                .fetchone()
+            )
+            lines = SourceLines(zlib.decompress(content).decode("utf8"))
+        self._remember(lines)
+        return lines
+
+    def _remember(self, lines: SourceLines) -> None:
+        self._sources[lines.digest] = lines
+        self._sources.move_to_end(lines.digest)
+        while len(self._sources) > self.memory_sources:
+            self._sources.popitem(last=False)
@@ -0,0 +1,72 @@
+"""
+Module for finding mutants that do not need a test run.
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from mutahunter.core.exceptions import MutantDuplicateError, MutantEquivalentError
+from mutahunter.core.io import FileOperationHandler
+from mutahunter.core.mutant_archive import MutantArchive
+
+
+class MutantFilter:
+    """
+    Finds mutants that would only repeat a test run: duplicates of a mutant seen
+    earlier in the run and mutants that change nothing but comments or whitespace.
+
+    Lines are compared as the tokens of `FileOperationHandler.code_tokens`, so the
+    comment the LLM adds to every mutated line does not count as a change.
+    """
+
+    def __init__(
+        self,
+        file_handler: FileOperationHandler,
+        archive: Optional[MutantArchive] = None,
+    ) -> None:
+        self.file_handler = file_handler
+        # Source files are read from the archive's copy if there is one.
+        self.archive = archive
+        self._seen: Set[Tuple[str, int, Tuple[str, ...]]] = set()
+        # The lines of the last source file read; mutants arrive file by file.
+        self._source: Tuple[Optional[str], List[str]] = (None, [])
+
+    def check(self, mutant_data: Dict[str, Any]) -> Optional[Exception]:
+        """
+        Checks whether a mutant can be skipped and remembers it for later checks.
+
+        Args:
+            mutant_data (Dict[str, Any]): The mutant, with its ``source_path``.
+
+        Returns:
+            Optional[Exception]: The reason to skip the mutant, or None if it has to
+            be tested.
+        """
+        source_path = mutant_data["source_path"]
+        line_number = mutant_data.get("line_number")
+        lines = self._source_lines(source_path)
+        if not isinstance(line_number, int) or not 0 < line_number <= len(lines):
+            return None
+        mutated = self.file_handler.code_tokens(
+            source_path, str(mutant_data.get("mutated_code", ""))
+        )
+        key = (source_path, line_number, mutated)
+        if key in self._seen:
+            return MutantDuplicateError(
+                f"Duplicate of an earlier mutant of line {line_number}."
+            )
+        self._seen.add(key)
+        original = self.file_handler.code_tokens(source_path, lines[line_number - 1])
+        if mutated == original:
+            return MutantEquivalentError(
+                f"Mutant of line {line_number} only changes comments or whitespace."
+            )
+        return None
+
+    def _source_lines(self, source_path: str) -> List[str]:
+        if self._source[0] != source_path:
+            if self.archive is None:
+                source_code = self.file_handler.read_file(source_path)
+            else:
+                source_code = self.archive.source(source_path).source_code
+            self._source = (source_path, source_code.splitlines())
+        return self._source[1]
@@ -0,0 +1,227 @@
+"""
+Module for caching mutant outcomes across runs.
+"""
+
+import glob
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from mutahunter.core.io import SKIPPED_SOURCE_DIRECTORIES
+from mutahunter.core.logger import logger
+
+OUTCOME_CACHE_PATH = os.path.join("logs", "cache", "outcomes.sqlite")
+
+# Outcomes that only depend on the mutant and the tests.
+CACHEABLE_STATUSES = {"KILLED", "SURVIVED", "TIMEOUT"}
+
+# Content digests of fingerprinted files by path, with the stat they belong to,
+# so that fingerprinting a whole project again only reads the files that changed.
+_file_digests: Dict[str, Tuple[Tuple[int, int, int, int], bytes]] = {}
+_file_digests_lock = threading.Lock()
+
+
+def fingerprint_inputs(patterns: List[str]) -> str:
+    """
+    Hashes the contents of the files that make up the test inputs.
+
+    If no pattern matches a file, e.g. with the default empty test path, the
+    whole project tree in the working directory is hashed instead, so that a
+    changed test still invalidates the cached outcomes. Files that have not
+    changed since they were last hashed are not read again.
+
+    Args:
+        patterns (List[str]): Files, directories (all files below them) or glob
+            patterns.
+
+    Returns:
+        str: A hex digest that changes whenever one of the files changes.
+    """
+    paths = _input_paths(patterns)
+    if not paths:
+        logger.warning(
+            f"No test inputs found in {patterns}. Fingerprinting the whole project "
+            "for the outcome cache; pass --cache-inputs to narrow it down."
+        )
+        paths = _input_paths([os.curdir])
+    digest = hashlib.sha256()
+    for path in sorted(os.path.relpath(path) for path in paths):
+        if path.endswith((".pyc", ".bak")):
+            continue
+        digest.update(path.encode("utf8") + b"\0")
+        digest.update(_file_digest(path))
+    return digest.hexdigest()
+
+
+def _file_digest(path: str) -> bytes:
+    stat = os.stat(path)
+    signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+    key = os.path.abspath(path)
+    with _file_digests_lock:
+        cached = _file_digests.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, "rb") as f:
+        file_digest = hashlib.sha256(f.read()).digest()
+    with _file_digests_lock:
+        _file_digests[key] = (signature, file_digest)
+    return file_digest
+
+
+def _input_paths(patterns: List[str]) -> Set[str]:
+    paths = set()
+    for pattern in patterns:
+        if not pattern:
+            continue
+        for match in glob.glob(pattern, recursive=True):
+            if os.path.isdir(match):
+                for directory, dirnames, filenames in os.walk(match):
+                    # Hidden directories hold tool state like .pytest_cache.
+                    dirnames[:] = [
+                        d
+                        for d in dirnames
+                        if d not in SKIPPED_SOURCE_DIRECTORIES and not d.startswith(".")
+                    ]
+                    paths.update(
+                        os.path.join(directory, name)
+                        for name in filenames
+                        if not name.startswith(".coverage")
+                    )
+            elif os.path.isfile(match):
+                paths.add(match)
+    return paths
+
+
+def outcome_key(
+    source_path: str, mutated_code: str, test_fingerprint: str, test_command: str
+) -> str:
+    """Returns the cache key of a mutant's outcome."""
+    digest = hashlib.sha256()
+    for part in (
+        "mutahunter-outcome-v1",
+        os.path.relpath(source_path),
+        mutated_code,
+        test_fingerprint,
+        test_command,
+    ):
+        digest.update(part.encode("utf8") + b"\0")
+    return digest.hexdigest()
+
+
+class OutcomeCache:
+    """
+    Stores the outcome of each mutant under a hash of everything it depends on:
+    the mutated file, the test inputs and the test command.
+
+    The cache is a SQLite database that keeps at most ``max_entries`` outcomes,
+    evicting the least recently used ones.
+    """
+
+    def __init__(
+        self, path: str = OUTCOME_CACHE_PATH, max_entries: int = 100_000
+    ) -> None:
+        self.path = os.path.abspath(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS outcomes (
+                key TEXT PRIMARY KEY,
+                source_path TEXT NOT NULL,
+                line_number INTEGER,
+                status TEXT NOT NULL,
+                error_msg TEXT,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS outcomes_last_used ON outcomes (last_used)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored outcome for a key and marks it as recently used."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, error_msg FROM outcomes WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE outcomes SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._connection.commit()
+            self.hits += 1
+        return {"status": row[0], "error_msg": row[1]}
+
+    def put(
+        self,
+        key: str,
+        source_path: str,
+        line_number: Optional[int],
+        status: str,
+        error_msg: str = "",
+    ) -> None:
+        """Stores an outcome, evicting the least recently used ones over the limit."""
+        if status not in CACHEABLE_STATUSES:
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO outcomes "
+                "(key, source_path, line_number, status, error_msg, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, source_path, line_number, status, error_msg, now, now),
+            )
+            self._connection.execute(
+                "DELETE FROM outcomes WHERE key IN ("
+                "SELECT key FROM outcomes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of entries per status, total hits and the file size."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*), SUM(hits) FROM outcomes GROUP BY status"
+            ).fetchall()
+        return {
+            "path": self.path,
+            "entries": sum(count for _, count, _ in rows),
+            "statuses": {status: count for status, count, _ in rows},
+            "hits": sum(hits or 0 for _, _, hits in rows),
+            "size_bytes": os.path.getsize(self.path),
+        }
+
+    def entries(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Returns the most recently used entries."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, source_path, line_number, status, hits, last_used "
+                "FROM outcomes ORDER BY last_used DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        columns = ["key", "source_path", "line_number", "status", "hits", "last_used"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def clear(self) -> int:
+        """Deletes all entries and returns how many there were."""
+        with self._lock:
+            count = self._connection.execute("DELETE FROM outcomes").rowcount
+            self._connection.commit()
+            self._connection.execute("VACUUM")
+        logger.info(f"Removed {count} cached outcomes from {self.path}")
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
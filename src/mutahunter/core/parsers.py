@@ -1,8 +1,14 @@
 import os
+import threading
+from functools import lru_cache
+
+from tree_sitter import Language, Parser, Query
+from tree_sitter_languages import get_language
+
 PARSERS = {
     ".py": "python",
     ".js": "javascript",
-    ".mjs": "javascript", 
+    ".mjs": "javascript",
     ".go": "go",
     ".c": "c",
     ".cc": "cpp",
@@ -20,6 +26,7 @@ PARSERS = {
     ".ts": "typescript",
 }
 
+
 def filename_to_lang(filename: str) -> str:
     basename = os.path.basename(filename)
     if basename in PARSERS:
@@ -29,3 +36,29 @@ def filename_to_lang(filename: str) -> str:
         return PARSERS[file_extension]
     return None
 
+
+# Languages and compiled queries can be shared between threads; parsers cannot.
+_local = threading.local()
+
+
+@lru_cache(maxsize=None)
+def get_cached_language(lang: str) -> Language:
+    return get_language(lang)
+
+
+def get_cached_parser(lang: str) -> Parser:
+    """Returns the calling thread's parser for a language, creating it once."""
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(lang)
+    if parser is None:
+        parser = parsers[lang] = Parser()
+        parser.set_language(get_cached_language(lang))
+    return parser
+
+
+@lru_cache(maxsize=None)
+def get_cached_query(lang: str, query_scm: str) -> Query:
+    """Returns a query compiled once per language and query source."""
+    return get_cached_language(lang).query(query_scm)
@@ -0,0 +1,102 @@
+"""
+pytest plugin loaded into the test runs mutahunter starts.
+
+The plugin is copied next to the logs and loaded with
+``-p mutahunter_pytest_plugin``, so it may only depend on the standard library,
+pytest and, for coverage collection, coverage.py. Its features are enabled by
+environment variables:
+
+``MUTAHUNTER_TEST_ORDER``
+    Path of a JSON object mapping test IDs to kill counts. Tests that killed
+    more mutants run first.
+
+``MUTAHUNTER_COVERAGE_OUTPUT``
+    Path to write per-test line coverage to. Each test runs in its own
+    coverage.py dynamic context, named after its test ID. Lines executed outside
+    of a test, e.g. while importing modules during collection, are recorded
+    under the empty context. The output has the form::
+
+        {
+            "files": {"<abs path>": {"lines": {"<line>": [test ids]}, "statements": [lines]}},
+            "durations": {"<test id>": seconds}
+        }
+
+Test IDs are node IDs with the file path relative to the working directory, so
+they can be passed back to pytest.
+"""
+
+import json
+import os
+from collections import defaultdict
+
+import pytest
+
+_coverage = None
+_test_ids = {}
+_durations = defaultdict(float)
+
+
+def _test_id(item) -> str:
+    path = os.path.relpath(str(item.path), os.getcwd())
+    _, _, name = item.nodeid.partition("::")
+    return f"{path}::{name}" if name else path
+
+
+def pytest_configure(config):
+    global _coverage
+    if os.environ.get("MUTAHUNTER_COVERAGE_OUTPUT") and _coverage is None:
+        import coverage
+
+        _coverage = coverage.Coverage(data_file=None, source=[os.getcwd()])
+        _coverage.start()
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(session, config, items):
+    order_path = os.environ.get("MUTAHUNTER_TEST_ORDER")
+    if not order_path or not os.path.exists(order_path):
+        return
+    with open(order_path, "r") as f:
+        kills = json.load(f)
+
+    def score(item):
+        return kills.get(_test_id(item), kills.get(item.nodeid, 0))
+
+    items.sort(key=lambda item: -score(item))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    if _coverage is None:
+        yield
+        return
+    test_id = _test_id(item)
+    _test_ids[item.nodeid] = test_id
+    _coverage.switch_context(test_id)
+    yield
+    _coverage.switch_context("")
+
+
+def pytest_runtest_logreport(report):
+    if _coverage is not None:
+        _durations[_test_ids.get(report.nodeid, report.nodeid)] += report.duration
+
+
+def pytest_unconfigure(config):
+    if _coverage is None:
+        return
+    _coverage.stop()
+    data = _coverage.get_data()
+    files = {}
+    for filename in data.measured_files():
+        try:
+            _, statements, _, _, _ = _coverage.analysis2(filename)
+        except Exception:
+            statements = []
+        lines = data.contexts_by_lineno(filename)
+        files[os.path.abspath(filename)] = {
+            "lines": {str(line): sorted(set(ids)) for line, ids in lines.items()},
+            "statements": sorted(statements),
+        }
+    with open(os.environ["MUTAHUNTER_COVERAGE_OUTPUT"], "w") as f:
+        json.dump({"files": files, "durations": dict(_durations)}, f)
@@ -0,0 +1,516 @@
+"""
+Long-lived pytest worker used by the warm test runner.
+
+This file is executed as a script by the project's Python interpreter, so it may
+only depend on the standard library and pytest. It starts one pytest session with
+the warm-up arguments, which imports the plugins, the test modules and the project
+modules they import and collects the tests, and then serves requests from inside
+that session, forking a child for each one.
+
+The child reuses the collected tests. The functions of a mutated module that is
+already imported are swapped for the mutant's in place: every function object
+whose code changed gets the new code, so test modules that imported the function
+with ``from module import name`` run the mutant as well. The child then runs the
+selected tests with pytest's own run-test protocol and exits with pytest's exit
+code. A module is mutated if its file changed on disk since the warm-up or if it
+is the target of mutahunter's import hook; a target that is not imported yet is
+served by the import hook when the tests import it.
+
+A request the collected session cannot serve is run like a fresh ``pytest``
+command in the child instead: the project's modules are dropped, so every module
+is imported again, and ``pytest.main`` collects the tests again. That is the case
+for a mutant that changes module-level or class-level code, as a value computed
+from it at import time cannot be swapped, for a collection that failed, and for
+options other than the warm-up options plus ``-x``, ``--maxfail`` and ``-p``.
+Values computed during collection, e.g. parametrize arguments, come from the
+original code on the collected path.
+
+The script takes one JSON argument: ``{"warmup_args": [...], "warmup_options":
+[...], "warmup_paths": [...], "module_mode": bool}``, the warm-up arguments and
+their split into options and test paths. ``module_mode`` mirrors
+``python -m pytest``, which puts the working directory on ``sys.path``.
+
+Protocol (one JSON document per line):
+    server -> client: {"ready": true}
+    client -> server: {"args": [...], "options": [...], "paths": [...], "timeout": 30.0, "env": {...}}
+        A null timeout means no timeout; a missing one defaults to 30 seconds.
+        Test paths that differ from the warm-up paths must be test IDs, files or
+        directories of collected tests.
+    server -> client: {"returncode": 1, "stdout": "...", "stderr": "...", "timeout": false}
+"""
+
+import gc
+import importlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import types
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+TARGET_ENV_VAR = "MUTAHUNTER_MUTANT_TARGET"
+SOURCE_ENV_VAR = "MUTAHUNTER_MUTANT_SOURCE"
+STATUS_ENV_VAR = "MUTAHUNTER_IMPORT_HOOK_STATUS"
+
+
+class _Unpatchable(Exception):
+    """The mutant cannot be swapped into the imported module."""
+
+
+def _is_project_module(module, project_root: str) -> bool:
+    path = getattr(module, "__file__", None)
+    if not path:
+        return False
+    path = os.path.abspath(path)
+    if not path.startswith(project_root + os.sep):
+        return False
+    relative_path = os.path.relpath(path, project_root)
+    return "site-packages" not in relative_path.split(os.sep)
+
+
+def _drop_project_modules(project_root: str) -> None:
+    for name, module in list(sys.modules.items()):
+        if _is_project_module(module, project_root):
+            del sys.modules[name]
+
+
+def _install_import_hook() -> None:
+    # sitecustomize only runs at interpreter start, so install the hook directly.
+    if not os.environ.get(TARGET_ENV_VAR):
+        return
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_hook.py")
+    spec = importlib.util.spec_from_file_location("mutahunter_import_hook", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.install()
+
+
+def _report(status: str) -> None:
+    # Same status file protocol as the import hook.
+    path = os.environ.get(STATUS_ENV_VAR)
+    if not path:
+        return
+    try:
+        with open(path, "a") as f:
+            f.write(status + "\n")
+    except OSError:
+        pass
+
+
+def _apply_env(env: Dict[str, str]) -> None:
+    os.environ.update(env)
+    # PYTHONPATH is only read at interpreter start, so apply it to sys.path.
+    for path in reversed(env.get("PYTHONPATH", "").split(os.pathsep)):
+        if path and path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _stripped(code: types.CodeType) -> types.CodeType:
+    """Returns the code without its nested code objects and line numbers."""
+    consts = tuple(
+        ("<code>", const.co_name) if isinstance(const, types.CodeType) else const
+        for const in code.co_consts
+    )
+    if sys.version_info >= (3, 10):
+        return code.replace(co_consts=consts, co_firstlineno=1, co_linetable=b"")
+    return code.replace(co_consts=consts, co_firstlineno=1, co_lnotab=b"")
+
+
+def _diff_code(
+    old: types.CodeType,
+    new: types.CodeType,
+    replacements: Dict[types.CodeType, types.CodeType],
+    roots: List[types.CodeType],
+) -> bool:
+    """
+    Pairs up the code objects of two versions of a module and collects the
+    function code objects that have to be replaced.
+
+    Args:
+        old (types.CodeType): The original code.
+        new (types.CodeType): The mutant's code.
+        replacements (Dict[types.CodeType, types.CodeType]): Collects the new
+            code of each changed function code.
+        roots (List[types.CodeType]): Collects the changed function codes defined
+            directly in a module or class body, which must have live functions.
+
+    Returns:
+        bool: True if functions created from ``old`` have to get ``new``.
+
+    Raises:
+        _Unpatchable: If code that already ran, a module or class body, changed.
+    """
+    old_children = [c for c in old.co_consts if isinstance(c, types.CodeType)]
+    new_children = [c for c in new.co_consts if isinstance(c, types.CodeType)]
+    if [c.co_name for c in old_children] != [c.co_name for c in new_children]:
+        raise _Unpatchable(f"The code objects of {old.co_name} changed.")
+    changed_children = [
+        old_child
+        for old_child, new_child in zip(old_children, new_children)
+        if _diff_code(old_child, new_child, replacements, roots)
+    ]
+    changed = _stripped(old) != _stripped(new)
+    if not old.co_flags & inspect.CO_OPTIMIZED:
+        # Module and class bodies ran at import time; the functions they
+        # defined still exist and are patched on their own.
+        if changed:
+            raise _Unpatchable(f"The body of {old.co_name} changed.")
+        roots.extend(changed_children)
+        return False
+    if old.co_freevars != new.co_freevars:
+        raise _Unpatchable(f"The closure of {old.co_name} changed.")
+    if changed or changed_children:
+        replacements[old] = new
+        return True
+    return False
+
+
+def _patch_module(path: str, original: bytes, mutant: bytes) -> None:
+    """
+    Swaps the changed functions of an imported module for the mutant's.
+
+    Raises:
+        _Unpatchable: If the mutant changes more than function code.
+    """
+    try:
+        old = compile(original, path, "exec", dont_inherit=True)
+        new = compile(mutant, path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        raise _Unpatchable(str(e))
+    replacements: Dict[types.CodeType, types.CodeType] = {}
+    roots: List[types.CodeType] = []
+    _diff_code(old, new, replacements, roots)
+    patched = set()
+    for obj in gc.get_objects():
+        if isinstance(obj, types.FunctionType):
+            code = replacements.get(obj.__code__)
+            if code is not None:
+                patched.add(obj.__code__)
+                obj.__code__ = code
+    # e.g. a module-level comprehension, or a module compiled differently.
+    if any(root not in patched for root in roots):
+        raise _Unpatchable(f"Not all changed functions of {path} were found.")
+
+
+def _matches(test_id: str, path: str) -> bool:
+    if "::" in path:
+        return test_id == path or test_id.startswith(path + "::")
+    file_path = test_id.partition("::")[0]
+    path = os.path.normpath(path)
+    return file_path == path or file_path.startswith(path + os.sep)
+
+
+def _wait(pid: int, timeout: Optional[float]):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            return os.waitstatus_to_exitcode(status)
+        if deadline is not None and time.monotonic() > deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return None
+        time.sleep(0.005)
+
+
+def _clear(fd: int) -> None:
+    os.ftruncate(fd, 0)
+    os.lseek(fd, 0, os.SEEK_SET)
+
+
+def _read(fd: int) -> str:
+    os.lseek(fd, 0, os.SEEK_SET)
+    chunks = []
+    while True:
+        chunk = os.read(fd, 1 << 16)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks).decode("utf8", errors="replace")
+
+
+class WarmSession:
+    """
+    pytest plugin that serves the requests from inside the warm-up session, once
+    its tests are collected.
+
+    The standard output and error of the server are files that every child
+    inherits, and the terminal reporter and pytest's output capturing write to,
+    so a child's output is what the files hold when it exits.
+    """
+
+    def __init__(self, options: dict, channel, requests) -> None:
+        self.warmup_options: List[str] = options.get("warmup_options") or []
+        self.warmup_paths: List[str] = options.get("warmup_paths") or []
+        self.channel = channel
+        self.requests = requests
+        self.served = False
+        # The request a forked child runs on the collected session.
+        self.child_request: Optional[dict] = None
+        self.pycache_prefix: Optional[str] = None
+        self._session = None
+        # The source of every imported project module, by path, as it was when
+        # the tests were collected.
+        self._sources: Dict[str, Tuple[Tuple[int, int], bytes]] = {}
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        option = session.config.option
+        if (
+            not session.testsfailed
+            and not option.collectonly
+            and not getattr(option, "numprocesses", None)
+        ):
+            self._session = session
+            self._record_sources()
+        self.serve()
+        if self.child_request is None:
+            return True
+        self._run_collected(self.child_request)
+        return True
+
+    def serve(self) -> None:
+        """
+        Answers requests until the client closes the channel. Returns in a child
+        that runs a request on the collected session.
+        """
+        self.served = True
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.channel.write(json.dumps({"ready": True}) + "\n")
+        for line in self.requests:
+            if not line.strip():
+                continue
+            try:
+                response = self._handle(json.loads(line))
+            except Exception as e:
+                response = {"error": str(e)}
+            if self.child_request is not None:
+                return
+            self.channel.write(json.dumps(response) + "\n")
+
+    def _handle(self, request: dict) -> dict:
+        selection = self._select(request)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        _clear(1)
+        _clear(2)
+        pid = os.fork()
+        if pid == 0:
+            self.pycache_prefix = tempfile.mkdtemp(prefix="mutahunter-pyc-")
+            # Never reuse bytecode of the original module for the mutant.
+            sys.pycache_prefix = self.pycache_prefix
+            try:
+                _apply_env(request.get("env") or {})
+                if selection is not None:
+                    try:
+                        self._swap_mutants()
+                    except _Unpatchable:
+                        selection = None
+                if selection is not None:
+                    request["items"], request["extras"] = selection
+                    self.child_request = request
+                    return {}
+                self._run_fresh(request["args"])
+            finally:
+                if self.child_request is None:
+                    os._exit(3)
+        # An explicit null timeout lets the tests run for as long as they take.
+        timeout = request.get("timeout", 30)
+        returncode = _wait(pid, None if timeout is None else float(timeout))
+        return {
+            "returncode": returncode,
+            "stdout": _read(1),
+            "stderr": _read(2),
+            "timeout": returncode is None,
+        }
+
+    def _select(self, request: dict) -> Optional[tuple]:
+        """
+        Returns the collected tests and the extra options of a request, or None
+        if the request needs a fresh session.
+        """
+        if self._session is None:
+            return None
+        options = request.get("options")
+        paths = request.get("paths")
+        if options is None or paths is None:
+            return None
+        if options[: len(self.warmup_options)] != self.warmup_options:
+            return None
+        extras = options[len(self.warmup_options) :]
+        i = 0
+        while i < len(extras):
+            if extras[i] == "-p" and i + 1 < len(extras):
+                i += 2
+            elif extras[i] in ("-x", "--exitfirst") or extras[i].startswith(
+                "--maxfail="
+            ):
+                i += 1
+            else:
+                return None
+        items = self._session.items
+        if paths == self.warmup_paths:
+            return list(items), extras
+        test_ids = [(self._test_id(item), item) for item in items]
+        selected = []
+        seen = set()
+        for path in paths:
+            matched = [item for test_id, item in test_ids if _matches(test_id, path)]
+            if not matched:
+                return None
+            for item in matched:
+                if id(item) not in seen:
+                    seen.add(id(item))
+                    selected.append(item)
+        return selected, extras
+
+    @staticmethod
+    def _test_id(item) -> str:
+        path = os.path.relpath(str(item.path), os.getcwd())
+        _, _, name = item.nodeid.partition("::")
+        return f"{path}::{name}" if name else path
+
+    def _record_sources(self) -> None:
+        project_root = os.getcwd()
+        for module in list(sys.modules.values()):
+            if not _is_project_module(module, project_root):
+                continue
+            path = os.path.abspath(module.__file__)
+            if not path.endswith(".py") or path in self._sources:
+                continue
+            try:
+                stat = os.stat(path)
+                with open(path, "rb") as f:
+                    self._sources[path] = ((stat.st_mtime_ns, stat.st_size), f.read())
+            except OSError:
+                continue
+
+    def _swap_mutants(self) -> None:
+        """
+        Swaps the mutants on disk and the import hook's target into the imported
+        modules.
+        """
+        for path, (signature, source) in self._sources.items():
+            try:
+                stat = os.stat(path)
+                if (stat.st_mtime_ns, stat.st_size) == signature:
+                    continue
+                with open(path, "rb") as f:
+                    mutant = f.read()
+            except OSError:
+                raise _Unpatchable(f"{path} cannot be read.")
+            if mutant != source:
+                _patch_module(path, source, mutant)
+        target = os.environ.get(TARGET_ENV_VAR)
+        if not target:
+            return
+        target = os.path.abspath(target)
+        if target not in self._sources:
+            # Not imported yet: the hook serves the mutant when it is.
+            _install_import_hook()
+            return
+        with open(os.environ[SOURCE_ENV_VAR], "rb") as f:
+            mutant = f.read()
+        _patch_module(target, self._sources[target][1], mutant)
+        _report("installed")
+        _report("served")
+
+    def _run_collected(self, request: dict) -> None:
+        """Runs the selected tests like pytest's own run-test loop."""
+        session = self._session
+        config = session.config
+        items = request["items"]
+        extras = request["extras"]
+        i = 0
+        while i < len(extras):
+            if extras[i] == "-p":
+                self._load_plugin(extras[i + 1], items)
+                i += 2
+                continue
+            if extras[i] in ("-x", "--exitfirst"):
+                config.option.maxfail = 1
+            else:
+                config.option.maxfail = int(extras[i].partition("=")[2])
+            i += 1
+        session.items = items
+        for i, item in enumerate(items):
+            next_item = items[i + 1] if i + 1 < len(items) else None
+            item.config.hook.pytest_runtest_protocol(item=item, nextitem=next_item)
+            if session.shouldfail:
+                raise session.Failed(session.shouldfail)
+            if session.shouldstop:
+                raise session.Interrupted(session.shouldstop)
+
+    def _load_plugin(self, name: str, items: list) -> None:
+        config = self._session.config
+        manager = config.pluginmanager
+        if name.startswith("no:") or manager.has_plugin(name):
+            return
+        plugin = importlib.import_module(name)
+        manager.register(plugin, name)
+        # Let the plugin, and only the plugin, reorder or deselect the tests.
+        others = [p for p in manager.get_plugins() if p is not plugin]
+        manager.subset_hook_caller("pytest_collection_modifyitems", others)(
+            session=self._session, config=config, items=items
+        )
+
+    def _run_fresh(self, args: List[str]) -> None:
+        """Runs the request like a new pytest process would, and exits."""
+        _drop_project_modules(os.getcwd())
+        _install_import_hook()
+        code = 3
+        try:
+            code = int(pytest.main(list(args)))
+        finally:
+            self.exit(code)
+
+    def exit(self, code: int) -> None:
+        """Ends a child."""
+        sys.stdout.flush()
+        sys.stderr.flush()
+        if self.pycache_prefix is not None:
+            shutil.rmtree(self.pycache_prefix, ignore_errors=True)
+        os._exit(code)
+
+
+def main() -> None:
+    options = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+    # The script's directory is not part of the project under test.
+    del sys.path[0]
+    if options.get("module_mode"):
+        sys.path.insert(0, os.getcwd())
+    channel = os.fdopen(os.dup(1), "w", buffering=1)
+    requests = os.fdopen(os.dup(0), "r")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    for fd in (1, 2):
+        output = tempfile.TemporaryFile()
+        os.dup2(output.fileno(), fd)
+        output.close()
+
+    server = WarmSession(options, channel, requests)
+    code = 3
+    try:
+        code = pytest.main(
+            ["-p", "no:cacheprovider", *options.get("warmup_args", [])],
+            plugins=[server],
+        )
+    except Exception:
+        pass
+    if server.child_request is not None:
+        server.exit(int(code))
+    if not server.served:
+        # The session ended before its tests ran, e.g. on a usage error.
+        server.serve()
+
+
+if __name__ == "__main__":
+    main()
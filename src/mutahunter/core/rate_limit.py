@@ -0,0 +1,191 @@
+"""
+Module for pacing LLM calls to the provider's rate limits and retrying the calls
+it rejects.
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from litellm import litellm
+
+# Errors worth retrying: the provider may accept the same call a little later.
+RETRYABLE_ERRORS = (
+    litellm.RateLimitError,
+    litellm.APIConnectionError,
+    litellm.Timeout,
+    litellm.InternalServerError,
+    litellm.ServiceUnavailableError,
+    litellm.BadGatewayError,
+)
+
+
+class TokenBucket:
+    """
+    Paces takers to a steady rate.
+
+    The bucket refills at ``rate`` tokens a second and holds at most ``capacity``.
+    A taker that finds too few tokens still takes them, leaving the bucket in
+    debt, and waits until the debt is paid off, so takers are served in the order
+    they arrive. Without a rate, takers only wait while the bucket is paused.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 0.0)
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount: float = 1.0) -> float:
+        """
+        Takes tokens from the bucket.
+
+        Returns:
+            float: The seconds to wait before using them.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate is None:
+                return max(0.0, self.paused_until - now)
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """Makes every taker wait at least this long, e.g. after a rate limit error."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """
+    Paces the LLM calls of each model to a number of requests and of tokens per
+    minute. Without limits, calls are only held back by `pause`.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._buckets: Dict[str, Tuple[TokenBucket, Optional[TokenBucket]]] = {}
+        self._lock = threading.Lock()
+
+    def _model_buckets(self, model: str) -> Tuple[TokenBucket, Optional[TokenBucket]]:
+        with self._lock:
+            if model not in self._buckets:
+                # An unlimited bucket still carries the pauses.
+                requests = TokenBucket(
+                    self.requests_per_minute / 60 if self.requests_per_minute else None,
+                    capacity=1.0,
+                )
+                tokens = None
+                if self.tokens_per_minute:
+                    tokens = TokenBucket(
+                        self.tokens_per_minute / 60, capacity=self.tokens_per_minute
+                    )
+                self._buckets[model] = (requests, tokens)
+            return self._buckets[model]
+
+    def _wait(self, model: str, tokens: int) -> float:
+        requests_bucket, tokens_bucket = self._model_buckets(model)
+        wait = requests_bucket.take()
+        if tokens_bucket is not None:
+            wait = max(wait, tokens_bucket.take(tokens))
+        return wait
+
+    def acquire(self, model: str, tokens: int = 0) -> None:
+        """Waits until a call of about this many tokens may be made."""
+        wait = self._wait(model, tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, model: str, tokens: int = 0) -> None:
+        """Asynchronously waits until a call of about this many tokens may be made."""
+        wait = self._wait(model, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, model: str, seconds: float) -> None:
+        """Holds back every call of a model for some seconds."""
+        self._model_buckets(model)[0].pause(seconds)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Returns the seconds a provider asked to wait in the ``Retry-After`` header of
+    an error response, if any.
+    """
+    headers = getattr(error, "litellm_response_headers", None)
+    if headers is None:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed LLM call is retried.
+
+    Rate limit errors, connection errors, timeouts and 5xx responses are retried
+    up to ``max_retries`` times per call and ``retry_budget`` times per run, so a
+    provider that is down does not hold a run up indefinitely. Delays grow
+    exponentially from ``base_delay`` up to ``max_delay`` with full jitter, unless
+    the provider said how long to wait in a ``Retry-After`` header.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        retry_budget: int = 50,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Returns the seconds to wait before retrying a call, or None to give up.
+
+        Args:
+            attempt (int): The number of the failed attempt, 0-based.
+            error (Exception): What the attempt raised.
+        """
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+            return None
+        with self._lock:
+            if self.retries >= self.retry_budget:
+                return None
+            self.retries += 1
+        requested = retry_after(error)
+        if requested is not None:
+            # A little jitter keeps waiting calls from retrying all at once.
+            return requested * random.uniform(1.0, 1.2)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
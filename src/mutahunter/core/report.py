@@ -27,6 +27,11 @@ class MutantReport:
         survived_mutants: int,
         compile_error_mutants: int,
         timeout_mutants: int,
+        llm_cache_hits: int = 0,
+        saved_cost: float = 0.0,
+        duplicate_mutants: int = 0,
+        equivalent_mutants: int = 0,
+        unsent_requests: int = 0,
     ) -> None:
         """
         Generates a comprehensive mutation testing report.
@@ -38,6 +43,13 @@ class MutantReport:
             survived_mutants (int): The number of survived mutants.
             compile_error_mutants (int): The number of compile error mutants.
             timeout_mutants (int): The number of timeout mutants.
+            llm_cache_hits (int): The number of LLM responses served from the cache.
+            saved_cost (float): The cost of the LLM responses served from the cache.
+            duplicate_mutants (int): The number of mutants skipped as duplicates.
+            equivalent_mutants (int): The number of mutants skipped because they
+                only change comments or whitespace.
+            unsent_requests (int): The number of LLM requests left out because
+                the budget ran out. The report then only covers part of the code.
         """
         print(MUTAHUNTER_ASCII)
         summary_text = self._format_summary(
@@ -47,6 +59,11 @@ class MutantReport:
             compile_error_mutants,
             timeout_mutants,
             total_cost,
+            llm_cache_hits,
+            saved_cost,
+            duplicate_mutants,
+            equivalent_mutants,
+            unsent_requests,
         )
         print(summary_text)
 
@@ -62,6 +79,11 @@ class MutantReport:
         compile_error_mutants: int,
         timeout_mutants: int,
         total_cost: float,
+        llm_cache_hits: int = 0,
+        saved_cost: float = 0.0,
+        duplicate_mutants: int = 0,
+        equivalent_mutants: int = 0,
+        unsent_requests: int = 0,
     ) -> str:
         """
         Formats the summary data into a string.
@@ -70,6 +92,12 @@ class MutantReport:
             data (Dict[str, Any]): Summary data including counts of different mutant statuses.
             total_cost (float): The total cost of mutation testing.
             line_rate (float): The line coverage rate.
+            llm_cache_hits (int): The number of LLM responses served from the cache.
+            saved_cost (float): The cost of the LLM responses served from the cache.
+            duplicate_mutants (int): The number of mutants skipped as duplicates.
+            equivalent_mutants (int): The number of mutants skipped as equivalent.
+            unsent_requests (int): The number of LLM requests left out because the
+                budget ran out.
 
         Returns:
             str: Formatted summary report.
@@ -79,12 +107,26 @@ class MutantReport:
             f"\n=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\n",
             "📊 Overall Mutation Coverage 📊",
             f"🎯 Mutation Coverage: {mutation_coverage} 🎯",
-            f"🦠 Total Mutants: {survived_mutants + killed_mutants} 🦠",
+            f"🦠 Total Mutants: {survived_mutants + killed_mutants + timeout_mutants} 🦠",
             f"🛡️ Survived Mutants: {survived_mutants} 🛡️",
             f"🗡️ Killed Mutants: {killed_mutants} 🗡️",
             f"🕒 Timeout Mutants: {timeout_mutants} 🕒",
             f"🔥 Compile Error Mutants: {compile_error_mutants} 🔥",
-            f"💰 Total Cost: ${total_cost:.5f} USD 💰",
-            f"\n=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\n",
         ]
+        if duplicate_mutants or equivalent_mutants:
+            details.append(
+                f"⏭️ Skipped Mutants: {duplicate_mutants} duplicate, "
+                f"{equivalent_mutants} equivalent ⏭️"
+            )
+        details.append(f"💰 Total Cost: ${total_cost:.5f} USD 💰")
+        if llm_cache_hits:
+            details.append(
+                f"♻️ LLM Cache Hits: {llm_cache_hits} (saved ${saved_cost:.5f} USD) ♻️"
+            )
+        if unsent_requests:
+            details.append(
+                f"💸 Budget Exhausted: {unsent_requests} requests not sent, "
+                "the report is partial 💸"
+            )
+        details.append(f"\n=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\n")
         return "\n".join(details)
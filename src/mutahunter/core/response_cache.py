@@ -0,0 +1,123 @@
+"""
+Module for caching LLM responses across runs.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+RESPONSE_CACHE_PATH = os.path.join("logs", "cache", "llm_responses.sqlite")
+
+# Parameters that do not change the content of a response.
+UNKEYED_PARAMS = {"stream"}
+
+
+def response_key(completion_params: Dict[str, Any]) -> str:
+    """Returns the cache key of a completion call: the model, messages and params."""
+    keyed = {k: v for k, v in completion_params.items() if k not in UNKEYED_PARAMS}
+    payload = json.dumps(keyed, sort_keys=True, default=str)
+    return hashlib.sha256(
+        ("mutahunter-response-v1\0" + payload).encode("utf8")
+    ).hexdigest()
+
+
+class ResponseCache:
+    """
+    Stores LLM responses under a hash of the completion parameters.
+
+    The cache is a SQLite database. Entries older than ``ttl`` seconds are
+    ignored and removed, and at most ``max_entries`` responses are kept, evicting
+    the least recently used ones.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_entries: int = 10_000,
+    ) -> None:
+        self.path = os.path.abspath(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                cost REAL NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored response for a key unless it expired."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, prompt_tokens, completion_tokens, cost, created "
+                "FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[4] > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+        return {
+            "content": row[0],
+            "prompt_tokens": row[1],
+            "completion_tokens": row[2],
+            "cost": row[3],
+        }
+
+    def put(
+        self,
+        key: str,
+        model: str,
+        content: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost: float,
+    ) -> None:
+        """Stores a response and evicts expired and least recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, prompt_tokens, "
+                "completion_tokens, cost, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, prompt_tokens, completion_tokens, cost, now, now),
+            )
+            if self.ttl is not None:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+                )
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
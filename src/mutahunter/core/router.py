@@ -1,21 +1,59 @@
+import asyncio
+import itertools
+import threading
 import time
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, Optional, Tuple
 
 import yaml
-from litellm import completion, litellm
+from litellm import acompletion, completion, litellm
 
+from mutahunter.core.budget import GenerationBudget
+from mutahunter.core.exceptions import BudgetExceededError, LLMRequestError
+from mutahunter.core.logger import logger
 from mutahunter.core.prompt_factory import YAMLFixerPromptFactory
+from mutahunter.core.rate_limit import RateLimiter, RetryPolicy
+from mutahunter.core.response_cache import ResponseCache, response_key
 
 
 class LLMRouter:
-    def __init__(self, model: str, api_base: str = "") -> None:
+    def __init__(
+        self,
+        model: str,
+        api_base: str = "",
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[GenerationBudget] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
         """
-        Initialize the LLMRouter with a model and optional API base URL.
+        Initialize the LLMRouter with a model, optional API base URL, optional
+        response cache, optional budget for the LLM calls and the rate limiter
+        and retry policy the calls go through.
         """
         self.model = model
         self.api_base = api_base
+        self.cache = cache
+        self.budget = budget
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Calls given up on after their retries.
+        self.failed_requests = 0
+        # Longest response so far, the estimate of the next one's length.
+        self.max_completion_tokens = 0
         self.total_cost = 0
+        self.cache_hits = 0
+        self.saved_cost = 0.0
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_lock = threading.Lock()
         litellm.success_callback = [self.track_cost_callback]
         self.yaml_prompt = YAMLFixerPromptFactory().get_prompt()
+        if budget is not None and budget.max_cost is not None:
+            if not self.has_pricing():
+                logger.warning(
+                    f"No pricing is known for {model}, so its calls cost $0 and "
+                    f"--max-cost does not limit them. Use --max-tokens instead."
+                )
 
     def track_cost_callback(
         self,
@@ -31,7 +69,11 @@ class LLMRouter:
             pass
 
     def generate_response(
-        self, prompt: dict, max_tokens: int = 4096, streaming: bool = False
+        self,
+        prompt: dict,
+        max_tokens: int = 4096,
+        streaming: bool = False,
+        response_format: Optional[dict] = None,
     ) -> tuple:
         """
         Call the LLM model with the provided prompt and return the generated response.
@@ -40,6 +82,48 @@ class LLMRouter:
             prompt (dict): A dictionary containing 'system' and 'user' keys.
             max_tokens (int): Maximum number of tokens for the response.
             streaming (bool): Flag to enable or disable streaming response.
+            response_format (Optional[dict]): The structured output the response
+                has to follow, see `structured_output`.
+
+        Returns:
+            tuple: Generated response, prompt tokens used, and completion tokens used.
+        """
+        self._validate_prompt(prompt)
+        messages = self._build_messages(prompt)
+        completion_params = self._build_completion_params(
+            messages, max_tokens, streaming, response_format
+        )
+        if self.cache is None:
+            return self._budgeted_complete(completion_params, messages, streaming)
+        key = response_key(completion_params)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        flight, leader = self._join_flight(key)
+        if not leader:
+            return self._follow_flight(flight.result())
+        response = ("", 0, 0)
+        try:
+            response = self._budgeted_complete(completion_params, messages, streaming)
+        finally:
+            self._finish_flight(key, flight, response)
+        return response
+
+    async def agenerate_response(
+        self,
+        prompt: dict,
+        max_tokens: int = 4096,
+        response_format: Optional[dict] = None,
+    ) -> tuple:
+        """
+        Asynchronously call the LLM model with the provided prompt. Used to run many
+        requests at the same time, so the response is not streamed.
+
+        Args:
+            prompt (dict): A dictionary containing 'system' and 'user' keys.
+            max_tokens (int): Maximum number of tokens for the response.
+            response_format (Optional[dict]): The structured output the response
+                has to follow, see `structured_output`.
 
         Returns:
             tuple: Generated response, prompt tokens used, and completion tokens used.
@@ -47,18 +131,353 @@ class LLMRouter:
         self._validate_prompt(prompt)
         messages = self._build_messages(prompt)
         completion_params = self._build_completion_params(
-            messages, max_tokens, streaming
+            messages, max_tokens, False, response_format
+        )
+        if self.cache is None:
+            return await self._budgeted_acomplete(completion_params)
+        key = response_key(completion_params)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        flight, leader = self._join_flight(key)
+        if not leader:
+            return self._follow_flight(await asyncio.wrap_future(flight))
+        response = ("", 0, 0)
+        try:
+            response = await self._budgeted_acomplete(completion_params)
+        finally:
+            self._finish_flight(key, flight, response)
+        return response
+
+    async def astream_response(
+        self,
+        prompt: dict,
+        max_tokens: int = 4096,
+        response_format: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Asynchronously call the LLM model with the provided prompt and yield the
+        response text as it arrives.
+
+        Args:
+            prompt (dict): A dictionary containing 'system' and 'user' keys.
+            max_tokens (int): Maximum number of tokens for the response.
+            response_format (Optional[dict]): The structured output the response
+                has to follow, see `structured_output`.
+
+        Yields:
+            str: The next piece of the response. A cached response is yielded
+            whole.
+        """
+        self._validate_prompt(prompt)
+        messages = self._build_messages(prompt)
+        completion_params = self._build_completion_params(
+            messages, max_tokens, True, response_format
         )
+        key = flight = None
+        if self.cache is not None:
+            key = response_key(completion_params)
+            cached = self._cached_response(key)
+            if cached is not None:
+                yield cached[0]
+                return
+            flight, leader = self._join_flight(key)
+            if not leader:
+                content, _, _ = self._follow_flight(await asyncio.wrap_future(flight))
+                if content:
+                    yield content
+                return
+        response = ("", 0, 0)
+        reservation = None
+        interrupted = False
+        try:
+            reservation = self._reserve(completion_params)
+            tokens = self._rate_limited_tokens(completion_params)
+            for attempt in itertools.count():
+                await self.rate_limiter.aacquire(self.model, tokens)
+                chunks = []
+                try:
+                    stream = await acompletion(**self._call_params(completion_params))
+                    async for chunk in stream:
+                        chunks.append(chunk)
+                        content = chunk.choices[0].delta.content
+                        if content:
+                            yield content
+                    response = self._process_response(chunks, messages)
+                except Exception as e:
+                    if chunks:
+                        # The text already handed out cannot be taken back.
+                        logger.error(f"Error during response generation: {e}")
+                        interrupted = True
+                        break
+                    await asyncio.sleep(self._retry_delay(attempt, e))
+                    continue
+                # litellm only runs success_callback for synchronous calls.
+                with self._in_flight_lock:
+                    self.total_cost += self._response_cost(*response[1:])
+                break
+        finally:
+            self._settle(reservation, response, interrupted)
+            if flight is not None:
+                self._finish_flight(key, flight, response)
 
+    def _count_tokens(self, messages: list) -> int:
+        """
+        Count the tokens of the messages of a call, or estimate them from their
+        length if the model's tokenizer is not known.
+        """
         try:
-            if streaming:
-                response_chunks = self._stream_response(completion_params)
-                return self._process_response(response_chunks, messages)
-            else:
-                return self._non_stream_response(completion_params)
-        except Exception as e:
-            print(f"Error during response generation: {e}")
-            return "", 0, 0
+            return litellm.token_counter(model=self.model, messages=messages)
+        except Exception:
+            return sum(len(message["content"]) for message in messages) // 4
+
+    def estimate(self, prompt: dict, max_tokens: int = 4096) -> Tuple[int, float]:
+        """
+        Estimate the tokens and cost of calling the LLM model with a prompt.
+
+        The response is expected to be as long as the longest one so far or,
+        before there is one, as long as the prompt; never longer than `max_tokens`.
+
+        Returns:
+            Tuple[int, float]: The estimated tokens and cost.
+        """
+        return self._estimate(self._build_messages(prompt), max_tokens)
+
+    def _estimate(self, messages: list, max_tokens: int) -> Tuple[int, float]:
+        prompt_tokens = self._count_tokens(messages)
+        completion_tokens = min(max_tokens, self.max_completion_tokens or prompt_tokens)
+        return (
+            prompt_tokens + completion_tokens,
+            self._response_cost(prompt_tokens, completion_tokens),
+        )
+
+    def _reserve(self, completion_params: dict) -> Optional[Tuple[int, float]]:
+        """
+        Reserve the estimated tokens and cost of a call in the budget.
+
+        Raises:
+            BudgetExceededError: If the call does not fit in what is left.
+        """
+        if self.budget is None:
+            return None
+        tokens, cost = self._estimate(
+            completion_params["messages"], completion_params["max_tokens"]
+        )
+        reservation = self.budget.reserve(tokens, cost)
+        if reservation is None:
+            raise BudgetExceededError(
+                f"The LLM call of about {tokens} tokens (${cost:.5f}) does not fit "
+                f"in the budget: {self.budget.describe()} spent."
+            )
+        return reservation
+
+    def _settle(
+        self,
+        reservation: Optional[Tuple[int, float]],
+        response: tuple,
+        interrupted: bool = False,
+    ) -> None:
+        """
+        Replace the reservation of a call in the budget by what it used. A stream
+        that broke off used tokens but reports none, so it is charged what was
+        reserved for it.
+        """
+        _, prompt_tokens, completion_tokens = response
+        with self._in_flight_lock:
+            self.max_completion_tokens = max(
+                self.max_completion_tokens, completion_tokens
+            )
+        if reservation is None:
+            return
+        if interrupted:
+            self.budget.settle(reservation, *reservation)
+        else:
+            self.budget.settle(
+                reservation,
+                prompt_tokens + completion_tokens,
+                self._response_cost(prompt_tokens, completion_tokens),
+            )
+
+    def _budgeted_complete(
+        self, completion_params: dict, messages: list, streaming: bool
+    ) -> tuple:
+        reservation = self._reserve(completion_params)
+        response = ("", 0, 0)
+        try:
+            response = self._complete(completion_params, messages, streaming)
+        finally:
+            self._settle(reservation, response)
+        return response
+
+    async def _budgeted_acomplete(self, completion_params: dict) -> tuple:
+        reservation = self._reserve(completion_params)
+        response = ("", 0, 0)
+        try:
+            response = await self._acomplete(completion_params)
+        finally:
+            self._settle(reservation, response)
+        return response
+
+    def _cached_response(self, key: str) -> Optional[tuple]:
+        """
+        Return the cached response for a request, if any.
+        """
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        logger.info("Using cached LLM response.")
+        self._record_hit(cached["cost"])
+        return cached["content"], cached["prompt_tokens"], cached["completion_tokens"]
+
+    def _join_flight(self, key: str) -> Tuple[Future, bool]:
+        """
+        Return the in-flight call for a request, starting one if there is none.
+        Identical requests made while the call is in flight wait for its response
+        instead of calling the LLM model again.
+
+        Returns:
+            Tuple[Future, bool]: The call and whether the caller has to make it.
+        """
+        with self._in_flight_lock:
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._in_flight[key] = Future()
+            return flight, True
+
+    def _follow_flight(self, result: tuple) -> tuple:
+        content, prompt_tokens, completion_tokens, cost = result
+        if content:
+            self._record_hit(cost)
+        return content, prompt_tokens, completion_tokens
+
+    def _finish_flight(self, key: str, flight: Future, response: tuple) -> None:
+        """
+        Cache the response of an in-flight call and hand it to the waiting requests.
+        """
+        content, prompt_tokens, completion_tokens = response
+        cost = self._response_cost(prompt_tokens, completion_tokens)
+        try:
+            if content:
+                self.cache.put(
+                    key, self.model, content, prompt_tokens, completion_tokens, cost
+                )
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+            flight.set_result((content, prompt_tokens, completion_tokens, cost))
+
+    def _record_hit(self, cost: float) -> None:
+        with self._in_flight_lock:
+            self.cache_hits += 1
+            self.saved_cost += cost
+
+    def has_pricing(self) -> bool:
+        """Check whether litellm knows what the model's tokens cost."""
+        return self._response_cost(1, 1) > 0
+
+    def _response_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """
+        Return the cost of a response, or 0.0 if the model has no known pricing.
+        """
+        try:
+            prompt_cost, completion_cost = litellm.cost_per_token(
+                model=self.model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            )
+            return prompt_cost + completion_cost
+        except Exception:
+            return 0.0
+
+    def _complete(
+        self, completion_params: dict, messages: list, streaming: bool
+    ) -> tuple:
+        """
+        Call the LLM model and return the response and token counts, retrying
+        calls the provider rejects.
+
+        Raises:
+            LLMRequestError: If the call failed and is not retried.
+        """
+        tokens = self._rate_limited_tokens(completion_params)
+        for attempt in itertools.count():
+            self.rate_limiter.acquire(self.model, tokens)
+            try:
+                if streaming:
+                    response_chunks = self._stream_response(
+                        self._call_params(completion_params)
+                    )
+                    return self._process_response(response_chunks, messages)
+                else:
+                    return self._non_stream_response(
+                        self._call_params(completion_params)
+                    )
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, e))
+
+    async def _acomplete(self, completion_params: dict) -> tuple:
+        """
+        Asynchronously call the LLM model and return the response and token counts,
+        retrying calls the provider rejects.
+
+        Raises:
+            LLMRequestError: If the call failed and is not retried.
+        """
+        tokens = self._rate_limited_tokens(completion_params)
+        for attempt in itertools.count():
+            await self.rate_limiter.aacquire(self.model, tokens)
+            try:
+                response = await acompletion(**self._call_params(completion_params))
+                content = response["choices"][0]["message"]["content"]
+                prompt_tokens = int(response["usage"]["prompt_tokens"])
+                completion_tokens = int(response["usage"]["completion_tokens"])
+                break
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+        # litellm only runs success_callback for synchronous calls.
+        with self._in_flight_lock:
+            self.total_cost += self._response_cost(prompt_tokens, completion_tokens)
+        return content, prompt_tokens, completion_tokens
+
+    @staticmethod
+    def _call_params(completion_params: dict) -> dict:
+        # Failed calls are retried here rather than by the provider's client.
+        return {**completion_params, "max_retries": 0}
+
+    def _rate_limited_tokens(self, completion_params: dict) -> int:
+        """
+        Return the estimated tokens of a call if the rate limiter paces tokens.
+        """
+        if not self.rate_limiter.tokens_per_minute:
+            return 0
+        return self._estimate(
+            completion_params["messages"], completion_params["max_tokens"]
+        )[0]
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """
+        Return how long to wait before retrying a failed call. Rate limit errors
+        hold back every call of the model for that long.
+
+        Raises:
+            LLMRequestError: If the call is not retried.
+        """
+        delay = self.retry_policy.delay(attempt, error)
+        if delay is None:
+            with self._in_flight_lock:
+                self.failed_requests += 1
+            logger.error(f"Error during response generation: {error}")
+            raise LLMRequestError(
+                f"LLM call failed after {attempt + 1} attempts: {error}"
+            ) from error
+        if isinstance(error, litellm.RateLimitError):
+            self.rate_limiter.pause(self.model, delay)
+        logger.warning(
+            f"LLM call failed ({type(error).__name__}), retrying in {delay:.1f}s "
+            f"({attempt + 1}/{self.retry_policy.max_retries})."
+        )
+        return delay
 
     def _validate_prompt(self, prompt: dict) -> None:
         """
@@ -78,8 +497,33 @@ class LLMRouter:
             {"role": "user", "content": prompt["user"]},
         ]
 
+    def structured_output(self, name: str, schema: dict) -> Optional[dict]:
+        """
+        Return the response format that makes the model answer with JSON matching
+        a schema, as far as the model supports it: the schema itself where the
+        provider enforces JSON schemas (litellm turns it into a tool call for
+        providers that only have tool calling), plain JSON mode otherwise, and
+        None if the model has no structured output at all.
+        """
+        try:
+            if litellm.supports_response_schema(model=self.model):
+                return {
+                    "type": "json_schema",
+                    "json_schema": {"name": name, "schema": schema, "strict": True},
+                }
+            supported = litellm.get_supported_openai_params(model=self.model) or []
+        except Exception:
+            return None
+        if "response_format" in supported:
+            return {"type": "json_object"}
+        return None
+
     def _build_completion_params(
-        self, messages: list, max_tokens: int, streaming: bool
+        self,
+        messages: list,
+        max_tokens: int,
+        streaming: bool,
+        response_format: Optional[dict] = None,
     ) -> dict:
         """
         Build the parameters for the LLM completion call.
@@ -91,6 +535,8 @@ class LLMRouter:
             "stream": streaming,
             "temperature": 0.0,
         }
+        if response_format is not None:
+            completion_params["response_format"] = response_format
         if (
             "ollama" in self.model
             or "huggingface" in self.model
@@ -109,9 +555,6 @@ class LLMRouter:
         for chunk in response:
             print(chunk.choices[0].delta.content or "", end="", flush=True)
             response_chunks.append(chunk)
-            time.sleep(
-                0.01
-            )  # Optional: Delay to simulate more 'natural' response pacing
         print("\n")
         return response_chunks
 
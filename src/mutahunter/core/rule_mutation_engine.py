@@ -0,0 +1,335 @@
+"""
+Module for generating classic operator mutants straight from the syntax tree,
+without an LLM.
+"""
+
+import bisect
+import queue
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.block_index import BlockRecord
+from mutahunter.core.git_diff import intersect_line_ranges, merge_line_ranges
+from mutahunter.core.llm_mutation_engine import LLMMutationEngine, MutationRequest
+from mutahunter.core.logger import logger
+from mutahunter.core.parsers import filename_to_lang, get_cached_parser
+
+# Replacements of binary operator tokens, by mutation operator.
+BINARY_OPERATORS: Dict[str, Dict[str, List[str]]] = {
+    "relational_flip": {
+        "<": [">="],
+        "<=": [">"],
+        ">": ["<="],
+        ">=": ["<"],
+        "==": ["!="],
+        "!=": ["=="],
+        "===": ["!=="],
+        "!==": ["==="],
+    },
+    "boundary_shift": {"<": ["<="], "<=": ["<"], ">": [">="], ">=": [">"]},
+    "arithmetic_swap": {
+        "+": ["-"],
+        "-": ["+"],
+        "*": ["/"],
+        "/": ["*"],
+        "%": ["*"],
+    },
+    "logical_swap": {"&&": ["||"], "||": ["&&"], "and": ["or"], "or": ["and"]},
+}
+BOOLEAN_LITERALS = {
+    "true": "false",
+    "false": "true",
+    "True": "False",
+    "False": "True",
+    "TRUE": "FALSE",
+    "FALSE": "TRUE",
+}
+BOOLEAN_TYPES = {"true", "false", "boolean", "boolean_literal"}
+NEGATION_OPERATORS = {"!", "not"}
+RETURN_TYPES = {"return_statement", "return_expression", "return", "jump_expression"}
+NUMBER_TYPE_WORDS = ("integer", "float", "number", "int_literal", "real_literal")
+# Values any returned expression can be replaced with. Statically typed languages
+# only get their returned numbers replaced, so the mutants still compile.
+NULL_VALUES = {
+    "python": "None",
+    "javascript": "null",
+    "ruby": "nil",
+    "php": "null",
+    "r": "NULL",
+}
+
+
+class RuleMutationEngine:
+    """
+    Generates mutants with the classic mutation operators: flipped relational
+    operators, shifted boundaries, swapped arithmetic and logical operators,
+    negated booleans and replaced return values.
+
+    The operators are matched on the tree-sitter tree of the file, by token and
+    node types that the grammars of every supported language share, inside the
+    function blocks the `Analyzer` finds. Mutants have the same shape as those of
+    `LLMMutationEngine.generate`, are generated offline at no cost and are the
+    same for the same code.
+
+    With an LLM engine, the engine is a hybrid: each request gets the rule
+    mutants and the LLM mutants of its lines, and the LLM engine is expected to
+    only ask for the semantic mutants rules cannot find.
+    """
+
+    def __init__(
+        self, analyzer: Analyzer, llm_engine: Optional[LLMMutationEngine] = None
+    ) -> None:
+        self.analyzer = analyzer
+        self.llm_engine = llm_engine
+
+    def plan_requests(
+        self,
+        source_file_path: str,
+        line_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> List[MutationRequest]:
+        """
+        Returns the requests for a source file: one for the whole file, or the
+        ones the LLM engine sends in a hybrid.
+        """
+        if self.llm_engine is not None:
+            return self.llm_engine.plan_requests(source_file_path, line_ranges)
+        return [MutationRequest(source_file_path, line_ranges)]
+
+    def estimate(self, request: MutationRequest) -> Tuple[int, float]:
+        """Estimates the tokens and cost of a request. Rule mutants are free."""
+        if self.llm_engine is not None:
+            return self.llm_engine.estimate(request)
+        return 0, 0.0
+
+    def generate(
+        self,
+        source_file_path: str,
+        line_ranges: Optional[List[Tuple[int, int]]] = None,
+        context_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generates the rule mutants of a source file.
+
+        Args:
+            source_file_path (str): The path of the source file.
+            line_ranges (Optional[List[Tuple[int, int]]]): Inclusive, sorted line
+                ranges to mutate. Defaults to the whole file.
+            context_ranges (Optional[List[Tuple[int, int]]]): Ignored; rules need
+                no context.
+
+        Returns:
+            Dict[str, Any]: The mutants, in order of their lines.
+        """
+        lang = filename_to_lang(source_file_path)
+        if lang is None:
+            return {"mutants": []}
+        try:
+            with open(source_file_path, "rb") as f:
+                source_code = f.read()
+            functions = self.analyzer.get_block_records(source_file_path, source_code)
+        except Exception as e:
+            logger.error(f"Error generating rule mutants for {source_file_path}: {e}")
+            return {"mutants": []}
+        functions = [
+            record
+            for record in functions
+            if record.kind in ("definition.function", "definition.method")
+        ]
+        # Files without function blocks, e.g. scripts, are mutated as a whole.
+        mutated_ranges = merge_line_ranges(
+            [
+                (record.start_point[0] + 1, record.end_point[0] + 1)
+                for record in functions
+            ]
+        ) or [(1, source_code.count(b"\n") + 1)]
+        if line_ranges is not None:
+            mutated_ranges = intersect_line_ranges(mutated_ranges, line_ranges)
+        rows = [(start - 1, end - 1) for start, end in mutated_ranges]
+        tree = get_cached_parser(lang).parse(source_code)
+        mutants = _RuleMutator(lang, source_code, functions).mutate(
+            tree.root_node, rows
+        )
+        logger.info(f"Generated {len(mutants)} rule mutants for {source_file_path}.")
+        return {"mutants": mutants}
+
+    def generate_many(
+        self,
+        requests: Iterable[MutationRequest],
+        concurrency: int = 4,
+        max_pending: Optional[int] = None,
+        stream: bool = False,
+    ) -> Iterator[Tuple[MutationRequest, Dict[str, Any]]]:
+        """
+        Generates mutants for many requests, like `LLMMutationEngine.generate_many`.
+
+        In a hybrid, the rule mutants of a request are generated when the LLM
+        engine takes the request. When streaming, they are yielded as a result of
+        their own before the LLM mutants of the request; otherwise they are added
+        to the LLM's result. Rule mutants of requests the LLM engine skipped are
+        yielded last, without completing their request, so a resumed run
+        generates the request again.
+        """
+        if self.llm_engine is None:
+            for request in requests:
+                result = self.generate(request.source_file_path, request.line_ranges)
+                result["complete"] = True
+                yield request, result
+            return
+        ruled: queue.Queue = queue.Queue()
+
+        def with_rules() -> Iterator[MutationRequest]:
+            # Runs in the thread of the LLM engine, as it takes each request.
+            for request in requests:
+                result = self.generate(request.source_file_path, request.line_ranges)
+                ruled.put((request, result["mutants"]))
+                yield request
+
+        waiting: Dict[int, Tuple[MutationRequest, List[Dict[str, Any]]]] = {}
+
+        def take_ruled() -> Iterator[Tuple[MutationRequest, Dict[str, Any]]]:
+            while True:
+                try:
+                    request, mutants = ruled.get_nowait()
+                except queue.Empty:
+                    return
+                if stream:
+                    if mutants:
+                        yield request, {"mutants": mutants, "complete": False}
+                else:
+                    waiting[id(request)] = (request, mutants)
+
+        for request, result in self.llm_engine.generate_many(
+            with_rules(),
+            concurrency=concurrency,
+            max_pending=max_pending,
+            stream=stream,
+        ):
+            yield from take_ruled()
+            if not stream and result.get("complete", True):
+                _, mutants = waiting.pop(id(request), (request, []))
+                result["mutants"] = mutants + (result.get("mutants") or [])
+            yield request, result
+        yield from take_ruled()
+        for request, mutants in waiting.values():
+            if mutants:
+                yield request, {"mutants": mutants, "complete": False}
+
+
+class _RuleMutator:
+    """Finds the rule mutants in the rows of one parsed source file."""
+
+    def __init__(
+        self, lang: str, source_code: bytes, functions: List[BlockRecord]
+    ) -> None:
+        self.lang = lang
+        self.source_code = source_code
+        self.functions = functions
+        self.lines = source_code.splitlines(keepends=True)
+        self.line_starts = []
+        offset = 0
+        for line in self.lines:
+            self.line_starts.append(offset)
+            offset += len(line)
+        self.mutants: List[Dict[str, Any]] = []
+        self._seen: Set[Tuple[int, bytes]] = set()
+
+    def mutate(self, root, rows: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """
+        Returns the mutants of the nodes that start in the sorted, disjoint,
+        inclusive and 0-based row ranges.
+        """
+        self._starts = [start for start, _ in rows]
+        self._ends = [end for _, end in rows]
+        self._visit(root)
+        self.mutants.sort(key=lambda mutant: mutant["line_number"])
+        return self.mutants
+
+    def _visit(self, node) -> None:
+        first = node.start_point[0]
+        # The first range that does not end before the node.
+        i = bisect.bisect_left(self._ends, first)
+        if i == len(self._ends) or self._starts[i] > node.end_point[0]:
+            return
+        if self._starts[i] <= first:
+            self._mutate_node(node)
+        for child in node.children:
+            self._visit(child)
+
+    def _mutate_node(self, node) -> None:
+        node_type = node.type
+        if not node.is_named:
+            if (
+                node.prev_named_sibling is not None
+                and node.next_named_sibling is not None
+            ):
+                for operator, replacements in BINARY_OPERATORS.items():
+                    for replacement in replacements.get(node_type, []):
+                        self._add(node, replacement, operator)
+            elif (
+                node_type in NEGATION_OPERATORS
+                and node.prev_sibling is None
+                and node.parent is not None
+                and node.parent.named_child_count == 1
+            ):
+                operand = node.parent.named_children[0]
+                self._add(node.parent, operand.text.decode("utf8"), "boolean_negation")
+        elif node_type in BOOLEAN_TYPES:
+            replacement = BOOLEAN_LITERALS.get(node.text.decode("utf8"))
+            if replacement is not None:
+                self._add(node, replacement, "boolean_negation")
+        elif node_type in RETURN_TYPES:
+            self._mutate_return(node)
+
+    def _mutate_return(self, node) -> None:
+        if node.child_count == 0 or node.children[0].type != "return":
+            return
+        values = [child for child in node.named_children if "comment" not in child.type]
+        if len(values) != 1:
+            return
+        value = values[0]
+        if value.named_child_count == 1 and value.type in (
+            "expression_list",
+            "argument_list",
+        ):
+            value = value.named_children[0]
+        text = value.text.decode("utf8")
+        if value.type in BOOLEAN_TYPES:
+            return
+        if any(word in value.type for word in NUMBER_TYPE_WORDS):
+            self._add(value, "1" if text == "0" else "0", "return_value")
+        elif self.lang in NULL_VALUES and text != NULL_VALUES[self.lang]:
+            self._add(value, NULL_VALUES[self.lang], "return_value")
+
+    def _add(self, node, replacement: str, operator: str) -> None:
+        row = node.start_point[0]
+        if node.end_point[0] != row or row >= len(self.lines):
+            return
+        line = self.lines[row]
+        start = node.start_byte - self.line_starts[row]
+        end = node.end_byte - self.line_starts[row]
+        mutated = line[:start] + replacement.encode("utf8") + line[end:]
+        if mutated == line or (row, mutated) in self._seen:
+            return
+        self._seen.add((row, mutated))
+        original = node.text.decode("utf8")
+        self.mutants.append(
+            {
+                "function_name": self._function_name(node.start_byte),
+                "type": operator,
+                "description": f"Replaced `{original}` with `{replacement}`.",
+                "line_number": row + 1,
+                "original_code": line.decode("utf8").strip(),
+                "mutated_code": mutated.decode("utf8").strip(),
+            }
+        )
+
+    def _function_name(self, byte: int) -> Optional[str]:
+        """Returns the name of the innermost function around a byte."""
+        enclosing = [
+            record
+            for record in self.functions
+            if record.start_byte <= byte < record.end_byte
+        ]
+        if not enclosing:
+            return None
+        return max(enclosing, key=lambda record: record.start_byte).name
@@ -1,26 +1,76 @@
 import os
 import shutil
+import signal
 import subprocess
+import tempfile
+import threading
+import time
 from shlex import split
 import platform
+from typing import Dict, Optional
+
+from mutahunter.core.commands import with_import_hook
+from mutahunter.core.exceptions import MutantTimeoutError, WarmWorkerError
+from mutahunter.core.logger import logger
+from mutahunter.core.warm_workers import WarmWorker, create_warm_worker
 
 
 class MutantTestRunner:
-    def __init__(self, test_command: str) -> None:
+    def __init__(
+        self,
+        test_command: str,
+        warm_workers: bool = False,
+        timeout_multiplier: float = 2.0,
+        timeout_floor: float = 5.0,
+        import_hook: bool = False,
+    ) -> None:
         self.test_command = test_command
+        self.warm_workers = warm_workers
+        self.import_hook = import_hook
+        self.timeout_multiplier = timeout_multiplier
+        self.timeout_floor = timeout_floor
+        self.baseline_duration: Optional[float] = None
+        self._workers: Dict[str, Optional[WarmWorker]] = {}
+        self._workers_lock = threading.Lock()
 
     def dry_run(self) -> None:
         """
         Performs a dry run of the tests to ensure they pass before mutation testing.
 
+        The wall time of the passing run is kept as the baseline for mutant timeouts.
+
         Raises:
             Exception: If any tests fail during the dry run.
         """
+        start = time.monotonic()
         result = self._run_test_command(self.test_command)
+        duration = time.monotonic() - start
         if result.returncode != 0:
+            logger.info(result.stdout + result.stderr)
             raise Exception(
                 "Tests failed. Please ensure all tests pass before running mutation testing."
             )
+        self.baseline_duration = duration
+        logger.info(
+            f"Dry run passed in {duration:.2f}s. Mutant timeout: {self.get_timeout():.2f}s"
+        )
+
+    def get_timeout(self, expected_duration: Optional[float] = None) -> float:
+        """
+        Derives a mutant's timeout from the expected duration of its test run.
+
+        Args:
+            expected_duration (Optional[float]): The expected duration of the tests
+                in seconds. Defaults to the duration of the dry run.
+
+        Returns:
+            float: The timeout in seconds.
+        """
+        if expected_duration is None:
+            expected_duration = self.baseline_duration
+        if expected_duration is None:
+            return max(self.timeout_floor, 30.0)
+        return max(self.timeout_floor, expected_duration * self.timeout_multiplier)
 
     def _run_test_command(self, test_command: str) -> subprocess.CompletedProcess:
         """
@@ -37,29 +87,31 @@ class MutantTestRunner:
         return subprocess.run(
             test_command,
             cwd=os.getcwd(),
-            shell=True
+            shell=True,
+            text=True,
+            capture_output=True,
         )
 
     def run_test(self, params: dict) -> subprocess.CompletedProcess:
         module_path = params["module_path"]
         replacement_module_path = params["replacement_module_path"]
         test_command = params["test_command"]
+        cwd = params.get("cwd") or os.getcwd()
+        # An explicit None runs the tests without a timeout.
+        timeout = params["timeout"] if "timeout" in params else self.get_timeout()
+        env = params.get("env") or {}
+        if self.import_hook and module_path.endswith(".py"):
+            result = self._run_with_import_hook(
+                module_path, replacement_module_path, test_command, cwd, timeout, env
+            )
+            if result is not None:
+                return result
         backup_path = f"{module_path}.bak"
         try:
             self.replace_file(module_path, replacement_module_path, backup_path)
-            result = subprocess.run(
-                test_command,
-                text=True,
-                capture_output=True,
-                cwd=os.getcwd(),
-                timeout=30,
-                shell=True,
-            )
+            result = self._execute(test_command, cwd, timeout=timeout, env=env)
         except subprocess.TimeoutExpired:
-            # Mutant Killed
-            result = subprocess.CompletedProcess(
-                test_command, 2, stdout="", stderr="TimeoutExpired"
-            )
+            raise MutantTimeoutError(f"Tests timed out after {timeout:.2f}s")
         except subprocess.CalledProcessError:
             # Handle any command execution errors
             result = subprocess.CompletedProcess(
@@ -69,6 +121,125 @@ class MutantTestRunner:
             self.revert_file(module_path, backup_path)
         return result
 
+    def _run_with_import_hook(
+        self,
+        module_path: str,
+        replacement_module_path: str,
+        test_command: str,
+        cwd: str,
+        timeout: Optional[float],
+        env: Dict[str, str],
+    ) -> Optional[subprocess.CompletedProcess]:
+        """
+        Runs the tests with the mutant served by an import hook instead of
+        replacing the module on disk.
+
+        Returns:
+            Optional[subprocess.CompletedProcess]: The result, or None if the hook
+            was not loaded by the test process or did not serve the mutant.
+        """
+        status_fd, status_path = tempfile.mkstemp(prefix="mutahunter-hook-")
+        os.close(status_fd)
+        hook_env = with_import_hook(
+            module_path, replacement_module_path, env, status_path
+        )
+        try:
+            result = self._execute(test_command, cwd, timeout=timeout, env=hook_env)
+        except subprocess.TimeoutExpired:
+            raise MutantTimeoutError(f"Tests timed out after {timeout:.2f}s")
+        finally:
+            with open(status_path, "r") as f:
+                status = f.read().split()
+            os.remove(status_path)
+        if "installed" not in status:
+            # e.g. the interpreter runs with -S or -I, or the command is not Python.
+            logger.warning(
+                "The import hook was not loaded by the test command. "
+                "Replacing source files on disk instead."
+            )
+            self.import_hook = False
+            return None
+        if "served" not in status:
+            # The tests never imported the module through the hook, e.g. they read
+            # or run it as a file, so the mutant was not exercised.
+            logger.debug(
+                f"The import hook did not serve the mutant of {module_path}. "
+                "Replacing the source file on disk for this mutant."
+            )
+            return None
+        return result
+
+    def _execute(
+        self, test_command: str, cwd: str, timeout: float, env: Dict[str, str]
+    ) -> subprocess.CompletedProcess:
+        """
+        Runs the test command for a mutant, in a warm worker when one is available.
+        """
+        worker = self._get_warm_worker(test_command, cwd)
+        if worker is not None:
+            try:
+                return worker.run(test_command, timeout, env)
+            except WarmWorkerError as e:
+                logger.warning(f"Warm test worker failed, restarting it: {e}")
+                worker.stop()
+                with self._workers_lock:
+                    self._workers.pop(cwd, None)
+        return self._run_with_timeout(test_command, cwd, timeout, env)
+
+    def _run_with_timeout(
+        self, test_command: str, cwd: str, timeout: float, env: Dict[str, str]
+    ) -> subprocess.CompletedProcess:
+        """
+        Runs the test command in its own process group so that a timeout also
+        stops the processes the shell started, e.g. a mutant stuck in a loop.
+        """
+        posix = os.name == "posix"
+        process = subprocess.Popen(
+            test_command,
+            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env={**os.environ, **env},
+            shell=True,
+            start_new_session=posix,
+        )
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                if posix:
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+            except ProcessLookupError:
+                pass
+            process.communicate()
+            raise
+        return subprocess.CompletedProcess(
+            test_command, process.returncode, stdout=stdout, stderr=stderr
+        )
+
+    def _get_warm_worker(self, test_command: str, cwd: str) -> Optional[WarmWorker]:
+        if not self.warm_workers:
+            return None
+        with self._workers_lock:
+            if cwd not in self._workers:
+                # A worker that fails to start is not retried for this cwd. It is
+                # warmed up with the plain test command: the mutants' commands add
+                # fail-fast, test selection and plugin options the worker applies
+                # to the tests it collected.
+                self._workers[cwd] = create_warm_worker(self.test_command, cwd)
+            return self._workers[cwd]
+
+    def close(self) -> None:
+        """Stops all warm test workers."""
+        with self._workers_lock:
+            for worker in self._workers.values():
+                if worker is not None:
+                    worker.stop()
+            self._workers = {}
+
     def replace_file(self, original: str, replacement: str, backup: str) -> None:
         """Backup original file and replace it with the replacement file."""
         if not os.path.exists(backup):
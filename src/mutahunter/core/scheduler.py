@@ -0,0 +1,123 @@
+"""
+Module for spending a limited generation budget on the most valuable code first.
+"""
+
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.budget import GenerationBudget
+from mutahunter.core.coverage_processor import CoverageProcessor
+from mutahunter.core.git_diff import last_change_time
+from mutahunter.core.llm_mutation_engine import LLMMutationEngine, MutationRequest
+from mutahunter.core.logger import logger
+
+# Block tags that count towards the complexity of a request.
+BRANCH_TAGS = {"if_statement", "loop"}
+# Days after which a file's last change counts half as much.
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+
+class RequestScheduler:
+    """
+    Orders mutation requests by the value of the code they mutate when their
+    estimated cost does not fit in the budget.
+
+    A request is worth more the more of its lines the tests cover, the more
+    recently its file changed and the more branches and loops it holds. Without
+    a coverage report every line counts as covered, and outside a git repository
+    every file counts as just changed. The router still refuses each request
+    that no longer fits once the budget runs low, so cheaper requests further
+    down the order can use what is left.
+    """
+
+    def __init__(
+        self,
+        engine: LLMMutationEngine,
+        analyzer: Analyzer,
+        budget: GenerationBudget,
+        coverage_processor: Optional[CoverageProcessor] = None,
+    ) -> None:
+        self.engine = engine
+        self.analyzer = analyzer
+        self.budget = budget
+        self.coverage_processor = coverage_processor
+        self._change_times: Dict[str, Optional[float]] = {}
+
+    def schedule(
+        self, requests: Iterable[MutationRequest]
+    ) -> Iterator[MutationRequest]:
+        """
+        Yields the requests, the most valuable first if the budget is tight and in
+        their original order otherwise.
+        """
+        planned = [(request, *self.engine.estimate(request)) for request in requests]
+        total_tokens = sum(tokens for _, tokens, _ in planned)
+        total_cost = sum(cost for _, _, cost in planned)
+        if self.budget.fits(total_tokens, total_cost):
+            for request, _, _ in planned:
+                yield request
+            return
+        logger.info(
+            f"{len(planned)} requests are estimated at {total_tokens} tokens "
+            f"(${total_cost:.5f}), more than the budget allows. "
+            "Generating mutants of the most valuable code first."
+        )
+        ranked = sorted(
+            planned, key=lambda item: (-self.value(item[0]), item[2], item[1])
+        )
+        for request, _, _ in ranked:
+            yield request
+
+    def value(self, request: MutationRequest) -> float:
+        """Returns the value of the code a request mutates; higher is better."""
+        path = request.source_file_path
+        with open(path, "rb") as f:
+            source_code = f.read()
+        line_ranges = request.line_ranges or [(1, source_code.count(b"\n") + 1)]
+        return (
+            self._coverage(path, line_ranges)
+            * self._recency(path)
+            * self._complexity(path, source_code, line_ranges)
+        )
+
+    def _coverage(self, path: str, line_ranges: List[Tuple[int, int]]) -> float:
+        """Returns the fraction of the executable lines the tests run."""
+        if self.coverage_processor is None:
+            return 1.0
+        hits = self.coverage_processor.line_hits(path) or {}
+        executable = [
+            count
+            for line, count in hits.items()
+            if any(start <= line <= end for start, end in line_ranges)
+        ]
+        if not executable:
+            return 0.0
+        return sum(1 for count in executable if count > 0) / len(executable)
+
+    def _recency(self, path: str) -> float:
+        if path not in self._change_times:
+            self._change_times[path] = last_change_time(path)
+        changed = self._change_times[path]
+        if changed is None:
+            return 1.0
+        age_days = max(0.0, time.time() - changed) / (24 * 3600)
+        return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    def _complexity(
+        self, path: str, source_code: bytes, line_ranges: List[Tuple[int, int]]
+    ) -> float:
+        """Returns one more than the number of branches and loops."""
+        try:
+            records = self.analyzer.get_block_records(path, source_code)
+        except Exception as e:
+            logger.debug(f"Could not find the blocks of {path}: {e}")
+            return 1.0
+        return 1.0 + sum(
+            1
+            for record in records
+            if record.kind in BRANCH_TAGS
+            and any(
+                start <= record.start_point[0] + 1 <= end for start, end in line_ranges
+            )
+        )
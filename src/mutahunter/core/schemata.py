@@ -0,0 +1,479 @@
+"""
+Module for mutant schemata: one build of a source file that contains every
+mutant, each behind a runtime switch.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from mutahunter.core.logger import logger
+from mutahunter.core.parsers import filename_to_lang, get_cached_parser
+
+SCHEMATA_ENV_VAR = "MUTAHUNTER_ACTIVE"
+
+BOOLEAN_OPERATORS = {"==", "!=", "<", "<=", ">", ">=", "&&", "||", "!"}
+
+
+@dataclass
+class SchemataSyntax:
+    """
+    How a language expresses a mutant switch.
+
+    ``expression`` and ``statement`` are templates with ``guard``, ``mutant`` and
+    ``original`` fields. Languages without a conditional expression only guard
+    boolean expressions, with ``boolean_expression``.
+    """
+
+    guard: str
+    statement: str
+    expression_types: Set[str]
+    statement_types: Set[str]
+    block_types: Set[str]
+    function_types: Set[str]
+    expression: Optional[str] = None
+    boolean_expression: Optional[str] = None
+    # Expressions that must stay compile-time constants.
+    constant_contexts: Set[str] = field(default_factory=set)
+    header: str = ""
+    package_import: str = ""
+
+
+C_SYNTAX = dict(
+    guard=f'(getenv("{SCHEMATA_ENV_VAR}") && strcmp(getenv("{SCHEMATA_ENV_VAR}"), "{{id}}") == 0)',
+    expression="({guard} ? ({mutant}) : ({original}))",
+    statement="if ({guard}) {{ {mutant} }} else {{ {original} }}",
+    expression_types={
+        "binary_expression",
+        "unary_expression",
+        "parenthesized_expression",
+        "conditional_expression",
+        "call_expression",
+        "number_literal",
+        "char_literal",
+        "true",
+        "false",
+    },
+    statement_types={
+        "expression_statement",
+        "return_statement",
+        "break_statement",
+        "continue_statement",
+    },
+    block_types={"compound_statement", "case_statement"},
+    function_types={"function_definition", "lambda_expression"},
+    constant_contexts={
+        "case_statement",
+        "enumerator",
+        "array_declarator",
+        "bitfield_clause",
+        "template_argument_list",
+        "static_assert_declaration",
+    },
+    # The directive keeps compiler messages pointing at the original lines.
+    header="#include <stdlib.h>\n#include <string.h>\n#line 1\n",
+)
+
+SCHEMATA_SYNTAX: Dict[str, SchemataSyntax] = {
+    "c": SchemataSyntax(**C_SYNTAX),
+    "cpp": SchemataSyntax(**C_SYNTAX),
+    "java": SchemataSyntax(
+        guard=f'"{{id}}".equals(System.getenv("{SCHEMATA_ENV_VAR}"))',
+        expression="({guard} ? ({mutant}) : ({original}))",
+        statement="if ({guard}) {{ {mutant} }} else {{ {original} }}",
+        expression_types={
+            "binary_expression",
+            "unary_expression",
+            "parenthesized_expression",
+            "ternary_expression",
+            "method_invocation",
+            "decimal_integer_literal",
+            "hex_integer_literal",
+            "decimal_floating_point_literal",
+            "character_literal",
+            "string_literal",
+            "true",
+            "false",
+        },
+        statement_types={
+            "expression_statement",
+            "return_statement",
+            "throw_statement",
+            "break_statement",
+            "continue_statement",
+        },
+        block_types={"block", "switch_block_statement_group"},
+        function_types={
+            "method_declaration",
+            "constructor_declaration",
+            "lambda_expression",
+        },
+        constant_contexts={"switch_label", "annotation", "marker_annotation"},
+    ),
+    "c_sharp": SchemataSyntax(
+        guard=f'System.Environment.GetEnvironmentVariable("{SCHEMATA_ENV_VAR}") == "{{id}}"',
+        expression="(({guard}) ? ({mutant}) : ({original}))",
+        statement="if ({guard}) {{ {mutant} }} else {{ {original} }}",
+        expression_types={
+            "binary_expression",
+            "prefix_unary_expression",
+            "parenthesized_expression",
+            "conditional_expression",
+            "invocation_expression",
+            "integer_literal",
+            "real_literal",
+            "character_literal",
+            "string_literal",
+            "boolean_literal",
+        },
+        statement_types={
+            "expression_statement",
+            "return_statement",
+            "throw_statement",
+            "break_statement",
+            "continue_statement",
+        },
+        block_types={"block", "switch_section"},
+        function_types={
+            "method_declaration",
+            "constructor_declaration",
+            "local_function_statement",
+            "lambda_expression",
+        },
+        constant_contexts={"case_switch_label", "attribute_list", "constant_pattern"},
+    ),
+    "rust": SchemataSyntax(
+        guard=f'std::env::var("{SCHEMATA_ENV_VAR}").map_or(false, |v| v == "{{id}}")',
+        expression="(if {guard} {{ {mutant} }} else {{ {original} }})",
+        statement="if {guard} {{ {mutant} }} else {{ {original} }}",
+        expression_types={
+            "binary_expression",
+            "unary_expression",
+            "parenthesized_expression",
+            "call_expression",
+            "integer_literal",
+            "float_literal",
+            "boolean_literal",
+            "char_literal",
+            "string_literal",
+        },
+        statement_types={"expression_statement"},
+        block_types={"block"},
+        function_types={"function_item", "closure_expression"},
+        constant_contexts={
+            "const_item",
+            "static_item",
+            "match_pattern",
+            "array_type",
+            "attribute_item",
+            "const_block",
+        },
+    ),
+    "go": SchemataSyntax(
+        guard=f'mutahunterOs.Getenv("{SCHEMATA_ENV_VAR}") == "{{id}}"',
+        boolean_expression="func() bool {{ if {guard} {{ return {mutant} }}; return {original} }}()",
+        statement="if {guard} {{ {mutant} }} else {{ {original} }}",
+        expression_types={
+            "binary_expression",
+            "unary_expression",
+            "parenthesized_expression",
+        },
+        statement_types={
+            "expression_statement",
+            "return_statement",
+            "assignment_statement",
+            "inc_statement",
+            "dec_statement",
+            "send_statement",
+            "break_statement",
+            "continue_statement",
+        },
+        block_types={
+            "block",
+            "statement_list",
+            "expression_case",
+            "default_case",
+            "type_case",
+            "communication_case",
+        },
+        function_types={"function_declaration", "method_declaration", "func_literal"},
+        package_import='; import mutahunterOs "os"',
+    ),
+}
+
+CONSTANT_FUNCTION_PATTERN = re.compile(rb"\b(const\s+fn|constexpr|consteval)\b")
+
+
+@dataclass
+class SchemataEdit:
+    """Mutants that replace the same node of the original source."""
+
+    start_byte: int
+    end_byte: int
+    kind: str
+    original: bytes
+    mutants: List[Tuple[str, bytes]] = field(default_factory=list)
+
+
+class SchemataBuilder:
+    """
+    Writes every mutant of a source file into one variant of the file.
+
+    Each mutant replaces the smallest expression around its change with a
+    conditional that picks the mutated or the original code depending on the
+    ``MUTAHUNTER_ACTIVE`` environment variable. Where no expression fits, the
+    whole statement on the mutated line is guarded instead. Mutants that can be
+    expressed neither way are left out and tested one file at a time.
+    """
+
+    def __init__(self, source_file_path: str) -> None:
+        self.source_file_path = source_file_path
+        self.lang = filename_to_lang(source_file_path)
+        self.syntax = SCHEMATA_SYNTAX.get(self.lang)
+
+    @staticmethod
+    def supports(source_file_path: str) -> bool:
+        return filename_to_lang(source_file_path) in SCHEMATA_SYNTAX
+
+    def build(
+        self, source_code: str, mutants: List[Dict[str, Any]]
+    ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Builds the schemata source for the mutants.
+
+        Every mutant that is part of the schemata gets a ``schemata_id``, the value
+        of ``MUTAHUNTER_ACTIVE`` that enables it.
+
+        Returns:
+            Tuple[Optional[str], List[Dict[str, Any]]]: The schemata source, or None
+            if no mutant fits, and the mutants that are part of it.
+        """
+        if self.syntax is None:
+            return None, []
+        source = source_code.encode("utf8")
+        parser = get_cached_parser(self.lang)
+        tree = parser.parse(source)
+        if tree.root_node.has_error:
+            return None, []
+        edits: Dict[Tuple[int, int, str], SchemataEdit] = {}
+        included = []
+        for index, mutant_data in enumerate(mutants):
+            schemata_id = str(index + 1)
+            found = self._edit_for(parser, tree, source, mutant_data)
+            if found is None:
+                continue
+            edit, mutant_text = found
+            key = (edit.start_byte, edit.end_byte, edit.kind)
+            if any(self._overlaps(key, other) for other in edits if other != key):
+                continue
+            edit = edits.setdefault(key, edit)
+            candidate = SchemataEdit(
+                edit.start_byte, edit.end_byte, edit.kind, edit.original
+            )
+            candidate.mutants = [(schemata_id, mutant_text)]
+            # Check each mutant alone so that one bad mutant does not break the build.
+            if parser.parse(self._render(source, [candidate])).root_node.has_error:
+                if not edit.mutants:
+                    del edits[key]
+                continue
+            edit.mutants.append(candidate.mutants[0])
+            mutant_data["schemata_id"] = schemata_id
+            included.append(mutant_data)
+        if not included:
+            return None, []
+        schemata = self._render(source, list(edits.values()))
+        if parser.parse(schemata).root_node.has_error:
+            logger.warning(
+                f"Mutant schemata for {self.source_file_path} is not valid. "
+                "Testing its mutants one file at a time."
+            )
+            for mutant_data in included:
+                mutant_data.pop("schemata_id", None)
+            return None, []
+        schemata = self._add_preamble(parser, schemata)
+        return self.syntax.header + schemata.decode("utf8"), included
+
+    def _edit_for(
+        self, parser, tree, source: bytes, mutant_data: Dict[str, Any]
+    ) -> Optional[Tuple[SchemataEdit, bytes]]:
+        """
+        Finds the node to guard for a mutant.
+
+        Returns:
+            Optional[Tuple[SchemataEdit, bytes]]: The edit and the mutated text of
+            the node, or None if the mutant cannot be guarded.
+        """
+        lines = source.splitlines(keepends=True)
+        row = mutant_data["line_number"] - 1
+        if row < 0 or row >= len(lines):
+            return None
+        line_start = sum(len(line) for line in lines[:row])
+        original_line = self._code_of_line(tree, source, row)
+        mutated_line = self._mutated_line(parser, source, mutant_data)
+        if mutated_line is None or mutated_line == original_line:
+            return None
+        prefix = 0
+        limit = min(len(original_line), len(mutated_line))
+        while prefix < limit and original_line[prefix] == mutated_line[prefix]:
+            prefix += 1
+        suffix = 0
+        while (
+            suffix < limit - prefix
+            and original_line[-1 - suffix] == mutated_line[-1 - suffix]
+        ):
+            suffix += 1
+        changed_start = line_start + prefix
+        changed_end = max(changed_start, line_start + len(original_line) - suffix)
+        node = tree.root_node.descendant_for_byte_range(changed_start, changed_end)
+        if not self._in_function(node):
+            return None
+        kind = "expression" if self.syntax.expression else "boolean_expression"
+        guarded = self._guardable_expression(node, row)
+        if guarded is None:
+            kind = "statement"
+            guarded = self._guardable_statement(node, row)
+        if guarded is None:
+            return None
+        # Only the changed part of the line differs, so the mutated node spans
+        # the same columns, shifted at its end by the change in line length.
+        start = guarded.start_byte - line_start
+        end = guarded.end_byte - line_start + len(mutated_line) - len(original_line)
+        edit = SchemataEdit(
+            guarded.start_byte,
+            guarded.end_byte,
+            kind,
+            source[guarded.start_byte : guarded.end_byte],
+        )
+        return edit, mutated_line[start:end]
+
+    def _guardable_expression(self, node, row: int):
+        if self.syntax.expression is None and self.syntax.boolean_expression is None:
+            return None
+        while (
+            node is not None and node.start_point[0] == row and node.end_point[0] == row
+        ):
+            if node.type in self.syntax.expression_types and self._is_value(node):
+                if self.syntax.expression is not None or self._is_boolean(node):
+                    return node
+            if node.type in self.syntax.statement_types:
+                return None
+            node = node.parent
+        return None
+
+    def _guardable_statement(self, node, row: int):
+        while node is not None:
+            if node.start_point[0] < row or node.end_point[0] > row:
+                return None
+            if (
+                node.type in self.syntax.statement_types
+                and node.parent is not None
+                and node.parent.type in self.syntax.block_types
+            ):
+                return node
+            node = node.parent
+        return None
+
+    def _is_value(self, node) -> bool:
+        """Returns True if the expression is used as a value, not as a statement or target."""
+        parent = node.parent
+        if parent is None:
+            return False
+        if parent.type == "expression_statement":
+            return False
+        if parent.child_by_field_name("left") == node and "assignment" in parent.type:
+            return False
+        return True
+
+    @staticmethod
+    def _is_boolean(node) -> bool:
+        if node.type == "parenthesized_expression" and node.named_child_count == 1:
+            return SchemataBuilder._is_boolean(node.named_children[0])
+        operator = node.child_by_field_name("operator")
+        return (
+            operator is not None and operator.text.decode("utf8") in BOOLEAN_OPERATORS
+        )
+
+    def _in_function(self, node) -> bool:
+        in_function = False
+        while node is not None:
+            if node.type in self.syntax.constant_contexts:
+                return False
+            if node.type in self.syntax.function_types:
+                body = node.child_by_field_name("body")
+                header = node.text[: body.start_byte - node.start_byte] if body else b""
+                if CONSTANT_FUNCTION_PATTERN.search(header):
+                    return False
+                in_function = True
+            node = node.parent
+        return in_function
+
+    @staticmethod
+    def _code_of_line(tree, source: bytes, row: int) -> bytes:
+        """Returns a line without its line break and trailing comment."""
+        line = source.splitlines()[row]
+        line_start = sum(len(line) for line in source.splitlines(keepends=True)[:row])
+        code_end = len(line.rstrip())
+        for node in SchemataBuilder._comments_on_row(tree.root_node, row):
+            if node.end_byte - line_start >= code_end:
+                code_end = min(code_end, node.start_byte - line_start)
+        return line[:code_end].rstrip()
+
+    @staticmethod
+    def _comments_on_row(node, row: int):
+        if node.start_point[0] > row or node.end_point[0] < row:
+            return
+        if "comment" in node.type:
+            yield node
+            return
+        for child in node.children:
+            yield from SchemataBuilder._comments_on_row(child, row)
+
+    def _mutated_line(
+        self, parser, source: bytes, mutant_data: Dict[str, Any]
+    ) -> Optional[bytes]:
+        lines = source.decode("utf8").splitlines(keepends=True)
+        row = mutant_data["line_number"] - 1
+        indentation = len(lines[row]) - len(lines[row].lstrip())
+        lines[row] = (
+            lines[row][:indentation] + mutant_data["mutated_code"].strip() + "\n"
+        )
+        mutated = "".join(lines).encode("utf8")
+        mutated_tree = parser.parse(mutated)
+        if mutated_tree.root_node.has_error:
+            return None
+        return self._code_of_line(mutated_tree, mutated, row)
+
+    @staticmethod
+    def _overlaps(key: Tuple[int, int, str], other: Tuple[int, int, str]) -> bool:
+        return key[0] < other[1] and other[0] < key[1]
+
+    def _render(self, source: bytes, edits: List[SchemataEdit]) -> bytes:
+        result = source
+        for edit in sorted(edits, key=lambda edit: edit.start_byte, reverse=True):
+            if not edit.mutants:
+                continue
+            template = getattr(self.syntax, edit.kind)
+            text = edit.original
+            for schemata_id, mutant in reversed(edit.mutants):
+                guard = self.syntax.guard.format(id=schemata_id)
+                text = template.format(
+                    guard=guard,
+                    mutant=mutant.decode("utf8"),
+                    original=text.decode("utf8"),
+                ).encode("utf8")
+            result = result[: edit.start_byte] + text + result[edit.end_byte :]
+        return result
+
+    def _add_preamble(self, parser, schemata: bytes) -> bytes:
+        if not self.syntax.package_import:
+            return schemata
+        root = parser.parse(schemata).root_node
+        for child in root.children:
+            if child.type == "package_clause":
+                end = child.end_byte
+                return (
+                    schemata[:end]
+                    + self.syntax.package_import.encode()
+                    + schemata[end:]
+                )
+        return schemata
@@ -0,0 +1,111 @@
+"""
+Module for checking the syntax of single-line mutants without re-parsing the whole file.
+"""
+
+import threading
+from typing import Tuple
+
+from mutahunter.core.parsers import filename_to_lang, get_cached_parser
+
+
+class IncrementalSyntaxChecker:
+    """
+    Checks mutants of one source file against a parse tree of the original.
+
+    Each check edits the tree to match the mutant and re-parses incrementally,
+    then edits it back and re-parses the original the same way. Tree-sitter reuses
+    every subtree the edit did not touch, so a check costs in proportion to the
+    size of the edit rather than the size of the file.
+    """
+
+    def __init__(self, source_file_path: str, source_code: str) -> None:
+        self.source_file_path = source_file_path
+        self.source_code = source_code
+        self._source = source_code.encode("utf8")
+        self._parser = get_cached_parser(filename_to_lang(source_file_path))
+        self._tree = self._parser.parse(self._source)
+        # Byte offset of the start of each line, split like `apply_mutation` does,
+        # and of the end of the file.
+        self._line_starts = [0]
+        for line in source_code.splitlines(keepends=True):
+            self._line_starts.append(self._line_starts[-1] + len(line.encode("utf8")))
+
+    def check(self, mutated_code: str, line_number: int) -> bool:
+        """
+        Checks the syntax of a mutant that only replaced one line of the source.
+
+        Args:
+            mutated_code (str): The whole mutated file.
+            line_number (int): The replaced line, 1-based.
+
+        Returns:
+            bool: True if the syntax of the mutated file is correct, like
+            `FileOperationHandler.check_syntax`.
+        """
+        mutated = mutated_code.encode("utf8")
+        start_byte = self._line_starts[line_number - 1]
+        old_end_byte = self._line_starts[min(line_number, len(self._line_starts) - 1)]
+        new_end_byte = len(mutated) - (len(self._source) - old_end_byte)
+        if (
+            new_end_byte < start_byte
+            or mutated[:start_byte] != self._source[:start_byte]
+            or mutated[new_end_byte:] != self._source[old_end_byte:]
+        ):
+            # Not a single-line edit after all.
+            return not self._parser.parse(mutated).root_node.has_error
+        # Tree-sitter counts rows by "\n" only.
+        start_point = (
+            self._source.count(b"\n", 0, start_byte),
+            start_byte - self._source.rfind(b"\n", 0, start_byte) - 1,
+        )
+        old_end_point = _end_point(start_point, self._source[start_byte:old_end_byte])
+        new_end_point = _end_point(start_point, mutated[start_byte:new_end_byte])
+
+        self._tree.edit(
+            start_byte,
+            old_end_byte,
+            new_end_byte,
+            start_point,
+            old_end_point,
+            new_end_point,
+        )
+        mutated_tree = self._parser.parse(mutated, self._tree)
+        valid = not mutated_tree.root_node.has_error
+        mutated_tree.edit(
+            start_byte,
+            new_end_byte,
+            old_end_byte,
+            start_point,
+            new_end_point,
+            old_end_point,
+        )
+        self._tree = self._parser.parse(self._source, mutated_tree)
+        return valid
+
+
+def _end_point(start_point: Tuple[int, int], text: bytes) -> Tuple[int, int]:
+    row, column = start_point
+    newlines = text.count(b"\n")
+    if newlines == 0:
+        return row, column + len(text)
+    return row + newlines, len(text) - text.rfind(b"\n") - 1
+
+
+_local = threading.local()
+
+
+def syntax_checker(source_file_path: str, source_code: str) -> IncrementalSyntaxChecker:
+    """
+    Returns the calling thread's checker for a source file, parsing the original
+    only when the file or its content differs from the last call.
+    """
+    checker = getattr(_local, "checker", None)
+    if (
+        checker is None
+        or checker.source_file_path != source_file_path
+        or checker.source_code != source_code
+    ):
+        checker = _local.checker = IncrementalSyntaxChecker(
+            source_file_path, source_code
+        )
+    return checker
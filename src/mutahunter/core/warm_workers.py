@@ -0,0 +1,194 @@
+"""
+Module for long-lived test processes that are reused across mutants.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from mutahunter.core.commands import split_pytest_args, split_pytest_command
+from mutahunter.core.exceptions import WarmWorkerError
+from mutahunter.core.logger import logger
+
+
+class WarmWorker(ABC):
+    """
+    A test process that is started once and then runs the tests for one mutant
+    at a time.
+
+    Adapters for other test frameworks subclass this class and are registered in
+    ``WARM_WORKERS``. ``run`` must return the same ``CompletedProcess`` the test
+    command would produce as a subprocess, and raise ``subprocess.TimeoutExpired``
+    when the tests exceed the timeout.
+    """
+
+    def __init__(self, cwd: str) -> None:
+        self.cwd = cwd
+
+    @classmethod
+    @abstractmethod
+    def supports(cls, test_command: str) -> bool:
+        """Returns True if the adapter can run the given test command."""
+
+    @abstractmethod
+    def start(self, test_command: str) -> None:
+        """Starts the worker process and warms it up for the test command."""
+
+    @abstractmethod
+    def run(
+        self,
+        test_command: str,
+        timeout: Optional[float],
+        env: Optional[Dict[str, str]] = None,
+    ) -> subprocess.CompletedProcess:
+        """Runs the test command in the worker."""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Stops the worker process."""
+
+
+class PytestWarmWorker(WarmWorker):
+    """
+    Runs pytest in a fork server that has already imported pytest, its plugins
+    and the project's test modules and collected the tests. Each mutant is run in
+    a forked child that swaps the mutated functions into the imported modules and
+    runs the collected tests, or collects them again when that is not possible.
+    """
+
+    SERVER_PATH = os.path.join(os.path.dirname(__file__), "pytest_worker_server.py")
+
+    def __init__(self, cwd: str) -> None:
+        super().__init__(cwd)
+        self.process: Optional[subprocess.Popen] = None
+
+    @classmethod
+    def supports(cls, test_command: str) -> bool:
+        return hasattr(os, "fork") and cls.parse_command(test_command) is not None
+
+    @staticmethod
+    def parse_command(test_command: str) -> Optional[Tuple[str, bool, List[str]]]:
+        """
+        Splits a pytest command into the interpreter, whether it runs pytest as a
+        module, and the pytest arguments.
+        """
+        split = split_pytest_command(test_command)
+        if split is None:
+            return None
+        launcher, args = split
+        if len(launcher) == 1:
+            return PytestWarmWorker._script_interpreter(launcher[0]), False, args
+        return shutil.which(launcher[0]) or launcher[0], True, args
+
+    @staticmethod
+    def _script_interpreter(script: str) -> str:
+        """Returns the interpreter named in the shebang of a console script."""
+        path = shutil.which(script)
+        if path:
+            try:
+                with open(path, "r") as f:
+                    first_line = f.readline().strip()
+            except (OSError, UnicodeDecodeError):
+                first_line = ""
+            if first_line.startswith("#!") and "python" in first_line:
+                return first_line[2:].split()[0]
+        return sys.executable
+
+    def start(self, test_command: str) -> None:
+        python, module_mode, args = self.parse_command(test_command)
+        warmup_options, warmup_paths = split_pytest_args(args)
+        options = {
+            "warmup_args": args,
+            "warmup_options": warmup_options,
+            "warmup_paths": warmup_paths,
+            "module_mode": module_mode,
+        }
+        self.process = subprocess.Popen(
+            [python, self.SERVER_PATH, json.dumps(options)],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        self._read_message()
+
+    def run(
+        self,
+        test_command: str,
+        timeout: Optional[float],
+        env: Optional[Dict[str, str]] = None,
+    ) -> subprocess.CompletedProcess:
+        parsed = self.parse_command(test_command)
+        if parsed is None:
+            raise WarmWorkerError(f"Unsupported test command: {test_command}")
+        options, paths = split_pytest_args(parsed[2])
+        request = {
+            "args": parsed[2],
+            "options": options,
+            "paths": paths,
+            "timeout": timeout,
+            "env": env or {},
+        }
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except (OSError, AttributeError) as e:
+            raise WarmWorkerError(f"Test worker is not running: {e}")
+        response = self._read_message()
+        if "error" in response:
+            raise WarmWorkerError(response["error"])
+        if response["timeout"]:
+            raise subprocess.TimeoutExpired(test_command, timeout)
+        return subprocess.CompletedProcess(
+            test_command,
+            response["returncode"],
+            stdout=response["stdout"],
+            stderr=response["stderr"],
+        )
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+    def _read_message(self) -> dict:
+        line = self.process.stdout.readline() if self.process else ""
+        if not line:
+            raise WarmWorkerError("Test worker exited unexpectedly.")
+        return json.loads(line)
+
+
+WARM_WORKERS = [PytestWarmWorker]
+
+
+def create_warm_worker(test_command: str, cwd: str) -> Optional[WarmWorker]:
+    """
+    Starts a warm worker for the test command, or returns None if no adapter
+    supports it.
+    """
+    for worker_class in WARM_WORKERS:
+        if not worker_class.supports(test_command):
+            continue
+        worker = worker_class(cwd)
+        try:
+            worker.start(test_command)
+        except (OSError, WarmWorkerError) as e:
+            logger.warning(f"Could not start {worker_class.__name__}: {e}")
+            worker.stop()
+            return None
+        logger.info(f"Started {worker_class.__name__} in {cwd}")
+        return worker
+    logger.warning(
+        f"No warm test worker supports '{test_command}'. Running it as a subprocess."
+    )
+    return None
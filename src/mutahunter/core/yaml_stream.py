@@ -0,0 +1,115 @@
+"""
+Module for reading mutants out of an LLM response while it is still arriving.
+"""
+
+import re
+import textwrap
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from mutahunter.core.logger import logger
+
+MUTANTS_KEY_PATTERN = re.compile(r"^(\s*)mutants:\s*$")
+
+
+class MutantStreamParser:
+    """
+    Incrementally parses the ``mutants:`` list of a YAML response.
+
+    Text is fed in as it arrives. An item of the list is complete once the next
+    item, the end of the list or the end of the response is seen, and is then
+    parsed and returned on its own. Items that are not valid YAML are counted in
+    ``errors`` and skipped; the whole response is kept in ``text`` for anything
+    the parser could not read.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.errors = 0
+        self._pending = ""
+        self._key_indent: Optional[int] = None
+        self._item_indent: Optional[int] = None
+        self._item: Optional[List[str]] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Adds text to the response.
+
+        Returns:
+            List[Dict[str, Any]]: The mutants completed by the text.
+        """
+        self.text += text
+        *lines, self._pending = (self._pending + text).split("\n")
+        mutants: List[Dict[str, Any]] = []
+        for line in lines:
+            self._feed_line(line, mutants)
+        if self._pending.lstrip().startswith("```"):
+            # The closing backticks end the list before their line does.
+            self._end_list(mutants)
+        return mutants
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Ends the response.
+
+        Returns:
+            List[Dict[str, Any]]: The mutants left in the rest of the response.
+        """
+        mutants: List[Dict[str, Any]] = []
+        if self._pending:
+            self._feed_line(self._pending, mutants)
+            self._pending = ""
+        self._end_list(mutants)
+        return mutants
+
+    def _feed_line(self, line: str, mutants: List[Dict[str, Any]]) -> None:
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            self._end_list(mutants)
+            return
+        if self._key_indent is None:
+            match = MUTANTS_KEY_PATTERN.match(line)
+            if match:
+                self._key_indent = len(match.group(1))
+            return
+        if not stripped or stripped.startswith("#"):
+            if self._item is not None:
+                self._item.append(line)
+            return
+        indent = len(line) - len(line.lstrip())
+        is_item = stripped == "-" or stripped.startswith("- ")
+        if (
+            is_item
+            and indent >= self._key_indent
+            and self._item_indent in (None, indent)
+        ):
+            self._finish_item(mutants)
+            self._item_indent = indent
+            self._item = [line]
+        elif self._item is not None and indent > self._item_indent:
+            self._item.append(line)
+        else:
+            # A key after the list, e.g. a second document field.
+            self._end_list(mutants)
+            self._feed_line(line, mutants)
+
+    def _end_list(self, mutants: List[Dict[str, Any]]) -> None:
+        self._finish_item(mutants)
+        self._key_indent = None
+        self._item_indent = None
+
+    def _finish_item(self, mutants: List[Dict[str, Any]]) -> None:
+        if self._item is None:
+            return
+        item = textwrap.dedent("\n".join(self._item))
+        self._item = None
+        try:
+            data = yaml.safe_load(item)
+        except yaml.YAMLError as e:
+            logger.debug(f"Could not parse streamed mutant: {e}")
+            data = None
+        if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+            mutants.append(data[0])
+        else:
+            self.errors += 1
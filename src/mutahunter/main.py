@@ -1,18 +1,29 @@
 import argparse
+import os
 import sys
+import tempfile
+import time
+from typing import List, Tuple
 
 from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.block_index import BlockIndex
+from mutahunter.core.budget import GenerationBudget
 from mutahunter.core.controller import MutationTestController
+from mutahunter.core.coverage_processor import COVERAGE_TYPES
 from mutahunter.core.entities.config import (
     MutationTestControllerConfig,
 )
-from mutahunter.core.io import FileOperationHandler
+from mutahunter.core.io import LINK_MODES, FileOperationHandler, WorkspaceProvisioner
 from mutahunter.core.llm_mutation_engine import LLMMutationEngine
+from mutahunter.core.outcome_cache import OutcomeCache
 from mutahunter.core.prompt_factory import (
     MutationTestingPromptFactory,
 )
+from mutahunter.core.rate_limit import RateLimiter, RetryPolicy
 from mutahunter.core.report import MutantReport
+from mutahunter.core.response_cache import ResponseCache
 from mutahunter.core.router import LLMRouter
+from mutahunter.core.rule_mutation_engine import RuleMutationEngine
 from mutahunter.core.runner import MutantTestRunner
 
 
@@ -28,7 +39,7 @@ def add_mutation_testing_subparser(subparsers):
         "--source-path",
         type=str,
         default="",
-        help="The path to the source code to mutate.",
+        help="The path to the source code to mutate: a file, a directory (searched recursively) or a quoted glob pattern such as 'src/**/*.py'. Test files and files matching --exclude-files are skipped when searching.",
     )
     parser.add_argument(
         "--test-path",
@@ -55,7 +66,237 @@ def add_mutation_testing_subparser(subparsers):
         nargs="+",
         default=[],
         required=False,
-        help="A list of files to exclude from mutation testing. Optional.",
+        help="A list of files or glob patterns to exclude from mutation testing. Optional.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of mutants to test in parallel. Each worker runs the tests in its own copy of the project, so the real source file is never modified. Default is 1.",
+    )
+    parser.add_argument(
+        "--workspace-mode",
+        type=str,
+        choices=LINK_MODES,
+        default="auto",
+        help="How worker workspaces share files with the project. 'auto' uses reflinks where the file system supports them and otherwise hardlinks read-only files and copies the rest. Dependency directories (node_modules, virtualenvs, vendor) are symlinked in every mode but 'copy'. 'hardlink' is faster on file systems without reflinks, but files the test command rewrites in place change in the project and in every workspace. Default is 'auto'.",
+    )
+    parser.add_argument(
+        "--workspace-dir",
+        type=str,
+        default=None,
+        help="Directory to create worker workspaces in. Use a directory on the same file system as the project so files can be linked. Default is the system temp directory.",
+    )
+    parser.add_argument(
+        "--warm-test-worker",
+        action="store_true",
+        default=False,
+        help="Keep a warm test process per worker and rerun the tests in it for each mutant instead of starting the test command from scratch. Supports pytest.",
+    )
+    parser.add_argument(
+        "--select-tests",
+        action="store_true",
+        default=False,
+        help="Record per-test line coverage after the dry run and only run the tests that execute the mutated line. Supports pytest and requires coverage.py.",
+    )
+    parser.add_argument(
+        "--timeout-multiplier",
+        type=float,
+        default=2.0,
+        help="A mutant times out when its tests take longer than this multiple of the dry run (or of the selected tests' recorded durations). Default is 2.0.",
+    )
+    parser.add_argument(
+        "--timeout-floor",
+        type=float,
+        default=5.0,
+        help="The minimum mutant timeout in seconds. Default is 5.",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        default=False,
+        help="Stop each mutant's test run at the first failing test by adding -x to pytest, --bail to jest or -failfast to go test; other test commands are run unchanged. With pytest, the tests that killed the most mutants also run first. The test command of the dry run is not changed.",
+    )
+    parser.add_argument(
+        "--schemata",
+        action="store_true",
+        default=False,
+        help="Build all mutants of a Go, Rust, Java, C, C++ or C# file into one variant of the file and switch between them with the MUTAHUNTER_ACTIVE environment variable, so the project is built once instead of once per mutant. Mutants that cannot be switched are tested one file at a time.",
+    )
+    parser.add_argument(
+        "--import-hook",
+        action="store_true",
+        default=False,
+        help="For Python source files, serve each mutant to the test process through an import hook instead of replacing the file on disk. The source file is never modified. Requires a test command that starts Python with site customization enabled (no -S or -I); otherwise files are replaced as usual.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Resume an interrupted run from its journal (logs/_latest/journal.jsonl): restore a source file left mutated, reuse the generated mutants without calling the LLM again and only test the mutants that have no result yet.",
+    )
+    parser.add_argument(
+        "--diff-base",
+        type=str,
+        default=None,
+        help="Only mutate the functions that changed since this git revision (e.g. 'origin/main'). The source file is compared to the merge base of the revision and HEAD, including uncommitted changes. Default is to mutate the whole file.",
+    )
+    parser.add_argument(
+        "--outcome-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse the outcome of a mutant that was already tested in an earlier run with the same mutated file, test files and test command (logs/cache/outcomes.sqlite). Default is enabled.",
+    )
+    parser.add_argument(
+        "--cache-inputs",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Files, directories or glob patterns whose contents invalidate cached outcomes when they change, e.g. test fixtures or configuration. Default is the test path.",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=100_000,
+        help="Maximum number of cached outcomes. The least recently used outcomes are evicted first. Default is 100000.",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse LLM responses to identical requests (same model, messages and parameters) from earlier runs (logs/cache/llm_responses.sqlite). Identical requests made at the same time share one call. Default is enabled.",
+    )
+    parser.add_argument(
+        "--llm-cache-ttl",
+        type=float,
+        default=7 * 24 * 3600,
+        help="Number of seconds a cached LLM response stays valid. Default is 604800 (one week).",
+    )
+    parser.add_argument(
+        "--llm-cache-max-entries",
+        type=int,
+        default=10_000,
+        help="Maximum number of cached LLM responses. The least recently used responses are evicted first. Default is 10000.",
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of LLM requests made at the same time. Mutants of each request are tested as soon as it completes. Default is 4.",
+    )
+    parser.add_argument(
+        "--max-prompt-lines",
+        type=int,
+        default=300,
+        help="Source files with more lines to mutate than this are split into requests of whole functions of at most this many lines, each with the file's imports and enclosing class headers for context. 0 sends the whole file in one request. Default is 300.",
+    )
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        choices=["yaml", "json"],
+        default="yaml",
+        help="Format the LLM writes mutants in. 'json' asks for one compact record per mutant (line, replacement and operator) with the model's structured output where the provider supports it, and reads incomplete or malformed responses locally instead of asking the LLM to repair them, so responses are shorter and never need a second call. Default is 'yaml'.",
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=["llm", "rule", "hybrid"],
+        default="llm",
+        help="How mutants are generated. 'rule' applies the classic mutation operators (relational flip, boundary shift, arithmetic and logical operator swap, boolean negation and return value replacement) to the syntax tree of every function, offline and at no cost. 'hybrid' adds the rule mutants to LLM mutants and asks the LLM only for semantic mutants the rules cannot find. Default is 'llm'.",
+    )
+    parser.add_argument(
+        "--coverage-report",
+        type=str,
+        default=None,
+        help="Path to a line coverage report of the test suite (Cobertura XML, JaCoCo XML or LCOV). Only the functions it shows as executed are sent to the LLM, and mutants of lines it shows as never executed are not tested. Default is to mutate every function.",
+    )
+    parser.add_argument(
+        "--coverage-type",
+        type=str,
+        choices=COVERAGE_TYPES,
+        default="auto",
+        help="Format of the coverage report. Default is to detect it from the file.",
+    )
+    parser.add_argument(
+        "--block-index",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Keep the function blocks found in each source file in an index (logs/cache/blocks.sqlite), so unchanged files are not parsed again in later runs. Default is enabled.",
+    )
+    parser.add_argument(
+        "--max-cost",
+        type=float,
+        default=None,
+        help="Maximum cost in USD of the LLM calls. Each call is refused if its cost, estimated from the tokens of its prompt and of the longest response so far, does not fit in what is left. Requests are planned in windows of 64; when the estimate of a window exceeds what is left of the budget, its most covered, most recently changed and most complex code is mutated first. The ranking is per window, so on directory runs a valuable file planned late can find the budget already spent. The mutants generated before the budget ran out are still tested and reported. Models litellm has no pricing for cost $0 and are not limited; use --max-tokens for them. Default is no limit.",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help="Maximum number of prompt and response tokens of the LLM calls, enforced like --max-cost. Default is no limit.",
+    )
+    parser.add_argument(
+        "--llm-rpm",
+        type=float,
+        default=None,
+        help="Requests per minute the LLM provider allows for the model. Calls are paced to this rate with a token bucket instead of running into rate limit errors. Default is no pacing.",
+    )
+    parser.add_argument(
+        "--llm-tpm",
+        type=int,
+        default=None,
+        help="Prompt and response tokens per minute the LLM provider allows for the model, paced like --llm-rpm. Default is no pacing.",
+    )
+    parser.add_argument(
+        "--llm-max-retries",
+        type=int,
+        default=5,
+        help="Maximum number of retries of an LLM call rejected with a rate limit, connection, timeout or server error. Retries back off exponentially with jitter, or wait as long as the provider's Retry-After header asks, and a rate limit error holds back every call for that long. Default is 5.",
+    )
+    parser.add_argument(
+        "--llm-retry-budget",
+        type=int,
+        default=50,
+        help="Maximum number of retries of LLM calls in the whole run, so an unavailable provider does not hold the run up. Requests that are given up on are generated again by a run with --resume. Default is 50.",
+    )
+
+
+def add_cache_subparser(subparsers):
+    parser = subparsers.add_parser("cache", help="Inspect or clear the outcome cache.")
+    parser.add_argument(
+        "action",
+        choices=["stats", "list", "clear"],
+        help="'stats' shows the number of cached outcomes, 'list' shows the most recently used ones and 'clear' removes all of them.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Number of outcomes shown by 'list'. Default is 20.",
+    )
+
+
+def add_index_subparser(subparsers):
+    parser = subparsers.add_parser(
+        "index", help="Build the block index of the source files ahead of a run."
+    )
+    parser.add_argument(
+        "--source-path",
+        type=str,
+        default=".",
+        help="The source files to index: a file, a directory (searched recursively) or a quoted glob pattern. Default is the current directory.",
+    )
+    parser.add_argument(
+        "--exclude-files",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Paths or glob patterns of files to leave out.",
+    )
+    parser.add_argument(
+        "--clear",
+        action="store_true",
+        help="Remove the indexed blocks of all files instead.",
     )
 
 
@@ -71,6 +312,8 @@ def parse_arguments():
     )
     subparsers = parser.add_subparsers(title="commands", dest="command")
     add_mutation_testing_subparser(subparsers)
+    add_cache_subparser(subparsers)
+    add_index_subparser(subparsers)
 
     return parser.parse_args()
 
@@ -85,15 +328,92 @@ def create_run_mutation_testing_controller(
         exclude_files=args.exclude_files,
         source_path=args.source_path,
         test_path=args.test_path,
+        workers=args.workers,
+        workspace_mode=args.workspace_mode,
+        workspace_dir=args.workspace_dir,
+        warm_test_worker=args.warm_test_worker,
+        select_tests=args.select_tests,
+        timeout_multiplier=args.timeout_multiplier,
+        timeout_floor=args.timeout_floor,
+        fail_fast=args.fail_fast,
+        schemata=args.schemata,
+        import_hook=args.import_hook,
+        resume=args.resume,
+        diff_base=args.diff_base,
+        outcome_cache=args.outcome_cache,
+        cache_inputs=args.cache_inputs,
+        cache_max_entries=args.cache_max_entries,
+        llm_cache=args.llm_cache,
+        llm_cache_ttl=args.llm_cache_ttl,
+        llm_cache_max_entries=args.llm_cache_max_entries,
+        llm_concurrency=args.llm_concurrency,
+        max_prompt_lines=args.max_prompt_lines,
+        output_format=args.output_format,
+        engine=args.engine,
+        coverage_report=args.coverage_report,
+        coverage_type=args.coverage_type,
+        block_index=args.block_index,
+        max_cost=args.max_cost,
+        max_tokens=args.max_tokens,
+        llm_requests_per_minute=args.llm_rpm,
+        llm_tokens_per_minute=args.llm_tpm,
+        llm_max_retries=args.llm_max_retries,
+        llm_retry_budget=args.llm_retry_budget,
     )
 
-    analyzer = Analyzer()
-    test_runner = MutantTestRunner(test_command=config.test_command)
+    analyzer = Analyzer(index=BlockIndex() if config.block_index else None)
+    test_runner = MutantTestRunner(
+        test_command=config.test_command,
+        warm_workers=config.warm_test_worker,
+        timeout_multiplier=config.timeout_multiplier,
+        timeout_floor=config.timeout_floor,
+        import_hook=config.import_hook,
+    )
     prompt = MutationTestingPromptFactory.get_prompt()
-    router = LLMRouter(model=config.model, api_base=config.api_base)
-    engine = LLMMutationEngine(model=config.model, router=router, prompt=prompt)
+    router = LLMRouter(
+        model=config.model,
+        api_base=config.api_base,
+        cache=(
+            ResponseCache(
+                ttl=config.llm_cache_ttl, max_entries=config.llm_cache_max_entries
+            )
+            if config.llm_cache
+            else None
+        ),
+        budget=(
+            GenerationBudget(max_cost=config.max_cost, max_tokens=config.max_tokens)
+            if config.max_cost is not None or config.max_tokens is not None
+            else None
+        ),
+        rate_limiter=RateLimiter(
+            requests_per_minute=config.llm_requests_per_minute,
+            tokens_per_minute=config.llm_tokens_per_minute,
+        ),
+        retry_policy=RetryPolicy(
+            max_retries=config.llm_max_retries, retry_budget=config.llm_retry_budget
+        ),
+    )
+    engine = LLMMutationEngine(
+        model=config.model,
+        router=router,
+        prompt=prompt,
+        analyzer=analyzer,
+        max_prompt_lines=config.max_prompt_lines,
+        output_format=config.output_format,
+        semantic_only=config.engine == "hybrid",
+    )
+    if config.engine == "rule":
+        engine = RuleMutationEngine(analyzer)
+    elif config.engine == "hybrid":
+        engine = RuleMutationEngine(analyzer, llm_engine=engine)
     mutant_report = MutantReport()
     file_handler = FileOperationHandler()
+    workspace_provisioner = WorkspaceProvisioner(
+        project_root=os.getcwd(),
+        size=config.workers,
+        link_mode=config.workspace_mode,
+        base_dir=config.workspace_dir,
+    )
 
     return MutationTestController(
         config=config,
@@ -104,15 +424,104 @@ def create_run_mutation_testing_controller(
         mutant_report=mutant_report,
         file_handler=file_handler,
         prompt=prompt,
+        workspace_provisioner=workspace_provisioner,
+        outcome_cache=(
+            OutcomeCache(max_entries=config.cache_max_entries)
+            if config.outcome_cache
+            else None
+        ),
     )
 
 
+def run_cache_command(args: argparse.Namespace) -> None:
+    cache = OutcomeCache()
+    try:
+        if args.action == "stats":
+            stats = cache.stats()
+            print(f"Path: {stats['path']}")
+            print(f"Entries: {stats['entries']}")
+            for status, count in sorted(stats["statuses"].items()):
+                print(f"  {status}: {count}")
+            print(f"Hits: {stats['hits']}")
+            print(f"Size: {stats['size_bytes']} bytes")
+        elif args.action == "list":
+            for entry in cache.entries(limit=args.limit):
+                print(
+                    f"{entry['key'][:12]}  {entry['status']:<8}  hits={entry['hits']:<4}  "
+                    f"{entry['source_path']}:{entry['line_number']}"
+                )
+        else:
+            count = cache.clear()
+            print(f"Removed {count} cached outcomes.")
+    finally:
+        cache.close()
+
+
+def _time_index_pass(
+    source_paths: List[str], index_path: str
+) -> Tuple[float, int, int, int]:
+    """
+    Finds the blocks of every source file through the index at `index_path`.
+
+    Returns:
+        Tuple[float, int, int, int]: The seconds taken, the files answered from
+        the index, the files parsed and the number of blocks.
+    """
+    # Nothing is kept in memory, so indexed files are read from disk.
+    index = BlockIndex(path=index_path, memory_entries=0)
+    try:
+        analyzer = Analyzer(index=index)
+        start = time.perf_counter()
+        num_blocks = 0
+        for source_path in source_paths:
+            with open(source_path, "rb") as f:
+                source_code = f.read()
+            num_blocks += len(analyzer.get_block_records(source_path, source_code))
+        seconds = time.perf_counter() - start
+        return seconds, index.hits, index.misses, num_blocks
+    finally:
+        index.close()
+
+
+def run_index_command(args: argparse.Namespace) -> None:
+    index = BlockIndex()
+    try:
+        if args.clear:
+            count = index.clear()
+            print(f"Removed the blocks of {count} files.")
+            return
+        source_paths = list(
+            FileOperationHandler.iter_source_files(args.source_path, args.exclude_files)
+        )
+        # The cold pass parses every file into a fresh index, so that it is cold
+        # even when the project's index already exists.
+        with tempfile.TemporaryDirectory(prefix="mutahunter-index-") as directory:
+            cold = _time_index_pass(
+                source_paths, os.path.join(directory, "blocks.sqlite")
+            )
+        update = _time_index_pass(source_paths, index.path)
+        warm = _time_index_pass(source_paths, index.path)
+        print(f"Path: {index.path}")
+        print(f"Files: {len(source_paths)}")
+        print(f"Blocks: {warm[3]}")
+        for label, (seconds, hits, misses, _) in zip(
+            ["Cold", "Update", "Warm"], [cold, update, warm]
+        ):
+            print(f"{label}: {seconds:.3f}s ({hits} indexed, {misses} parsed)")
+    finally:
+        index.close()
+
+
 def run():
     args = parse_arguments()
     if args.command == "run":
         controller = create_run_mutation_testing_controller(args)
         controller.run()
         pass
+    elif args.command == "cache":
+        run_cache_command(args)
+    elif args.command == "index":
+        run_index_command(args)
     else:
         print("Invalid command.")
         sys.exit(1)
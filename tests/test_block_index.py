@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.block_index import BlockIndex
+
+SOURCE = """import os
+
+
+class Calc:
+    def add(self, a, b):
+        return a + b
+
+
+def sub(a, b):
+    if a > b:
+        return a - b
+    return b - a
+"""
+
+
+def test_blocks_are_answered_from_the_index(tmp_path):
+    source_path = tmp_path / "calc.py"
+    source_path.write_text(SOURCE)
+    index_path = str(tmp_path / "blocks.sqlite")
+    analyzer = Analyzer(index=BlockIndex(index_path))
+
+    blocks = analyzer.get_function_blocks(str(source_path))
+    analyzer.index.close()
+
+    assert [(b.name, b.start_point[0] + 1, b.end_point[0] + 1) for b in blocks] == [
+        ("add", 5, 6),
+        ("sub", 9, 12),
+    ]
+    assert blocks[0].scope_rows == (3,)
+    with patch.object(
+        Analyzer, "_parse_block_records", side_effect=AssertionError("parsed")
+    ):
+        analyzer = Analyzer(index=BlockIndex(index_path))
+        assert analyzer.get_function_blocks(str(source_path)) == blocks
+        assert (
+            analyzer.find_function_block_by_name(str(source_path), "sub") == blocks[1]
+        )
+        assert len(analyzer.get_method_blocks(str(source_path))) == 4
+    assert analyzer.index.hits == 3
+
+    source_path.write_text(SOURCE.replace("class Calc:", "\nclass Calc:"))
+    assert analyzer.get_function_blocks(str(source_path))[0].start_point[0] == 5
+    assert analyzer.index.misses == 1
@@ -0,0 +1,98 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.block_index import BlockIndex
+from mutahunter.core.budget import GenerationBudget
+from mutahunter.core.exceptions import BudgetExceededError
+from mutahunter.core.llm_mutation_engine import MutationRequest
+from mutahunter.core.router import LLMRouter
+from mutahunter.core.scheduler import RequestScheduler
+
+PROMPT = {"system": "system", "user": "mutate this"}
+
+
+def fake_completion(**kwargs):
+    return {
+        "choices": [{"message": {"content": "mutants: []"}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+    }
+
+
+def test_router_refuses_calls_that_do_not_fit_in_the_budget():
+    budget = GenerationBudget(max_tokens=40)
+    router = LLMRouter(model="gpt-4o-mini", budget=budget)
+    with (
+        patch.object(router, "_count_tokens", return_value=10),
+        patch(
+            "mutahunter.core.router.completion", side_effect=fake_completion
+        ) as completion,
+    ):
+        # Before any response, the response is expected to be as long as the prompt.
+        assert router.generate_response(PROMPT)[0] == "mutants: []"
+        assert (budget.spent_tokens, budget.refused) == (15, 0)
+        # Now 15 tokens are expected per call: one more fits in 40, two do not.
+        router.generate_response(PROMPT)
+        with pytest.raises(BudgetExceededError):
+            router.generate_response(PROMPT)
+    assert completion.call_count == 2
+    assert (budget.spent_tokens, budget.refused) == (30, 1)
+
+
+@patch("mutahunter.core.router.logger")
+def test_router_warns_when_max_cost_cannot_be_enforced(mock_logger):
+    LLMRouter(model="gpt-4o-mini", budget=GenerationBudget(max_cost=1.0))
+    mock_logger.warning.assert_not_called()
+
+    LLMRouter(model="unpriced/model", budget=GenerationBudget(max_cost=1.0))
+    mock_logger.warning.assert_called_once()
+
+
+def test_router_charges_the_reservation_of_a_broken_stream():
+    budget = GenerationBudget(max_tokens=100)
+    router = LLMRouter(model="gpt-4o-mini", budget=budget)
+    chunk = MagicMock()
+    chunk.choices[0].delta.content = "mutants:"
+
+    async def broken_stream():
+        yield chunk
+        raise ConnectionError("connection reset")
+
+    async def fake_acompletion(**kwargs):
+        return broken_stream()
+
+    async def read_stream():
+        return [text async for text in router.astream_response(PROMPT)]
+
+    with (
+        patch.object(router, "_count_tokens", return_value=10),
+        patch("mutahunter.core.router.acompletion", side_effect=fake_acompletion),
+    ):
+        assert asyncio.run(read_stream()) == ["mutants:"]
+    # 10 prompt tokens and, before any response, as many completion tokens.
+    assert budget.spent_tokens == 20
+
+
+def test_scheduler_mutates_the_most_valuable_code_first(tmp_path):
+    simple = tmp_path / "simple.py"
+    simple.write_text("def add(a, b):\n    return a + b\n")
+    branchy = tmp_path / "branchy.py"
+    branchy.write_text(
+        "def clamp(xs, low):\n"
+        "    for x in xs:\n"
+        "        if x < low:\n"
+        "            return low\n"
+        "    return xs\n"
+    )
+    requests = [MutationRequest(str(simple)), MutationRequest(str(branchy))]
+    engine = MagicMock()
+    engine.estimate.return_value = (100, 1.0)
+    analyzer = Analyzer(index=BlockIndex(None))
+
+    with patch("mutahunter.core.scheduler.last_change_time", return_value=None):
+        loose = RequestScheduler(engine, analyzer, GenerationBudget(max_cost=2.0))
+        assert list(loose.schedule(requests)) == requests
+        tight = RequestScheduler(engine, analyzer, GenerationBudget(max_cost=1.0))
+        assert list(tight.schedule(requests)) == requests[::-1]
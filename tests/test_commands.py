@@ -0,0 +1,72 @@
+import pytest
+
+from mutahunter.core.commands import (
+    add_fail_fast_flag,
+    parse_failed_tests,
+    select_pytest_tests,
+)
+from mutahunter.core.kill_stats import KillStats
+
+
+@pytest.mark.parametrize(
+    "test_command, expected",
+    [
+        ("pytest tests/", "pytest tests/ -x"),
+        ("python -m pytest --maxfail=2", "python -m pytest --maxfail=2"),
+        ("npx jest src", "npx jest src --bail"),
+        ("go test ./... -v", "go test -failfast ./... -v"),
+        ("mvn clean test", "mvn clean test"),
+        ("pytest && echo done", "pytest && echo done"),
+    ],
+)
+def test_add_fail_fast_flag(test_command, expected):
+    assert add_fail_fast_flag(test_command) == expected
+
+
+def test_parse_failed_tests():
+    output = (
+        "FAILED tests/test_app.py::test_add - assert -1 == 3\n"
+        "ERROR tests/test_app.py::test_db\n"
+        "--- FAIL: TestSub (0.00s)\n"
+        "FAILED tests/test_app.py::test_add - assert -1 == 3\n"
+    )
+
+    assert parse_failed_tests(output) == [
+        "tests/test_app.py::test_add",
+        "tests/test_app.py::test_db",
+        "TestSub",
+    ]
+
+
+@pytest.mark.parametrize(
+    "test_command, expected",
+    [
+        ("pytest tests/ -q", "pytest -q tests/test_app.py::test_add"),
+        ("pytest -k add tests/", "pytest -k add tests/test_app.py::test_add"),
+        ("pytest --cov tests/", "pytest --cov tests/test_app.py::test_add"),
+        ("pytest --cov=src tests/", "pytest --cov=src tests/test_app.py::test_add"),
+    ],
+)
+def test_select_pytest_tests(test_command, expected):
+    assert (
+        select_pytest_tests(test_command, ["tests/test_app.py::test_add"]) == expected
+    )
+
+
+def test_select_pytest_tests_rejects_other_commands():
+    assert select_pytest_tests("npm test", ["a"]) is None
+    assert select_pytest_tests("pytest && echo ok", ["a"]) is None
+
+
+def test_kill_stats_persist_and_order(tmp_path):
+    path = str(tmp_path / "kill_stats.json")
+    stats = KillStats(path)
+    stats.record(["test_b"])
+    stats.record(["test_b", "test_c"])
+
+    reloaded = KillStats(path)
+
+    assert reloaded.kills == {"test_b": 2, "test_c": 1}
+    assert reloaded.order(
+        ["test_a", "test_c", "test_b", "test_d"], {"test_a": 2.0, "test_d": 0.1}
+    ) == ["test_b", "test_c", "test_d", "test_a"]
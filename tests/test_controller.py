@@ -0,0 +1,156 @@
+import itertools
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from mutahunter.core.budget import GenerationBudget
+from mutahunter.core.controller import MutationTestController
+from mutahunter.core.entities.config import MutationTestControllerConfig
+from mutahunter.core.exceptions import MutantSurvivedError, MutantTimeoutError
+from mutahunter.core.io import WorkspaceProvisioner
+from mutahunter.core.runner import MutantTestRunner
+
+
+@pytest.fixture
+def config():
+    return MutationTestControllerConfig(
+        source_path="app.py",
+        test_path="",
+        model="gpt-4o-mini",
+        api_base="",
+        test_command="pytest",
+        exclude_files=[],
+        workers=2,
+        fail_fast=False,
+    )
+
+
+def make_controller(config, test_runner, workspace_provisioner=None):
+    mutant_archive = MagicMock()
+    mutant_archive.materialize.return_value = False
+    return MutationTestController(
+        config=config,
+        analyzer=MagicMock(),
+        test_runner=test_runner,
+        router=MagicMock(),
+        engine=MagicMock(),
+        mutant_report=MagicMock(),
+        file_handler=MagicMock(),
+        prompt=MagicMock(),
+        workspace_provisioner=workspace_provisioner or MagicMock(),
+        journal=MagicMock(),
+        mutant_archive=mutant_archive,
+    )
+
+
+def test_test_mutant_derives_the_timeout_from_the_baseline(config):
+    test_runner = MutantTestRunner(
+        test_command="pytest", timeout_multiplier=3.0, timeout_floor=1.0
+    )
+    test_runner.baseline_duration = 2.0
+    controller = make_controller(config, test_runner)
+
+    with patch.object(
+        test_runner, "run_test", return_value=MagicMock(returncode=0, stdout="")
+    ) as run_test:
+        with pytest.raises(MutantSurvivedError):
+            controller.test_mutant("app.py", "mutant.py")
+
+    assert run_test.call_args[0][0]["timeout"] == 6.0
+
+
+def test_timed_out_mutant_is_recorded_as_timeout(config):
+    test_runner = MagicMock()
+    test_runner.get_timeout.return_value = 5.0
+    test_runner.run_test.side_effect = MutantTimeoutError("Tests timed out after 5s")
+    controller = make_controller(config, test_runner)
+    mutant_data = {
+        "source_path": "app.py",
+        "mutant_path": "mutant.py",
+        "line_number": 1,
+    }
+
+    controller._record_result(mutant_data, controller._process_mutant(mutant_data))
+
+    assert mutant_data["status"] == "TIMEOUT"
+    assert controller.timeout_mutants == 1
+
+
+def test_parallel_workers_do_not_see_each_others_mutants(config, tmp_path, monkeypatch):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "app.py").write_text("VALUE = 'original'\n")
+    mutants = tmp_path / "mutants"
+    mutants.mkdir()
+    for name in ("a", "b"):
+        (mutants / f"{name}.py").write_text(f"VALUE = '{name}'\n")
+    monkeypatch.chdir(project)
+    # Both mutants are in place while the other one's tests run.
+    test_command = (
+        f'{sys.executable} -c "import time; time.sleep(0.5); '
+        f"print(open('app.py').read())\""
+    )
+    config.test_command = test_command
+    test_runner = MutantTestRunner(test_command=test_command)
+    outputs = {}
+    run_test = test_runner.run_test
+
+    def recording_run_test(params):
+        result = run_test(params)
+        outputs[params["replacement_module_path"]] = result.stdout
+        return result
+
+    monkeypatch.setattr(test_runner, "run_test", recording_run_test)
+    base_dir = tmp_path / "workspaces"
+    base_dir.mkdir()
+    with WorkspaceProvisioner(
+        project_root=str(project), size=2, base_dir=str(base_dir)
+    ) as provisioner:
+        controller = make_controller(config, test_runner, provisioner)
+        mutations = [
+            {
+                "source_path": "app.py",
+                "mutant_path": str(mutants / f"{name}.py"),
+                "line_number": 1,
+            }
+            for name in ("a", "b")
+        ]
+
+        controller._process_mutations_in_workspaces(mutations, "app.py")
+
+    assert outputs == {
+        str(mutants / "a.py"): "VALUE = 'a'\n\n",
+        str(mutants / "b.py"): "VALUE = 'b'\n\n",
+    }
+    assert controller.survived_mutants == 2
+    assert (project / "app.py").read_text() == "VALUE = 'original'\n"
+
+
+def test_schedule_plans_requests_one_window_at_a_time(config):
+    controller = make_controller(config, MagicMock())
+    controller.router.budget = GenerationBudget(max_cost=1.0)
+    controller.engine.estimate.return_value = (10, 0.0)
+    planned = []
+
+    def requests():
+        for number in itertools.count():
+            planned.append(number)
+            yield number
+
+    scheduled = controller._schedule(requests())
+
+    assert list(itertools.islice(scheduled, 3)) == [0, 1, 2]
+    assert len(planned) == controller.SCHEDULE_WINDOW
+
+
+def test_fail_fast_notes_once_that_other_runners_keep_their_order(config):
+    config.fail_fast = True
+    config.test_command = "go test ./..."
+
+    with patch("mutahunter.core.controller.logger") as logger:
+        controller = make_controller(config, MagicMock())
+
+    assert controller.mutant_test_command == "go test -failfast ./..."
+    assert logger.info.call_count == 1
+    assert "pytest only" in logger.info.call_args[0][0]
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from mutahunter.core.coverage_map import PerTestCoverageMap
+
+
+@pytest.fixture
+def coverage_map():
+    path = os.path.abspath("app.py")
+    files = {
+        path: {
+            "lines": {
+                "1": [""],
+                "2": ["tests/test_app.py::test_add", "tests/test_app.py::test_sub"],
+                "5": ["tests/test_app.py::test_sub"],
+            },
+            "statements": [1, 2, 4, 5, 8],
+        }
+    }
+    durations = {"tests/test_app.py::test_add": 0.5, "tests/test_app.py::test_sub": 1.5}
+    return PerTestCoverageMap(files, durations=durations)
+
+
+def test_select_tests(coverage_map):
+    assert coverage_map.select_tests("app.py", 2) == [
+        "tests/test_app.py::test_add",
+        "tests/test_app.py::test_sub",
+    ]
+    assert coverage_map.select_tests("app.py", 1) is None
+    assert coverage_map.select_tests("app.py", 8) == []
+    assert coverage_map.select_tests("app.py", 3) is None
+    assert coverage_map.select_tests("other.py", 2) is None
+
+
+def test_test_command_for(coverage_map):
+    command = "python -m pytest -q tests/ -k 'not slow'"
+
+    assert coverage_map.test_command_for(command, ["tests/test_app.py::test_sub"]) == (
+        "python -m pytest -q -k 'not slow' tests/test_app.py::test_sub"
+    )
+    assert coverage_map.test_command_for(command, None) == command
+
+
+def test_estimate_duration(coverage_map):
+    assert coverage_map.estimate_duration(["tests/test_app.py::test_add"], 3.0) == 1.5
+    assert coverage_map.estimate_duration(None, 3.0) == 3.0
@@ -0,0 +1,63 @@
+import pytest
+
+from mutahunter.core.coverage_processor import CoverageProcessor
+
+COBERTURA = """<?xml version="1.0" ?>
+<coverage line-rate="0.5">
+    <sources><source>/repo/src</source></sources>
+    <packages>
+        <package name="app">
+            <classes>
+                <class filename="app/calc.py">
+                    <lines>
+                        <line number="1" hits="1"/>
+                        <line number="2" hits="3"/>
+                        <line number="5" hits="0"/>
+                    </lines>
+                </class>
+                <class filename="other/calc.py">
+                    <lines><line number="1" hits="0"/></lines>
+                </class>
+            </classes>
+        </package>
+    </packages>
+</coverage>"""
+
+JACOCO = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<!DOCTYPE report PUBLIC "-//JACOCO//DTD Report 1.1//EN" "report.dtd">
+<report name="app">
+    <package name="app">
+        <sourcefile name="calc.py">
+            <line nr="1" mi="0" ci="2" mb="0" cb="0"/>
+            <line nr="2" mi="0" ci="4" mb="0" cb="0"/>
+            <line nr="5" mi="3" ci="0" mb="0" cb="0"/>
+        </sourcefile>
+    </package>
+</report>"""
+
+LCOV = """TN:
+SF:/repo/src/app/calc.py
+DA:1,1
+DA:2,3
+DA:5,0
+end_of_record
+SF:/repo/src/other/calc.py
+DA:1,0
+end_of_record
+"""
+
+
+@pytest.mark.parametrize(
+    "filename, content",
+    [("coverage.xml", COBERTURA), ("jacoco.xml", JACOCO), ("lcov.info", LCOV)],
+)
+def test_parse_coverage_report(tmp_path, filename, content):
+    report_path = tmp_path / filename
+    report_path.write_text(content)
+
+    processor = CoverageProcessor(str(report_path))
+    processor.parse_coverage_report()
+
+    assert processor.executed_lines("src/app/calc.py") == [1, 2]
+    assert processor.line_hits("src/app/calc.py")[5] == 0
+    assert processor.executed_lines("src/app/missing.py") is None
@@ -0,0 +1,51 @@
+import subprocess
+
+import pytest
+
+from mutahunter.core.exceptions import MutationTestingError
+from mutahunter.core.git_diff import (
+    changed_lines,
+    merge_line_ranges,
+    parse_changed_lines,
+)
+
+SOURCE = "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a - b\n"
+
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.email=a@b.c", "-c", "user.name=a", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init", "-q")
+    (tmp_path / "app.py").write_text(SOURCE)
+    git(tmp_path, "add", "app.py")
+    git(tmp_path, "commit", "-q", "-m", "base")
+    git(tmp_path, "tag", "base")
+    return tmp_path
+
+
+def test_parse_changed_lines():
+    diff = "@@ -3 +3 @@\n-a\n+b\n@@ -10,0 +11,2 @@\n+c\n+d\n@@ -20,2 +21,0 @@\n-e\n-f\n"
+
+    assert parse_changed_lines(diff) == {3, 11, 12, 21, 22}
+
+
+def test_merge_line_ranges():
+    assert merge_line_ranges([(10, 12), (1, 4), (3, 6), (7, 8)]) == [(1, 8), (10, 12)]
+
+
+def test_changed_lines(repo):
+    (repo / "app.py").write_text(SOURCE.replace("a - b", "b - a"))
+    (repo / "new.py").write_text("x = 1\n")
+
+    assert changed_lines(str(repo / "app.py"), "base") == {6}
+    assert changed_lines(str(repo / "new.py"), "base") is None
+    with pytest.raises(MutationTestingError):
+        changed_lines(str(repo / "app.py"), "no-such-ref")
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from mutahunter.core.commands import with_import_hook
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    mutant_path = tmp_path / "mutant_calc.py"
+    mutant_path.write_text("def add(a, b):\n    return a - b\n")
+    return tmp_path
+
+
+def run_python(code, cwd, env):
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_import_hook_serves_mutant(project, monkeypatch):
+    monkeypatch.chdir(project)
+    status_path = project / "status"
+    env = with_import_hook("calc.py", "mutant_calc.py", status_path=str(status_path))
+
+    result = run_python("import calc; print(calc.add(2, 3))", project, env)
+
+    assert result.stdout.strip() == "-1"
+    assert status_path.read_text().split() == ["installed", "served"]
+    assert (project / "calc.py").read_text() == "def add(a, b):\n    return a + b\n"
+    assert not (project / "__pycache__").exists()
+
+
+def test_import_hook_runs_shadowed_sitecustomize(project, monkeypatch):
+    monkeypatch.chdir(project)
+    site_dir = project / "site"
+    site_dir.mkdir()
+    (site_dir / "sitecustomize.py").write_text(
+        "import builtins\nbuiltins.CUSTOMIZED = True\n"
+    )
+    env = with_import_hook(
+        "calc.py", "mutant_calc.py", env={"PYTHONPATH": str(site_dir)}
+    )
+
+    result = run_python("import calc; print(CUSTOMIZED, calc.add(2, 3))", project, env)
+
+    assert result.stdout.strip() == "True -1"
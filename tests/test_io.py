@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+from mutahunter.core.io import FileOperationHandler, WorkspaceProvisioner
+
+
+@pytest.fixture
+def project_root(tmp_path):
+    root = tmp_path / "project"
+    (root / "src").mkdir(parents=True)
+    (root / "logs").mkdir()
+    (root / "src" / "app.py").write_text("def add(a, b):\n    return a + b\n")
+    (root / "src" / "util.py").write_text("VALUE = 1\n")
+    (root / "logs" / "debug.log").write_text("log")
+    return root
+
+
+@pytest.fixture
+def provisioner(project_root, tmp_path):
+    base_dir = tmp_path / "workspaces"
+    base_dir.mkdir()
+    with WorkspaceProvisioner(
+        project_root=str(project_root),
+        size=2,
+        link_mode="hardlink",
+        base_dir=str(base_dir),
+    ) as provisioner:
+        yield provisioner
+
+
+def test_workspace_links_project_files(provisioner, project_root):
+    workspace = provisioner.acquire()
+
+    linked = workspace.path(os.path.join("src", "util.py"))
+    assert os.path.samefile(linked, project_root / "src" / "util.py")
+    assert not os.path.exists(workspace.path("logs"))
+
+
+def test_make_private_copies_file(provisioner, project_root):
+    workspace = provisioner.acquire()
+
+    path = provisioner.make_private(workspace, os.path.join("src", "app.py"))
+    with open(path, "w") as f:
+        f.write("def add(a, b):\n    return a - b\n")
+
+    assert not os.path.samefile(path, project_root / "src" / "app.py")
+    assert "a + b" in (project_root / "src" / "app.py").read_text()
+
+
+def test_release_resets_and_reuses_workspace(provisioner, project_root):
+    workspace = provisioner.acquire()
+    path = provisioner.make_private(workspace, os.path.join("src", "app.py"))
+    with open(path, "w") as f:
+        f.write("mutated\n")
+    with open(f"{path}.bak", "w") as f:
+        f.write("backup\n")
+
+    provisioner.release(workspace)
+    reused = provisioner.acquire()
+
+    assert reused is workspace
+    assert open(path).read() == (project_root / "src" / "app.py").read_text()
+    assert not os.path.exists(f"{path}.bak")
+
+
+def test_auto_mode_keeps_in_place_writes_out_of_the_project(project_root, tmp_path):
+    with WorkspaceProvisioner(
+        project_root=str(project_root), size=1, base_dir=str(tmp_path)
+    ) as provisioner:
+        workspace = provisioner.acquire()
+        with open(workspace.path(os.path.join("src", "util.py")), "r+") as f:
+            f.write("VALUE = 2\n")
+
+    assert (project_root / "src" / "util.py").read_text() == "VALUE = 1\n"
+
+
+def test_auto_mode_shares_dependencies_and_read_only_files(project_root, tmp_path):
+    (project_root / ".venv" / "lib").mkdir(parents=True)
+    (project_root / ".venv" / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    (project_root / ".venv" / "lib" / "dep.py").write_text("DEP = 1\n")
+    (project_root / "src" / "frozen.py").write_text("FROZEN = 1\n")
+    os.chmod(project_root / "src" / "frozen.py", 0o444)
+    with WorkspaceProvisioner(
+        project_root=str(project_root), size=1, base_dir=str(tmp_path)
+    ) as provisioner:
+        provisioner._modes = ["copy"]
+        workspace = provisioner.acquire()
+
+        assert os.path.islink(workspace.path(".venv"))
+        assert os.path.samefile(
+            workspace.path(os.path.join("src", "frozen.py")),
+            project_root / "src" / "frozen.py",
+        )
+        assert not os.path.samefile(
+            workspace.path(os.path.join("src", "util.py")),
+            project_root / "src" / "util.py",
+        )
+
+
+def test_reset_restores_edits_with_the_same_size_and_mtime(provisioner, project_root):
+    workspace = provisioner.acquire()
+    path = provisioner.make_private(workspace, os.path.join("src", "util.py"))
+    original_stat = os.stat(path)
+    with open(path, "w") as f:
+        f.write("VALUE = 2\n")
+    os.utime(path, ns=(original_stat.st_atime_ns, original_stat.st_mtime_ns))
+
+    provisioner.release(workspace)
+
+    assert open(path).read() == "VALUE = 1\n"
+
+
+def test_close_removes_workspaces(project_root, tmp_path):
+    provisioner = WorkspaceProvisioner(
+        project_root=str(project_root), size=1, base_dir=str(tmp_path)
+    )
+    workspace = provisioner.acquire()
+    provisioner.close()
+
+    assert not os.path.exists(workspace.root)
+
+
+def test_iter_source_files(tmp_path):
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "pkg" / "app.py").write_text("x = 1\n")
+    (tmp_path / "pkg" / "sub" / "util.py").write_text("y = 2\n")
+    (tmp_path / "pkg" / "sub" / "gen.py").write_text("z = 3\n")
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "notes.txt").write_text("notes")
+    (tmp_path / "pkg" / "test_app.py").write_text("assert True\n")
+    (tmp_path / "tests" / "helpers.py").write_text("h = 1\n")
+    (tmp_path / "node_modules" / "dep.js").write_text("var a = 1;\n")
+
+    found = FileOperationHandler.iter_source_files(
+        str(tmp_path), exclude_files=["*/gen.py"]
+    )
+
+    assert [os.path.relpath(path, tmp_path) for path in found] == [
+        os.path.join("pkg", "app.py"),
+        os.path.join("pkg", "sub", "util.py"),
+    ]
+    assert list(FileOperationHandler.iter_source_files(str(tmp_path / "pkg/*.py"))) == [
+        os.path.normpath(tmp_path / "pkg" / "app.py")
+    ]
@@ -0,0 +1,92 @@
+import pytest
+
+from mutahunter.core.journal import RunJournal, file_hash
+
+
+@pytest.fixture
+def source_path(tmp_path):
+    path = tmp_path / "app.py"
+    path.write_text("def add(a, b):\n    return a + b\n")
+    return str(path)
+
+
+def record_run(journal, source_path):
+    journal.open()
+    journal.record(
+        "run",
+        source_path=source_path,
+        source_hash=file_hash(source_path),
+        test_command="pytest",
+    )
+    mutants = [
+        {"mutant_id": "1", "line_number": 2, "mutated_code": "return a - b"},
+        {"mutant_id": "2", "line_number": 2, "mutated_code": "return a * b"},
+    ]
+    journal.record("mutants", source_path=source_path, mutants=mutants, cost=0.25)
+    journal.record("result", mutant_id="1", status="KILLED", error_msg="killed")
+    journal.close()
+
+
+def test_load_run_restores_finished_mutants(tmp_path, source_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    record_run(journal, source_path)
+    # A crash can leave the last event half written.
+    with open(journal.path, "a") as f:
+        f.write('{"event": "result", "mutant_id": "2", "sta')
+
+    resumed = journal.load_run(source_path, "pytest")
+
+    assert resumed["cost"] == 0.25
+    assert resumed["mutants"][0]["status"] == "KILLED"
+    assert "status" not in resumed["mutants"][1]
+
+    journal.open(resume=True)
+    journal.record("result", mutant_id="2", status="SURVIVED", error_msg="survived")
+    journal.close()
+    resumed = journal.load_run(source_path, "pytest")
+    assert resumed["mutants"][1]["status"] == "SURVIVED"
+
+
+def test_load_run_rejects_changed_source(tmp_path, source_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    record_run(journal, source_path)
+
+    assert journal.load_run(source_path, "pytest -x") is None
+    with open(source_path, "a") as f:
+        f.write("\n")
+    assert journal.load_run(source_path, "pytest") is None
+
+
+def test_load_run_drops_incomplete_streamed_requests(tmp_path, source_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    record_run(journal, source_path)
+    journal.open(resume=True)
+    for mutant_id in ("3", "4"):
+        journal.record(
+            "mutants",
+            source_path=source_path,
+            line_ranges=[[1, 2]],
+            mutants=[{"mutant_id": mutant_id, "line_number": 2}],
+            complete=False,
+        )
+    journal.record("result", mutant_id="3", status="KILLED", error_msg="killed")
+    journal.close()
+
+    resumed = journal.load_run(source_path, "pytest")
+
+    assert [m["mutant_id"] for m in resumed["mutants"]] == ["1", "2"]
+    assert resumed["requests"] == [[source_path, None]]
+    assert resumed["last_mutant_id"] == 4
+
+    journal.open(resume=True)
+    journal.record(
+        "mutants",
+        source_path=source_path,
+        line_ranges=[[1, 2]],
+        mutants=[],
+        complete=True,
+    )
+    journal.close()
+    resumed = journal.load_run(source_path, "pytest")
+    assert [m["mutant_id"] for m in resumed["mutants"]] == ["1", "2", "3", "4"]
+    assert resumed["mutants"][2]["status"] == "KILLED"
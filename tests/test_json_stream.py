@@ -0,0 +1,44 @@
+from mutahunter.core.json_stream import CompactMutantParser, parse_compact_mutants
+
+RESPONSE = """Here are the mutants:
+```json
+{"mutants": [
+  {"line": 2, "replacement": "return a - b", "operator": "AOR"},
+  {"line": 5, "replacement": "s = \\"}]{\\"", "operator": "SR", "notes": {"tags": [{}]}},
+  {"line": 7, "replacement": 3, "operator": "CR"},
+  {"line": 9, "replacement": "return None", "operator": "RV"}
+]}
+```"""
+
+
+def test_mutants_are_parsed_as_soon_as_they_are_complete():
+    parser = CompactMutantParser()
+    emitted = []
+    for i in range(0, len(RESPONSE), 7):
+        for mutant in parser.feed(RESPONSE[i : i + 7]):
+            emitted.append((mutant, parser.text.count('"line"')))
+    assert parser.close() == []
+
+    assert [mutant["line_number"] for mutant, _ in emitted] == [2, 5, 9]
+    # Each mutant is returned before the next one starts.
+    assert [seen for _, seen in emitted] == [1, 2, 4]
+    # Brackets and quotes inside strings do not end the record.
+    assert emitted[1][0]["mutated_code"] == 's = "}]{"'
+    # The record without a string replacement is skipped.
+    assert parser.errors == 1
+    assert parser.text == RESPONSE
+
+
+def test_partial_and_lenient_output_is_recovered():
+    response = (
+        '[{line: 3, replacement: "x = 1", operator: CR,}, '
+        '{"line_number": "4", "mutated_code": "y = 2"}, '
+        '{"line": 6, "replacement": "z ='
+    )
+
+    assert parse_compact_mutants(response) == {
+        "mutants": [
+            {"line_number": 3, "mutated_code": "x = 1", "type": "CR"},
+            {"line_number": 4, "mutated_code": "y = 2"},
+        ]
+    }
@@ -0,0 +1,207 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.exceptions import BudgetExceededError
+from mutahunter.core.llm_mutation_engine import LLMMutationEngine, MutationRequest
+from mutahunter.core.prompt_factory import MutationTestingPromptFactory
+
+RESPONSE = """```yaml
+mutants:
+  - function_name: {name}
+    line_number: 2
+    original_code: return a + b
+    mutated_code: return a - b
+```"""
+
+
+def test_generate_many_yields_results_as_they_complete(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs" / "_latest" / "llm").mkdir(parents=True)
+    for name in ("slow", "fast", "other"):
+        (tmp_path / f"{name}.py").write_text(f"def {name}(a, b):\n    return a + b\n")
+    running = []
+    peak = []
+
+    async def agenerate_response(prompt, max_tokens=4096, response_format=None):
+        name = "slow" if "def slow" in prompt["user"] else "fast"
+        running.append(name)
+        peak.append(len(running))
+        await asyncio.sleep(0.3 if name == "slow" else 0.05)
+        running.remove(name)
+        return RESPONSE.format(name=name), 0, 0
+
+    router = MagicMock()
+    router.agenerate_response = agenerate_response
+    engine = LLMMutationEngine(
+        model="gpt-4o-mini",
+        router=router,
+        prompt=MutationTestingPromptFactory.get_prompt(),
+    )
+    requests = [MutationRequest(f"{name}.py") for name in ("slow", "fast", "other")]
+
+    results = list(engine.generate_many(requests, concurrency=2))
+
+    assert [request.source_file_path for request, _ in results] == [
+        "fast.py",
+        "other.py",
+        "slow.py",
+    ]
+    assert results[2][1]["mutants"][0]["function_name"] == "slow"
+    assert max(peak) == 2
+
+
+def test_plan_requests_splits_large_files_by_function(tmp_path):
+    source = "import os\n\n\nclass Calc:\n"
+    for i in range(4):
+        source += f"    @staticmethod\n    def f{i}(x):\n        return x + {i}\n\n"
+    source += "\ndef top(a):\n    return a - 1\n"
+    source_path = str(tmp_path / "calc.py")
+    with open(source_path, "w") as f:
+        f.write(source)
+    engine = LLMMutationEngine(
+        model="gpt-4o-mini",
+        router=MagicMock(),
+        prompt=MutationTestingPromptFactory.get_prompt(),
+        analyzer=Analyzer(),
+        max_prompt_lines=6,
+    )
+
+    requests = engine.plan_requests(source_path)
+
+    assert [request.line_ranges for request in requests] == [
+        [(6, 7), (10, 11), (14, 15)],
+        [(18, 19), (22, 23)],
+    ]
+    # Imports, the class header and the decorators are sent for context.
+    assert requests[0].context_ranges == [(1, 1), (4, 5), (9, 9), (13, 13)]
+    assert requests[1].context_ranges == [(1, 1), (4, 4), (17, 17)]
+    assert engine.plan_requests(source_path, [(6, 7)])[0].context_ranges is None
+
+
+def test_generate_many_streams_mutants(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs" / "_latest" / "llm").mkdir(parents=True)
+    (tmp_path / "app.py").write_text("def add(a, b):\n    return a + b\n")
+    response = RESPONSE.format(name="add").replace(
+        "\n```", "\n  - {function_name: sub, line_number: 2}\n```"
+    )
+
+    async def astream_response(prompt, max_tokens=4096, response_format=None):
+        for i in range(0, len(response), 10):
+            yield response[i : i + 10]
+
+    router = MagicMock()
+    router.astream_response = astream_response
+    engine = LLMMutationEngine(
+        model="gpt-4o-mini",
+        router=router,
+        prompt=MutationTestingPromptFactory.get_prompt(),
+    )
+
+    results = [
+        result
+        for _, result in engine.generate_many([MutationRequest("app.py")], stream=True)
+    ]
+
+    assert [
+        ([m["function_name"] for m in result["mutants"]], result["complete"])
+        for result in results
+    ] == [(["add"], False), (["sub"], False), ([], True)]
+
+
+def test_streamed_mutants_skip_the_yaml_fix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs" / "_latest" / "llm").mkdir(parents=True)
+    (tmp_path / "app.py").write_text("def add(a, b):\n    return a + b\n")
+    # The response breaks off in the middle of the second mutant.
+    response = RESPONSE.format(name="add").replace(
+        "\n```", "\n  - function_name: [sub\n    line_number: 2\n```"
+    )
+
+    async def astream_response(prompt, max_tokens=4096, response_format=None):
+        yield response
+
+    router = MagicMock()
+    router.astream_response = astream_response
+    router.agenerate_response = AsyncMock()
+    engine = LLMMutationEngine(
+        model="gpt-4o-mini",
+        router=router,
+        prompt=MutationTestingPromptFactory.get_prompt(),
+    )
+
+    results = [
+        result
+        for _, result in engine.generate_many([MutationRequest("app.py")], stream=True)
+    ]
+
+    assert [m["function_name"] for m in results[0]["mutants"]] == ["add"]
+    router.agenerate_response.assert_not_called()
+
+
+def test_json_output_is_streamed_without_repair_calls(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs" / "_latest" / "llm").mkdir(parents=True)
+    (tmp_path / "app.py").write_text("def add(a, b):\n    return a + b\n")
+    # The second record has a trailing comma and the response is cut off.
+    response = (
+        '{"mutants": [{"line": 2, "replacement": "    return a - b", "operator": "AOR"}, '
+        '{"line": 2, "replacement": "    return a * b", "operator": "AOR",}, '
+        '{"line": 2, "repl'
+    )
+    formats = []
+
+    async def astream_response(prompt, max_tokens=4096, response_format=None):
+        assert '"replacement"' in prompt["user"]
+        formats.append(response_format)
+        for i in range(0, len(response), 10):
+            yield response[i : i + 10]
+
+    router = MagicMock()
+    router.structured_output.return_value = {"type": "json_object"}
+    router.astream_response = astream_response
+    engine = LLMMutationEngine(
+        model="gpt-4o-mini",
+        router=router,
+        prompt=MutationTestingPromptFactory.get_prompt(),
+        output_format="json",
+    )
+
+    results = [
+        result
+        for _, result in engine.generate_many([MutationRequest("app.py")], stream=True)
+    ]
+
+    assert [result["mutants"] for result in results] == [
+        [{"line_number": 2, "mutated_code": "    return a - b", "type": "AOR"}],
+        [{"line_number": 2, "mutated_code": "    return a * b", "type": "AOR"}],
+        [],
+    ]
+    assert formats == [{"type": "json_object"}]
+    router.agenerate_response.assert_not_called()
+
+
+def test_extract_response_fixes_yaml_in_both_paths():
+    broken = "mutants:\n  - line_number: 2\n   mutated_code: return a - b\n"
+    fixed = RESPONSE.format(name="add")
+    router = MagicMock()
+    router.generate_response.return_value = (fixed, 0, 0)
+
+    async def agenerate_response(prompt, max_tokens=4096, response_format=None):
+        return fixed, 0, 0
+
+    router.agenerate_response = agenerate_response
+    engine = LLMMutationEngine(
+        model="gpt-4o-mini",
+        router=router,
+        prompt=MutationTestingPromptFactory.get_prompt(),
+    )
+
+    expected = engine.extract_response(fixed)
+    assert engine.extract_response(broken) == expected
+    assert asyncio.run(engine.aextract_response(broken)) == expected
+    router.generate_response.assert_called_once()
+
+    router.generate_response.side_effect = BudgetExceededError("no budget left")
+    assert engine.extract_response(broken) == {"mutants": []}
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from mutahunter.core.io import FileOperationHandler
+from mutahunter.core.mutant_archive import MutantArchive
+
+SOURCE = """def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    if a > b:
+        return a - b
+    return b - a
+"""
+
+
+def test_mutants_are_archived_as_line_patches(tmp_path):
+    source_path = tmp_path / "calc.py"
+    source_path.write_text(SOURCE)
+    archive = MutantArchive(str(tmp_path / "mutants.sqlite"))
+    archive.open()
+    mutants = [
+        {"line_number": 2, "mutated_code": "return a - b  # Mutant"},
+        {"line_number": 7, "mutated_code": "return a + b"},
+    ]
+
+    mutant_paths = [
+        FileOperationHandler.prepare_mutant_file(mutant, str(source_path), archive)
+        for mutant in mutants
+    ]
+    # The source changing on disk does not change the archived mutants.
+    source_path.write_text("")
+
+    assert not any(os.path.exists(path) for path in mutant_paths)
+    for mutant, mutant_path in zip(mutants, mutant_paths):
+        expected = FileOperationHandler.apply_mutation(SOURCE, mutant)
+        assert archive.build(mutant_path) == expected
+        assert archive.materialize(mutant_path)
+        assert FileOperationHandler.read_file(mutant_path) == expected
+        archive.discard(mutant_path)
+        assert not os.path.exists(mutant_path)
+    assert archive.build(str(tmp_path / "unknown.py")) is None
+    archive.close()
+
+
+def test_syntax_errors_are_not_archived(tmp_path):
+    source_path = tmp_path / "calc.py"
+    source_path.write_text(SOURCE)
+    archive = MutantArchive(None)
+    archive.open()
+
+    with pytest.raises(SyntaxError):
+        FileOperationHandler.prepare_mutant_file(
+            {"line_number": 2, "mutated_code": "return a +"}, str(source_path), archive
+        )
+    (count,) = archive._connection.execute("SELECT COUNT(*) FROM mutants").fetchone()
+    assert count == 0
@@ -0,0 +1,38 @@
+from mutahunter.core.exceptions import MutantDuplicateError, MutantEquivalentError
+from mutahunter.core.io import FileOperationHandler
+from mutahunter.core.mutant_filter import MutantFilter
+
+
+def mutant(source_path, line_number, mutated_code):
+    return {
+        "source_path": source_path,
+        "line_number": line_number,
+        "mutated_code": mutated_code,
+    }
+
+
+def test_check_skips_duplicates_and_comment_only_changes(tmp_path):
+    source_path = str(tmp_path / "app.py")
+    with open(source_path, "w") as f:
+        f.write("def greet(name):\n    return 'hi  ' + name\n")
+    mutant_filter = MutantFilter(FileOperationHandler())
+
+    assert (
+        mutant_filter.check(mutant(source_path, 2, "return 'hi' + name  # a")) is None
+    )
+    assert isinstance(
+        mutant_filter.check(mutant(source_path, 2, "return 'hi'+name  # b")),
+        MutantDuplicateError,
+    )
+    assert isinstance(
+        mutant_filter.check(mutant(source_path, 2, "return 'hi  '  +  name  # c")),
+        MutantEquivalentError,
+    )
+    assert mutant_filter.check(mutant(source_path, 1, "def greet(user):  # d")) is None
+    assert mutant_filter.check(mutant(source_path, 9, "pass")) is None
+
+
+def test_code_tokens_keep_string_contents():
+    tokens = FileOperationHandler.code_tokens("lib.rs", 'let s = "a  b"; /* c */')
+
+    assert tokens == ("let", "s", "=", '"', "a  b", '"', ";")
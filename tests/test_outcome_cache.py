@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+import pytest
+
+from mutahunter.core.outcome_cache import OutcomeCache, fingerprint_inputs, outcome_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = OutcomeCache(str(tmp_path / "outcomes.sqlite"), max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_put_get_and_eviction(cache):
+    cache.put("a", "app.py", 1, "KILLED", "killed")
+    cache.put("b", "app.py", 2, "SURVIVED", "survived")
+    cache.put("c", "app.py", 3, "COMPILE_ERROR", "error")
+    assert cache.get("c") is None
+
+    assert cache.get("a") == {"status": "KILLED", "error_msg": "killed"}
+    cache.put("d", "app.py", 4, "TIMEOUT", "timeout")
+
+    assert cache.get("b") is None
+    assert cache.get("d")["status"] == "TIMEOUT"
+    assert cache.stats()["entries"] == 2
+
+
+def test_outcome_key_changes_with_test_inputs(tmp_path):
+    test_file = tmp_path / "tests" / "test_app.py"
+    test_file.parent.mkdir()
+    test_file.write_text("def test_add(): pass\n")
+    before = fingerprint_inputs([str(tmp_path / "tests")])
+    assert before == fingerprint_inputs([str(tmp_path / "tests" / "*.py")])
+
+    test_file.write_text("def test_add(): assert False\n")
+    after = fingerprint_inputs([str(tmp_path / "tests")])
+
+    assert before != after
+    assert outcome_key("app.py", "x", before, "pytest") != outcome_key(
+        "app.py", "x", after, "pytest"
+    )
+
+
+def test_empty_test_path_fingerprints_the_project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "app.py").write_text("def add(a, b):\n    return a + b\n")
+    test_file = tmp_path / "tests" / "test_app.py"
+    test_file.parent.mkdir()
+    test_file.write_text("def test_add(): pass\n")
+    before = fingerprint_inputs([""])
+
+    # Run artifacts and tool state do not count.
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "run.log").write_text("log")
+    (tmp_path / ".pytest_cache").mkdir()
+    (tmp_path / ".pytest_cache" / "lastfailed").write_text("{}")
+    (tmp_path / "venv").mkdir()
+    (tmp_path / "venv" / "site.py").write_text("import os\n")
+    # Unchanged files are not read again.
+    with patch("builtins.open", side_effect=AssertionError):
+        assert fingerprint_inputs([""]) == before
+
+    test_file.write_text(
+        "def test_add():\n    from app import add\n    assert add(1, 2) == 3\n"
+    )
+    assert fingerprint_inputs([""]) != before
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mutahunter.core.exceptions import LLMRequestError
+from mutahunter.core.rate_limit import RateLimiter, RetryPolicy
+from mutahunter.core.router import LLMRouter
+
+RESPONSE = {
+    "id": "stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "mutants: []"},
+            "finish_reason": "stop",
+        }
+    ],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+}
+
+
+class StubProvider(ThreadingHTTPServer):
+    """
+    An OpenAI-compatible chat completions endpoint that allows `limit` requests per
+    second, answers the others with a 429 and `Retry-After`, and answers every
+    `slow_every`-th request slowly.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, limit: int, slow_every: int = 0) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.limit = limit
+        self.slow_every = slow_every
+        self.accepted: deque = deque()
+        self.served = 0
+        self.rejected = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+
+    @property
+    def api_base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            now = time.monotonic()
+            while server.accepted and server.accepted[0] <= now - 1:
+                server.accepted.popleft()
+            if len(server.accepted) >= server.limit:
+                server.rejected += 1
+                retry_after = server.accepted[0] + 1 - now if server.accepted else 0.1
+                self._send(
+                    429, {"error": {"message": "Rate limit reached"}}, retry_after
+                )
+                return
+            server.accepted.append(now)
+            server.served += 1
+            slow = server.slow_every and server.served % server.slow_every == 0
+        if slow:
+            time.sleep(0.3)
+        self._send(200, RESPONSE)
+
+    def _send(self, status: int, body: dict, retry_after: float = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", f"{retry_after:.2f}")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-stub")
+    servers = []
+
+    def start(limit: int, slow_every: int = 0) -> StubProvider:
+        server = StubProvider(limit, slow_every)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def generate_all(router: LLMRouter, num_requests: int, concurrency: int = 4):
+    async def generate() -> list:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i: int) -> str:
+            async with semaphore:
+                prompt = {"system": "system", "user": f"mutate {i}"}
+                return (await router.agenerate_response(prompt))[0]
+
+        return await asyncio.gather(*(one(i) for i in range(num_requests)))
+
+    start = time.monotonic()
+    responses = asyncio.run(generate())
+    return responses, time.monotonic() - start
+
+
+@pytest.mark.parametrize("requests_per_minute", [None, 600])
+def test_throughput_stays_near_the_rate_limit(provider, requests_per_minute):
+    server = provider(limit=10, slow_every=5)
+    router = LLMRouter(
+        model="openai/stub",
+        api_base=server.api_base,
+        rate_limiter=RateLimiter(requests_per_minute=requests_per_minute),
+        retry_policy=RetryPolicy(max_retries=10, retry_budget=100, base_delay=0.05),
+    )
+
+    responses, elapsed = generate_all(router, num_requests=30)
+
+    assert responses == ["mutants: []"] * 30
+    assert router.failed_requests == 0
+    # 30 requests at 10 per second, the first 10 at once.
+    assert 1.9 < elapsed < 5.0
+    if requests_per_minute is not None:
+        # Paced calls hardly ever run into the limit.
+        assert server.rejected <= 3
+    # Connections are kept alive and reused across requests.
+    assert len(server.connections) <= 8
+
+
+def test_retries_stop_at_the_retry_budget(provider):
+    server = provider(limit=0)
+    router = LLMRouter(
+        model="openai/stub",
+        api_base=server.api_base,
+        retry_policy=RetryPolicy(max_retries=3, retry_budget=2, base_delay=0.01),
+    )
+
+    with pytest.raises(LLMRequestError):
+        generate_all(router, num_requests=1)
+    with pytest.raises(LLMRequestError):
+        generate_all(router, num_requests=1)
+
+    # Three attempts for the first call, one for the second.
+    assert server.rejected == 4
+    assert router.failed_requests == 2
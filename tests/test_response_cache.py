@@ -0,0 +1,61 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from mutahunter.core.response_cache import ResponseCache
+from mutahunter.core.router import LLMRouter
+
+PROMPT = {"system": "system", "user": "mutate this"}
+
+
+def fake_completion(**kwargs):
+    time.sleep(0.1)
+    return {
+        "choices": [{"message": {"content": "mutants: []"}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_router_reuses_and_merges_identical_requests(cache):
+    router = LLMRouter(model="gpt-4o-mini", cache=cache)
+    with patch("mutahunter.core.router.completion", side_effect=fake_completion) as (
+        completion
+    ):
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    router.generate_response(PROMPT, streaming=False)
+                )
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert router.generate_response(PROMPT, streaming=False)[0] == "mutants: []"
+
+    assert completion.call_count == 1
+    assert results == [("mutants: []", 10, 5)] * 4
+    assert router.cache_hits == 4
+
+
+def test_cache_expires_and_evicts(cache):
+    for key in ("a", "b", "c"):
+        cache.put(key, "gpt-4o-mini", key, 1, 1, 0.01)
+    assert cache.get("a") is None
+    assert cache.get("c")["content"] == "c"
+
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get("c") is None
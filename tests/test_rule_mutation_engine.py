@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+from mutahunter.core.analyzer import Analyzer
+from mutahunter.core.llm_mutation_engine import LLMMutationEngine, MutationRequest
+from mutahunter.core.prompt_factory import MutationTestingPromptFactory
+from mutahunter.core.rule_mutation_engine import RuleMutationEngine
+
+SOURCE = """LIMIT = 1 + 2
+
+
+def clamp(x, low):
+    if x < low and not x == 0:
+        return low  # lower
+    return x * 2
+"""
+
+
+def test_classic_operators_are_applied_inside_functions(tmp_path):
+    (tmp_path / "app.py").write_text(SOURCE)
+    (tmp_path / "App.java").write_text(
+        "class App {\n"
+        "  java.util.List<String> names;\n"
+        "  int size(boolean empty) { return empty || names == null ? 0 : 1; }\n"
+        "}\n"
+    )
+    engine = RuleMutationEngine(Analyzer())
+
+    mutants = engine.generate(str(tmp_path / "app.py"))["mutants"]
+
+    assert [(m["line_number"], m["type"], m["mutated_code"]) for m in mutants] == [
+        (5, "relational_flip", "if x >= low and not x == 0:"),
+        (5, "boundary_shift", "if x <= low and not x == 0:"),
+        (5, "logical_swap", "if x < low or not x == 0:"),
+        (5, "boolean_negation", "if x < low and x == 0:"),
+        (5, "relational_flip", "if x < low and not x != 0:"),
+        (6, "return_value", "return None  # lower"),
+        (7, "return_value", "return None"),
+        (7, "arithmetic_swap", "return x / 2"),
+    ]
+    assert {m["function_name"] for m in mutants} == {"clamp"}
+    assert engine.generate(str(tmp_path / "app.py"), [(7, 7)])["mutants"] == (
+        mutants[-2:]
+    )
+    # Generic type arguments are not comparisons, and only literal return values
+    # of a statically typed language are replaced.
+    java = engine.generate(str(tmp_path / "App.java"))["mutants"]
+    assert [m["mutated_code"] for m in java] == [
+        "int size(boolean empty) { return empty && names == null ? 0 : 1; }",
+        "int size(boolean empty) { return empty || names != null ? 0 : 1; }",
+    ]
+
+
+def test_hybrid_adds_rule_mutants_to_semantic_llm_mutants(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs" / "_latest" / "llm").mkdir(parents=True)
+    (tmp_path / "app.py").write_text("def add(a, b):\n    return a + b\n")
+    prompts = []
+
+    async def agenerate_response(prompt, max_tokens=4096, response_format=None):
+        prompts.append(prompt["user"])
+        return "mutants:\n  - line_number: 2\n    mutated_code: return a\n", 0, 0
+
+    router = MagicMock()
+    router.agenerate_response = agenerate_response
+    llm_engine = LLMMutationEngine(
+        model="gpt-4o-mini",
+        router=router,
+        prompt=MutationTestingPromptFactory.get_prompt(),
+        semantic_only=True,
+    )
+    engine = RuleMutationEngine(Analyzer(), llm_engine=llm_engine)
+
+    results = list(engine.generate_many([MutationRequest("app.py")]))
+
+    assert [
+        (m["mutated_code"], m.get("type"))
+        for _, result in results
+        for m in result["mutants"]
+    ] == [
+        ("return None", "return_value"),
+        ("return a - b", "arithmetic_swap"),
+        ("return a", None),
+    ]
+    assert results[0][1]["complete"]
+    assert "generated separately" in prompts[0]
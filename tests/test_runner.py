@@ -0,0 +1,98 @@
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from mutahunter.core.exceptions import MutantTimeoutError
+from mutahunter.core.runner import MutantTestRunner
+
+
+@pytest.mark.parametrize(
+    "baseline_duration, expected_duration, expected_timeout",
+    [
+        (None, None, 30.0),
+        (4.0, None, 8.0),
+        (1.0, None, 5.0),
+        (4.0, 10.0, 20.0),
+        (4.0, 0.5, 5.0),
+    ],
+)
+def test_get_timeout(baseline_duration, expected_duration, expected_timeout):
+    runner = MutantTestRunner(
+        test_command="pytest", timeout_multiplier=2.0, timeout_floor=5.0
+    )
+    runner.baseline_duration = baseline_duration
+
+    assert runner.get_timeout(expected_duration) == expected_timeout
+
+
+def test_dry_run_sets_the_baseline_duration():
+    runner = MutantTestRunner(test_command="pytest")
+    with patch.object(
+        runner,
+        "_run_test_command",
+        return_value=subprocess.CompletedProcess("pytest", 0, stdout="", stderr=""),
+    ):
+        runner.dry_run()
+
+    assert runner.baseline_duration is not None
+    assert runner.get_timeout() == 5.0
+
+
+def test_dry_run_fails_without_a_baseline():
+    runner = MutantTestRunner(test_command="pytest")
+    with patch.object(
+        runner,
+        "_run_test_command",
+        return_value=subprocess.CompletedProcess("pytest", 1, stdout="", stderr=""),
+    ):
+        with pytest.raises(Exception, match="Tests failed"):
+            runner.dry_run()
+
+    assert runner.baseline_duration is None
+
+
+def test_run_test_times_out_and_reverts_the_mutant(tmp_path):
+    module_path = tmp_path / "app.py"
+    module_path.write_text("VALUE = 1\n")
+    mutant_path = tmp_path / "mutant.py"
+    mutant_path.write_text("VALUE = 2\n")
+    runner = MutantTestRunner(test_command="sleep 5")
+
+    with pytest.raises(MutantTimeoutError):
+        runner.run_test(
+            {
+                "module_path": str(module_path),
+                "replacement_module_path": str(mutant_path),
+                "test_command": "sleep 5",
+                "cwd": str(tmp_path),
+                "timeout": 0.2,
+            }
+        )
+
+    assert module_path.read_text() == "VALUE = 1\n"
+    assert not (tmp_path / "app.py.bak").exists()
+
+
+def test_import_hook_falls_back_when_the_mutant_is_not_served(tmp_path):
+    module_path = tmp_path / "app.py"
+    module_path.write_text("VALUE = 1\n")
+    mutant_path = tmp_path / "mutant.py"
+    mutant_path.write_text("VALUE = 2\n")
+    # Reads the module as a file instead of importing it.
+    test_command = f"{sys.executable} -c \"print(open('app.py').read())\""
+    runner = MutantTestRunner(test_command=test_command, import_hook=True)
+
+    result = runner.run_test(
+        {
+            "module_path": str(module_path),
+            "replacement_module_path": str(mutant_path),
+            "test_command": test_command,
+            "cwd": str(tmp_path),
+        }
+    )
+
+    assert result.stdout == "VALUE = 2\n\n"
+    assert runner.import_hook
+    assert module_path.read_text() == "VALUE = 1\n"
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from mutahunter.core.io import FileOperationHandler
+from mutahunter.core.schemata import SchemataBuilder
+
+GO_SOURCE = """package calc
+
+func IsPositive(x int) bool {
+\tif x > 0 {
+\t\treturn true
+\t}
+\treturn false
+}
+"""
+
+RUST_SOURCE = """const LIMIT: i32 = 10;
+
+fn add(a: i32, b: i32) -> i32 {
+    a + b // sum
+}
+"""
+
+
+def mutant(line_number, mutated_code):
+    return {"line_number": line_number, "mutated_code": mutated_code}
+
+
+def test_build_go_schemata():
+    mutants = [
+        mutant(4, "if x >= 0 {"),
+        mutant(7, "return true"),
+        mutant(7, "return ("),
+    ]
+
+    schemata, included = SchemataBuilder("calc.go").build(GO_SOURCE, mutants)
+
+    assert included == mutants[:2]
+    assert "schemata_id" not in mutants[2]
+    assert schemata.startswith('package calc; import mutahunterOs "os"\n')
+    assert (
+        'if func() bool { if mutahunterOs.Getenv("MUTAHUNTER_ACTIVE") == "1" '
+        "{ return x >= 0 }; return x > 0 }() {" in schemata
+    )
+    assert (
+        'if mutahunterOs.Getenv("MUTAHUNTER_ACTIVE") == "2" '
+        "{ return true } else { return false }" in schemata
+    )
+    assert len(schemata.splitlines()) == len(GO_SOURCE.splitlines())
+
+
+def test_build_rust_schemata_guards_expressions():
+    mutants = [mutant(1, "const LIMIT: i32 = 11;"), mutant(4, "a - b // changed")]
+
+    schemata, included = SchemataBuilder("lib.rs").build(RUST_SOURCE, mutants)
+
+    assert included == [mutants[1]]
+    assert mutants[1]["schemata_id"] == "2"
+    assert (
+        '    (if std::env::var("MUTAHUNTER_ACTIVE").map_or(false, |v| v == "2") '
+        "{ a - b } else { a + b }) // sum\n" in schemata
+    )
+
+
+def test_prepare_schemata_file(tmp_path):
+    source_path = tmp_path / "calc.go"
+    source_path.write_text(GO_SOURCE)
+    schemata_path = tmp_path / "schemata_calc.go"
+    mutants = [mutant(7, "return true")]
+
+    with patch.object(
+        FileOperationHandler, "get_mutant_path", return_value=str(schemata_path)
+    ):
+        path = FileOperationHandler.prepare_schemata_file(mutants, str(source_path))
+
+    assert path == str(schemata_path)
+    assert "MUTAHUNTER_ACTIVE" in schemata_path.read_text()
+    assert FileOperationHandler.prepare_schemata_file(mutants, "app.py") is None
@@ -0,0 +1,27 @@
+import mutahunter.core.controller
+from mutahunter.core.io import FileOperationHandler
+from mutahunter.core.syntax_checker import IncrementalSyntaxChecker
+
+REPLACEMENTS = ["pass", "return (", "x = 1  # é", "else:", "", "if a:\n    b = 2"]
+
+
+def test_incremental_check_matches_full_parse():
+    source_path = mutahunter.core.controller.__file__
+    source_code = FileOperationHandler.read_file(source_path)
+    checker = IncrementalSyntaxChecker(source_path, source_code)
+    num_lines = len(source_code.splitlines())
+
+    results = []
+    for line_number in range(1, num_lines + 1, 29):
+        for replacement in REPLACEMENTS:
+            mutant = {"line_number": line_number, "mutated_code": replacement}
+            mutated_code = FileOperationHandler.apply_mutation(source_code, mutant)
+            valid = checker.check(mutated_code, line_number)
+            assert valid == FileOperationHandler.check_syntax(
+                source_path, mutated_code
+            ), (line_number, replacement)
+            results.append(valid)
+
+    assert True in results and False in results
+    # Going back to the original after each check keeps the tree in sync.
+    assert checker.check(source_code, num_lines)
@@ -0,0 +1,127 @@
+import importlib.util
+import os
+import shutil
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from mutahunter.core import pytest_worker_server
+from mutahunter.core.warm_workers import PytestWarmWorker, create_warm_worker
+
+
+@pytest.mark.parametrize(
+    "test_command, expected_module_mode, expected_args",
+    [
+        ("pytest tests/ -q", False, ["tests/", "-q"]),
+        ("python -m pytest -x tests/test_app.py", True, ["-x", "tests/test_app.py"]),
+        ("python3.12 -m pytest", True, []),
+    ],
+)
+def test_parse_command(test_command, expected_module_mode, expected_args):
+    _, module_mode, args = PytestWarmWorker.parse_command(test_command)
+
+    assert module_mode == expected_module_mode
+    assert args == expected_args
+
+
+@pytest.mark.parametrize(
+    "test_command",
+    [
+        "mvn clean test",
+        "npm test",
+        "pytest tests/ && echo done",
+        "PYTHONPATH=src pytest",
+        "python -m unittest",
+    ],
+)
+def test_parse_command_unsupported(test_command):
+    assert PytestWarmWorker.parse_command(test_command) is None
+
+
+@patch("mutahunter.core.warm_workers.shutil.which", return_value=None)
+def test_parse_command_defaults_to_current_interpreter(mock_which):
+    python, _, _ = PytestWarmWorker.parse_command("pytest")
+
+    assert python == sys.executable
+
+
+def test_create_warm_worker_without_adapter():
+    assert create_warm_worker("go test ./...", cwd=".") is None
+
+
+@pytest.mark.parametrize(
+    "request_timeout, expected_timeout",
+    [({"timeout": None}, None), ({}, 30.0), ({"timeout": 2}, 2.0)],
+)
+@patch("mutahunter.core.pytest_worker_server._read", return_value="")
+@patch("mutahunter.core.pytest_worker_server._clear")
+@patch("mutahunter.core.pytest_worker_server._wait", return_value=0)
+@patch("mutahunter.core.pytest_worker_server.os.fork", return_value=1)
+def test_worker_server_timeout(
+    mock_fork, mock_wait, mock_clear, mock_read, request_timeout, expected_timeout
+):
+    server = pytest_worker_server.WarmSession({}, channel=None, requests=[])
+    response = server._handle({"args": [], **request_timeout})
+
+    mock_wait.assert_called_once_with(1, expected_timeout)
+    assert response["returncode"] == 0
+    assert response["timeout"] is False
+
+
+def test_patch_module_swaps_functions_in_place(tmp_path):
+    path = tmp_path / "calc.py"
+    original = b"def add(a, b):\n    return a + b\n\n\nclass Calc:\n    def mul(self, a, b):\n        return a * b\n"
+    path.write_bytes(original)
+    spec = importlib.util.spec_from_file_location("calc", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    add = module.add
+
+    pytest_worker_server._patch_module(
+        str(path), original, original.replace(b"a + b", b"a - b")
+    )
+    pytest_worker_server._patch_module(
+        str(path), original, original.replace(b"a * b", b"a + b")
+    )
+
+    assert add(3, 1) == 2
+    assert module.Calc().mul(2, 3) == 5
+    with pytest.raises(pytest_worker_server._Unpatchable):
+        pytest_worker_server._patch_module(
+            str(path), original, original + b"LIMIT = 1\n"
+        )
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_warm_worker_runs_mutants_on_the_collected_tests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "app.py").write_text(
+        "LIMIT = 10\n\n\ndef add(a, b):\n    return a + b\n\n\n"
+        "def clamp(x):\n    return min(x, LIMIT)\n"
+    )
+    (tmp_path / "test_app.py").write_text(
+        "from app import add, clamp\n\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+        "\n\ndef test_clamp():\n    assert clamp(20) == 10\n"
+    )
+    original = (tmp_path / "app.py").read_text()
+    worker = PytestWarmWorker(str(tmp_path))
+    worker.start(f"{sys.executable} -m pytest test_app.py")
+    try:
+        results = {}
+        for name, mutant in [
+            ("none", original),
+            ("function", original.replace("a + b", "a - b")),
+            ("module", original.replace("LIMIT = 10", "LIMIT = 11")),
+        ]:
+            shutil.copy2(tmp_path / "app.py", tmp_path / "app.py.bak")
+            (tmp_path / "app.py").write_text(mutant)
+            result = worker.run(f"{sys.executable} -m pytest test_app.py -x", 30)
+            shutil.copy2(tmp_path / "app.py.bak", tmp_path / "app.py")
+            results[name] = result.returncode
+        selected = worker.run(f"{sys.executable} -m pytest test_app.py::test_clamp", 30)
+    finally:
+        worker.stop()
+
+    assert results == {"none": 0, "function": 1, "module": 1}
+    assert "1 passed" in selected.stdout
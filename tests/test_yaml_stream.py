@@ -0,0 +1,47 @@
+from mutahunter.core.yaml_stream import MutantStreamParser
+
+RESPONSE = """```yaml
+source_file: app.py
+mutants:
+  - function_name: add
+    line_number: 2
+    original_code: |
+      return a + b
+    mutated_code: |
+      return a - b  # Replaced addition with subtraction
+
+  - function_name: add
+    line_number: 2
+    mutated_code: [unclosed
+  - function_name: sub
+    line_number: 5
+    mutated_code: return a + b
+```"""
+
+
+def test_mutants_are_parsed_as_soon_as_they_are_complete():
+    parser = MutantStreamParser()
+    emitted = []
+    for i in range(0, len(RESPONSE), 7):
+        chunk = RESPONSE[i : i + 7]
+        for mutant in parser.feed(chunk):
+            emitted.append((mutant, parser.text.count("- function_name")))
+    emitted.extend((mutant, None) for mutant in parser.close())
+
+    # The first mutant is complete once the second one starts.
+    assert emitted[0][0]["mutated_code"].startswith("return a - b")
+    assert emitted[0][1] == 2
+    # The last one is complete at the closing backticks, before the stream ends.
+    assert emitted[1][0]["function_name"] == "sub"
+    assert emitted[1][1] == 3
+    assert len(emitted) == 2
+    assert parser.errors == 1
+    assert parser.text == RESPONSE
+
+
+def test_flow_style_list_is_left_to_the_full_parse():
+    parser = MutantStreamParser()
+
+    assert parser.feed("mutants: [{line_number: 2}]\n") == []
+    assert parser.close() == []
+    assert parser.errors == 0